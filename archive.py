@@ -0,0 +1,270 @@
+# archive.py — content-addressed scoreboard archive with a match_id index in the bot's database
+#
+# Each distinct image is stored once as <ARCHIVE_DIR>/ab/cd/<sha256>.<format>, where the hash is
+# of the bytes as downloaded. The screenshots table maps match_id -> hash, sizes and the OCR
+# parse version its DB row came from, so old matches can be re-parsed straight from here.
+# Only the standard library is needed at import; recompression imports PIL when it runs.
+import os
+import io
+import sqlite3
+import time
+import hashlib
+import argparse
+import tempfile
+
+from db import DB_PATH
+
+ARCHIVE_DIR = os.environ.get("SCOREBOARD_ARCHIVE", "scoreboard_archive")
+# gc() leaves objects younger than this alone: store() writes (or touches) an object before
+# the index row pointing at it is committed, so a fresh unreferenced file may be about to be used
+ARCHIVE_GC_GRACE = float(os.environ.get("SCOREBOARD_ARCHIVE_GC_GRACE", "3600"))
+# Leading bytes -> stored file extension
+FORMATS = ((b"\x89PNG\r\n\x1a\n", "png"), (b"\xff\xd8\xff", "jpg"), (b"GIF8", "gif"))
+
+
+# -------------------------------
+# Schema
+# -------------------------------
+def create_archive_table(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS screenshots (
+        match_id INTEGER PRIMARY KEY,
+        sha256 TEXT NOT NULL,
+        size INTEGER NOT NULL,        -- bytes as downloaded
+        stored_size INTEGER NOT NULL, -- bytes on disk after any recompression
+        format TEXT NOT NULL,
+        parse_version INTEGER,        -- ocr.PARSE_VERSION of the stored match, NULL until inserted
+        archived_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_screenshots_sha256 ON screenshots(sha256);
+    """)
+    conn.commit()
+    conn.close()
+
+
+# -------------------------------
+# Objects
+# -------------------------------
+def sniff_format(data):
+    for magic, fmt in FORMATS:
+        if data.startswith(magic):
+            return fmt
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return "bin"
+
+
+def object_path(sha256, fmt, root=ARCHIVE_DIR):
+    return os.path.abspath(os.path.join(root, sha256[:2], sha256[2:4], f"{sha256}.{fmt}"))
+
+
+def _write_object(path, data):
+    """Write via a temp file in the same shard, so readers never see a partial image."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _touch(path):
+    """Refresh an existing object's mtime (see ARCHIVE_GC_GRACE). False if it is not there."""
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def store(match_id, data, root=ARCHIVE_DIR, db_path=DB_PATH):
+    """
+    Archive one downloaded scoreboard for match_id and return the path to read it from.
+    Identical bytes already in the archive (any match) are reused rather than written again;
+    re-posting a match points it at the new image and clears its parse version, so stale()
+    lists it until a re-parse has replaced the stored match (insert_scoreboard(..., replace=True)).
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    try:
+        # An earlier copy may have been recompressed; reuse whatever format it is stored in
+        cursor.execute("""
+        SELECT format, stored_size FROM screenshots WHERE sha256 = ? LIMIT 1;
+        """, (sha256,))
+        row = cursor.fetchone()
+        # The object is written or touched before its row is committed; gc() skips young files
+        if row and _touch(object_path(sha256, row[0], root)):
+            fmt, stored_size = row
+        else:
+            fmt, stored_size = sniff_format(data), len(data)
+            path = object_path(sha256, fmt, root)
+            if not _touch(path):
+                _write_object(path, data)
+        cursor.execute("""
+        INSERT OR REPLACE INTO screenshots (match_id, sha256, size, stored_size, format, parse_version)
+        VALUES (?, ?, ?, ?, ?, NULL);
+        """, (int(match_id), sha256, len(data), stored_size, fmt))
+        conn.commit()
+    finally:
+        conn.close()
+    return object_path(sha256, fmt, root)
+
+
+def record_parse(match_id, parse_version, db_path=DB_PATH):
+    """Note which OCR version produced the stored row for match_id; call once that row is committed."""
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE screenshots SET parse_version = ? WHERE match_id = ?;", (parse_version, int(match_id)))
+    conn.commit()
+    conn.close()
+
+
+def lookup(match_id, root=ARCHIVE_DIR, db_path=DB_PATH):
+    """Index entry for match_id plus its object path, or None."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    row = conn.execute("SELECT * FROM screenshots WHERE match_id = ?;", (int(match_id),)).fetchone()
+    conn.close()
+    if row is None:
+        return None
+    entry = dict(row)
+    entry["path"] = object_path(entry["sha256"], entry["format"], root)
+    return entry
+
+
+def stale(parse_version, root=ARCHIVE_DIR, db_path=DB_PATH):
+    """
+    Yield (match_id, image path) for archived matches parsed by an older OCR version (or never
+    stored), oldest match first. Rows are streamed, so a re-parse job holds one at a time.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("""
+        SELECT match_id, sha256, format FROM screenshots
+        WHERE parse_version IS NULL OR parse_version < ?
+        ORDER BY match_id;
+        """, (parse_version,))
+        for match_id, sha256, fmt in rows:
+            yield match_id, object_path(sha256, fmt, root)
+    finally:
+        conn.close()
+
+
+# -------------------------------
+# Maintenance
+# -------------------------------
+def _lossless_webp(data):
+    """WebP-lossless re-encode of a PNG, or None if it would not round-trip pixel for pixel."""
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as img:
+        if img.mode not in ("RGB", "RGBA"):
+            return None
+        img.load()
+        out = io.BytesIO()
+        img.save(out, format="WEBP", lossless=True, quality=100, method=6)
+        encoded = out.getvalue()
+        with Image.open(io.BytesIO(encoded)) as check:
+            if check.mode != img.mode or check.tobytes() != img.tobytes():
+                return None
+    return encoded
+
+
+def recompress(root=ARCHIVE_DIR, db_path=DB_PATH):
+    """
+    Re-encode stored PNGs as lossless WebP where that is smaller. Returns (objects, bytes saved).
+    The PNGs are left for gc(): a concurrent store() may have just reused one and still index it.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("SELECT DISTINCT sha256 FROM screenshots WHERE format = 'png';")
+    objects, saved = 0, 0
+    for (sha256,) in cursor.fetchall():
+        path = object_path(sha256, "png", root)
+        if not os.path.exists(path):
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        encoded = _lossless_webp(data)
+        if encoded is None or len(encoded) >= len(data):
+            continue
+        _write_object(object_path(sha256, "webp", root), encoded)
+        cursor.execute("""
+        UPDATE screenshots SET format = 'webp', stored_size = ? WHERE sha256 = ?;
+        """, (len(encoded), sha256))
+        conn.commit()
+        objects += 1
+        saved += len(data) - len(encoded)
+    conn.close()
+    return objects, saved
+
+
+def gc(root=ARCHIVE_DIR, db_path=DB_PATH, grace=ARCHIVE_GC_GRACE):
+    """
+    Delete objects no match points at any more (re-posted matches), except ones modified in the
+    last `grace` seconds, which a concurrent store() may be about to index. Returns (files, bytes).
+    """
+    cutoff = time.time() - grace
+    conn = sqlite3.connect(db_path)
+    referenced = {object_path(sha256, fmt, root) for sha256, fmt in
+                  conn.execute("SELECT DISTINCT sha256, format FROM screenshots;")}
+    conn.close()
+    files, freed = 0, 0
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.abspath(os.path.join(dirpath, name))
+            # .tmp files are objects still being written
+            if path in referenced or name.endswith(".tmp"):
+                continue
+            try:
+                stat = os.stat(path)
+                if stat.st_mtime >= cutoff:
+                    continue
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            freed += stat.st_size
+            files += 1
+    return files, freed
+
+
+def stats(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    matches, downloaded = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM screenshots;").fetchone()
+    objects, stored = conn.execute("""
+    SELECT COUNT(*), COALESCE(SUM(stored_size), 0)
+    FROM (SELECT sha256, MAX(stored_size) AS stored_size FROM screenshots GROUP BY sha256);
+    """).fetchone()
+    conn.close()
+    return {"matches": matches, "objects": objects, "downloaded_bytes": downloaded, "stored_bytes": stored}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and maintain the scoreboard archive.")
+    parser.add_argument("command", choices=("stats", "recompress", "gc", "stale"))
+    parser.add_argument("--root", default=ARCHIVE_DIR)
+    parser.add_argument("--grace", type=float, default=ARCHIVE_GC_GRACE,
+                        help="for gc: keep unreferenced objects modified within this many seconds")
+    parser.add_argument("--parse-version", type=int,
+                        help="for stale: list matches parsed before this version (default: ocr.PARSE_VERSION)")
+    args = parser.parse_args()
+    create_archive_table()
+
+    if args.command == "stats":
+        s = stats()
+        print(f"{s['matches']} matches, {s['objects']} distinct images, "
+              f"{s['downloaded_bytes'] / 1e6:.1f} MB downloaded, {s['stored_bytes'] / 1e6:.1f} MB on disk")
+    elif args.command == "recompress":
+        objects, saved = recompress(args.root)
+        print(f"Recompressed {objects} image(s), saving {saved / 1e6:.1f} MB once gc removes the PNGs")
+    elif args.command == "gc":
+        files, freed = gc(args.root, grace=args.grace)
+        print(f"Removed {files} unreferenced file(s), freed {freed / 1e6:.1f} MB")
+    else:
+        if args.parse_version is None:
+            import ocr
+            args.parse_version = ocr.PARSE_VERSION
+        for match_id, path in stale(args.parse_version, args.root):
+            print(f"{match_id}\t{path}")
@@ -0,0 +1,173 @@
+from discord.ext import commands
+import re
+import time
+from math import comb
+from functools import lru_cache
+from itertools import combinations
+# numpy is imported when teams are scored, so loading the cog at start-up does not pull it in
+from db import normalize_ign, get_champion_pools
+from rating import INITIAL_RATING, expected_score, get_player_ratings
+from registry import registry
+
+TEAM_SIZE = 5
+LOBBY_SIZE = 2 * TEAM_SIZE
+# Rating points charged per pair of teammates sharing a main champion
+OVERLAP_PENALTY = 25.0
+CHAMPION_POOL_SIZE = 3
+# Player 0 is always on team A, so mirrored splits are not counted twice (126)
+N_SPLITS = comb(LOBBY_SIZE - 1, TEAM_SIZE - 1)
+
+# -------------------------------
+# Split table
+# -------------------------------
+@lru_cache(maxsize=None)
+def split_tables():
+    """
+    (splits, same_team), built on first use:
+      splits:    (126, 10) every distinct 5v5 split of a 10-player lobby, +1/-1 per player
+      same_team: (126, 10, 10) 1 where players i and j end up on the same team
+    """
+    import numpy as np
+    splits = np.array([[1 if i == 0 or i in combo else -1 for i in range(LOBBY_SIZE)]
+                       for combo in combinations(range(1, LOBBY_SIZE), TEAM_SIZE - 1)], dtype=np.float64)
+    same_team = (splits[:, :, None] == splits[:, None, :]).astype(np.float64)
+    same_team[:, np.arange(LOBBY_SIZE), np.arange(LOBBY_SIZE)] = 0.0
+    return splits, same_team
+
+
+def score_splits(strengths, overlap=None, overlap_penalty=OVERLAP_PENALTY):
+    """
+    Cost of every split for every lobby at once.
+      strengths: (L, 10) player ratings
+      overlap:   optional (L, 10, 10) pairwise champion-pool overlap in [0, 1]
+    Returns (L, 126): mean-rating gap between the teams plus the overlap penalty.
+    """
+    import numpy as np
+    splits, same_team = split_tables()
+    strengths = np.atleast_2d(np.asarray(strengths, dtype=np.float64))
+    cost = np.abs(strengths @ splits.T) / TEAM_SIZE
+    if overlap is not None:
+        overlap = np.asarray(overlap, dtype=np.float64).reshape(-1, LOBBY_SIZE, LOBBY_SIZE)
+        # Each teammate pair is counted twice in the symmetric matrix
+        cost += overlap_penalty * np.einsum('lij,sij->ls', overlap, same_team) / 2
+    return cost
+
+
+def best_splits(strengths, overlap=None, top=1):
+    """
+    Returns (indices, costs), each (L, top): the most balanced splits per lobby, best first.
+    """
+    import numpy as np
+    cost = score_splits(strengths, overlap)
+    top = min(top, cost.shape[1])
+    idx = np.argpartition(cost, top - 1, axis=1)[:, :top]
+    order = np.take_along_axis(cost, idx, axis=1).argsort(axis=1)
+    idx = np.take_along_axis(idx, order, axis=1)
+    return idx, np.take_along_axis(cost, idx, axis=1)
+
+
+def pool_overlap(pools):
+    """(10, 10) share of champion pool two players have in common."""
+    import numpy as np
+    sets = [set(pool) for pool in pools]
+    overlap = np.zeros((len(sets), len(sets)))
+    for i, j in combinations(range(len(sets)), 2):
+        if sets[i] and sets[j]:
+            overlap[i, j] = overlap[j, i] = len(sets[i] & sets[j]) / CHAMPION_POOL_SIZE
+    return overlap
+
+
+def make_lobbies(igns, ratings):
+    """Group players into lobbies of 10 with similar ratings (highest first)."""
+    ranked = sorted(igns, key=lambda ign: ratings[ign], reverse=True)
+    return [ranked[i:i + LOBBY_SIZE] for i in range(0, len(ranked), LOBBY_SIZE)]
+
+
+def balance_lobbies(lobbies, ratings, pools=None):
+    """
+    (team_a, team_b) IGN lists per lobby from its most balanced split.
+    pools: {ign: champion pool} to also penalize teammates sharing mains.
+    """
+    import numpy as np
+    strengths = np.array([[ratings[ign] for ign in lobby] for lobby in lobbies])
+    overlap = None
+    if pools is not None:
+        overlap = np.stack([pool_overlap([pools[ign] for ign in lobby]) for lobby in lobbies])
+    idx, _ = best_splits(strengths, overlap)
+    splits, _ = split_tables()
+    teams = []
+    for lobby, split in zip(lobbies, idx[:, 0]):
+        sides = splits[split]
+        teams.append(([lobby[i] for i in range(LOBBY_SIZE) if sides[i] > 0],
+                      [lobby[i] for i in range(LOBBY_SIZE) if sides[i] < 0]))
+    return teams
+
+
+class BalanceCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    def resolve_players(self, players: str):
+        """Split a list of mentions, user IDs or IGNs into registered IGNs."""
+        tokens = [t.strip() for t in re.split(r',' if ',' in players else r'\s+', players) if t.strip()]
+        igns, unknown = [], []
+        for token in tokens:
+            if re.fullmatch(r'<@!?\d+>|\d{15,20}', token):
+                ign = registry.get_ign(re.sub(r'[<@!>]', '', token))
+            else:
+                ign = registry.ensure_loaded().display_ign.get(normalize_ign(token))
+            (igns if ign else unknown).append(ign or token)
+        return igns, unknown
+
+    @commands.hybrid_command(
+        name="balance",
+        description="Balance teams for 10 registered players (or a multiple of 10 for several lobbies)."
+    )
+    async def balance(self, ctx: commands.Context, players: str, champions: bool = False):
+        print(f"Received balance command from {ctx.author} with players: {players}")
+        try:
+            igns, unknown = self.resolve_players(players)
+            if unknown:
+                await ctx.send("Not registered: " + ", ".join(f"`{t}`" for t in unknown))
+                return
+            if not igns or len(igns) % LOBBY_SIZE or len(set(igns)) != len(igns):
+                await ctx.send(f"Please give {LOBBY_SIZE} distinct registered players (or a multiple of {LOBBY_SIZE}).")
+                return
+
+            started = time.perf_counter()
+            rated = get_player_ratings(igns)
+            ratings = {ign: rated.get(ign, INITIAL_RATING) for ign in igns}
+            lobbies = make_lobbies(igns, ratings)
+            pools = get_champion_pools(igns, CHAMPION_POOL_SIZE) if champions else None
+            teams = balance_lobbies(lobbies, ratings, pools)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            parts = []
+            for n, (team_a, team_b) in enumerate(teams):
+                mean_a = sum(ratings[ign] for ign in team_a) / len(team_a)
+                mean_b = sum(ratings[ign] for ign in team_b) / len(team_b)
+                title = f"**Lobby {n + 1}:**" if len(lobbies) > 1 else "**Balanced teams:**"
+                parts.append(
+                    f"{title}\n"
+                    f"Team A ({mean_a:.0f}): {', '.join(team_a)}\n"
+                    f"Team B ({mean_b:.0f}): {', '.join(team_b)}\n"
+                    f"Team A win chance: {expected_score(mean_a, mean_b) * 100:.1f}%"
+                )
+            unrated = [ign for ign in igns if ign not in rated]
+            footer = f"_Scored {len(lobbies) * N_SPLITS} splits in {elapsed_ms:.1f} ms._"
+            if unrated:
+                footer += f" _No rating yet (using {INITIAL_RATING:.0f}): {', '.join(unrated)}._"
+            message = ""
+            for part in parts + [footer]:
+                if message and len(message) + len(part) + 2 > 2000:
+                    await ctx.send(message)
+                    message = ""
+                message = f"{message}\n\n{part}" if message else part
+            await ctx.send(message)
+        except Exception as e:
+            print(f"Error in balance command: {e}")
+            await ctx.send(f"An error occurred: {e}")
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(BalanceCog(bot))
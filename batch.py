@@ -0,0 +1,210 @@
+# batch.py — parse a folder of scoreboards (or the archive's stale matches) within a memory budget
+#
+# Each pool worker decodes one image, keeps only the ROIs (ocr.retain_regions) and frees the
+# frame before parsing. Jobs are admitted by decoded size as well as count: a new image starts
+# only when a worker is free and the frames already being parsed fit in --memory-mb, so nothing
+# waits in the pool's queue holding budget. The budget caps decoded frames, not RSS: a job's
+# crops briefly sit next to its frame, and every worker process adds its interpreter and OCR
+# libraries on top (about 120 MB each here), whatever the folder holds.
+import os
+import re
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from PIL import Image
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+DEFAULT_MEMORY_MB = 512
+# <match_id>.png as run.py saved them, or <anything>_<match_id>.png
+MATCH_ID_PATTERN = re.compile(r"(?:^|_)(\d+)$")
+
+_hashes = None
+
+
+def peak_rss_mb():
+    """This process's peak resident set size, or None where the platform does not report it."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def frame_bytes(image_path):
+    """Decoded BGR size from the image header alone."""
+    with Image.open(image_path) as img:
+        w, h = img.size
+    return w * h * 3
+
+
+def iter_folder(folder):
+    """
+    (image path, match_id from the file name) for every image under folder.
+    Images whose name does not follow MATCH_ID_PATTERN are skipped and reported.
+    """
+    for dirpath, _, filenames in os.walk(folder):
+        for name in sorted(filenames):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                m = MATCH_ID_PATTERN.search(os.path.splitext(name)[0])
+                if m:
+                    yield os.path.join(dirpath, name), int(m.group(1))
+                else:
+                    print(f"Skipping {os.path.join(dirpath, name)}: expected <match_id> or <name>_<match_id> as the file name")
+
+
+# -------------------------------
+# Pool workers
+# -------------------------------
+def _init_worker():
+    global _hashes
+    import ocr
+    _hashes = ocr.load_hashes(ocr.HASH_JSON)
+    ocr.get_map_whitelist()
+
+
+def _parse(job):
+    import ocr
+    image_path, match_id, output_path = job
+    started = time.perf_counter()
+    try:
+        ocr.main(image_path, output_path, _hashes, match_id)
+        error = None
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+    return {"match_id": match_id, "output_path": output_path, "error": error,
+            "ms": (time.perf_counter() - started) * 1000, "pid": os.getpid(), "peak_rss_mb": peak_rss_mb()}
+
+
+# -------------------------------
+# Driver
+# -------------------------------
+def run_batch(images, output_dir, workers=None, memory_mb=DEFAULT_MEMORY_MB, on_parsed=None):
+    """
+    Parse (image path, match_id) pairs into output_dir/parsed_<match_id>.json, calling
+    on_parsed(match_id, output_path) in this process for each success. An image that cannot
+    be read counts as a failure. Returns a summary with per-worker peak RSS.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    budget = memory_mb * 1024 * 1024
+    in_flight, in_flight_bytes, peak_in_flight = {}, 0, 0
+    results, worker_rss = [], {}
+    started = time.perf_counter()
+
+    def collect(done):
+        nonlocal in_flight_bytes
+        for future in done:
+            in_flight_bytes -= in_flight.pop(future)
+            result = future.result()
+            results.append(result)
+            worker_rss[result["pid"]] = result["peak_rss_mb"]
+            if result["error"]:
+                print(f"Failed to parse match {result['match_id']}: {result['error']}")
+            elif on_parsed is not None:
+                on_parsed(result["match_id"], result["output_path"])
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for image_path, match_id in images:
+            try:
+                cost = frame_bytes(image_path)
+            except (OSError, Image.UnidentifiedImageError) as e:
+                print(f"Failed to read {image_path} (match {match_id}): {e}")
+                results.append({"match_id": match_id, "error": f"{type(e).__name__}: {e}", "ms": 0.0})
+                continue
+            # A frame larger than the whole budget still runs, on its own
+            while in_flight and (len(in_flight) >= workers or in_flight_bytes + cost > budget):
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+            output_path = os.path.join(output_dir, f"parsed_{match_id}.json")
+            future = pool.submit(_parse, (os.path.abspath(image_path), match_id, output_path))
+            in_flight[future] = cost
+            in_flight_bytes += cost
+            peak_in_flight = max(peak_in_flight, len(in_flight))
+        collect(wait(in_flight).done)
+
+    elapsed = time.perf_counter() - started
+    latencies = sorted(r["ms"] for r in results)
+    return {
+        "images": len(results),
+        "failures": sum(1 for r in results if r["error"]),
+        "seconds": elapsed,
+        "images_per_sec": len(results) / elapsed if elapsed else 0.0,
+        "p50_ms": latencies[len(latencies) // 2] if latencies else 0.0,
+        "peak_in_flight": peak_in_flight,
+        "worker_peak_rss_mb": worker_rss,
+        "driver_peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse many scoreboards with bounded memory.")
+    parser.add_argument("source", help="folder of screenshots, or 'archive' for matches parsed by an older version")
+    parser.add_argument("--output", default="parsed_batch", help="where parsed_<match_id>.json files go")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--memory-mb", type=int, default=DEFAULT_MEMORY_MB,
+                        help="decoded frames allowed in flight at once, in MB (not a cap on RSS)")
+    parser.add_argument("--store", action="store_true",
+                        help="store a folder's parsed scoreboards in the bot database, replacing stored matches "
+                             "(always on for 'archive')")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args()
+
+    from_archive = args.source == "archive"
+    if from_archive:
+        import archive
+        import ocr
+    on_parsed = None
+    if from_archive or args.store:
+        from db import create_database, insert_scoreboard
+        from rollup import enable_rollups
+        from rating import replay_from_db
+        from export import enable_export_tracking
+        create_database()
+        if from_archive:
+            archive.create_archive_table()
+        # Rollups adjust per match through their listener; ratings are replayed once at the end,
+        # and the columnar export is rewritten on its next run
+        enable_rollups()
+        enable_export_tracking()
+        stored = []
+
+        def on_parsed(match_id, output_path):
+            with open(output_path, "r", encoding="utf-8") as f:
+                scoreboard = json.load(f)
+            if insert_scoreboard(scoreboard, replace=True):
+                if from_archive:
+                    archive.record_parse(match_id, scoreboard.get("parse_version"))
+                stored.append(match_id)
+
+    if from_archive:
+        # stale() reads rows lazily; take them all up front, as record_parse() updates the same table
+        images = [(path, match_id) for match_id, path in archive.stale(ocr.PARSE_VERSION)]
+    else:
+        images = iter_folder(args.source)
+    summary = run_batch(images, args.output, args.workers, args.memory_mb, on_parsed)
+    if on_parsed is not None:
+        summary["stored"] = len(stored)
+        if stored:
+            replay_from_db()
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+    print(f"{summary['images']} scoreboards ({summary['failures']} failed) in {summary['seconds']:.1f}s, "
+          f"{summary['images_per_sec']:.2f}/s, p50 {summary['p50_ms']:.0f}ms, "
+          f"at most {summary['peak_in_flight']} in flight")
+    if "stored" in summary:
+        print(f"{summary['stored']} match(es) stored")
+    for pid, rss in sorted(summary["worker_peak_rss_mb"].items()):
+        print(f"  worker {pid}: peak RSS {rss:.0f} MB" if rss is not None else f"  worker {pid}: peak RSS n/a")
+
+
+if __name__ == "__main__":
+    main()
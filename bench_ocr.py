@@ -0,0 +1,149 @@
+# bench_ocr.py — OCR accuracy and throughput over labelled scoreboards (see synth.py)
+import os
+import sys
+import json
+import time
+import argparse
+import cv2
+import numpy as np
+
+import ocr
+from metrics import StageTrace, stage_histograms
+
+BASELINE_JSON = "bench_baseline.json"
+IMAGE_EXTS = (".png", ".jpg", ".jpeg", ".webp")
+PLAYER_FIELDS = ("player", "champion", "credits", "kills", "deaths", "assists", "damage",
+                 "taken", "objective_time", "shielding", "healing")
+MATCH_FIELDS = ("time_minutes", "region", "map", "team1_score", "team2_score")
+
+
+def find_labelled(folder):
+    """(image path, ground-truth path) for every image with a .json next to it, grouped by sub-folder."""
+    groups = {}
+    for root, _, files in os.walk(folder):
+        for name in sorted(files):
+            stem, ext = os.path.splitext(name)
+            truth = os.path.join(root, stem + ".json")
+            if ext.lower() in IMAGE_EXTS and os.path.exists(truth):
+                group = os.path.relpath(root, folder)
+                groups.setdefault(group, []).append((os.path.join(root, name), truth))
+    return groups
+
+
+def compare(parsed, truth, correct, total):
+    """Accumulate per-field hits by row position."""
+    for team in ("team1", "team2"):
+        for got, want in zip(parsed["teams"][team], truth["teams"][team]):
+            for field in PLAYER_FIELDS:
+                total[field] = total.get(field, 0) + 1
+                correct[field] = correct.get(field, 0) + (got.get(field) == want[field])
+    for field in MATCH_FIELDS:
+        total[field] = total.get(field, 0) + 1
+        correct[field] = correct.get(field, 0) + (parsed["match"].get(field) == truth["match"][field])
+
+
+def run_group(items, hashes):
+    correct, total, records = {}, {}, []
+    failures = 0
+    started = time.perf_counter()
+    for image_path, truth_path in items:
+        with open(truth_path, "r", encoding="utf-8") as f:
+            truth = json.load(f)
+        trace = StageTrace(image=os.path.basename(image_path))
+        with trace.stage("load_image"):
+            img = cv2.imread(image_path)
+        try:
+            parsed = ocr.parse_scoreboard(img, truth["match"]["match_id"], hashes, trace, lobby=truth.get("lobby"))
+        except Exception as e:
+            # A crash scores zero on every field rather than aborting the run
+            print(f"Failed to parse {image_path}: {e}")
+            failures += 1
+            parsed = {"match": {}, "teams": {"team1": [{}] * 5, "team2": [{}] * 5}}
+        records.append(trace.record())
+        compare(parsed, truth, correct, total)
+    elapsed = time.perf_counter() - started
+
+    latencies = np.array([r["total_ms"] for r in records])
+    return {
+        "scoreboards": len(items),
+        "failures": failures,
+        "accuracy": {field: correct[field] / total[field] for field in total},
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "scoreboards_per_sec": len(items) / elapsed if elapsed else 0.0,
+        # Downscaled reads redone at full resolution (ocr.FIELD_SCALES)
+        "escalations_per_scoreboard": sum(r["counters"].get("escalations", 0) for r in records) / len(records),
+        "stage_share": _stage_share(records),
+    }
+
+
+def _stage_share(records):
+    histograms = stage_histograms(records)
+    total = histograms.pop("total").sum or 1.0
+    return {stage: round(h.sum / total, 4) for stage, h in histograms.items()}
+
+
+def check_regressions(results, baseline, accuracy_tolerance, latency_tolerance):
+    """List of human-readable regressions against the stored baseline."""
+    problems = []
+    for group, result in results.items():
+        base = baseline.get(group)
+        if not base:
+            continue
+        for field, acc in result["accuracy"].items():
+            if field in base["accuracy"] and acc < base["accuracy"][field] - accuracy_tolerance:
+                problems.append(f"{group}: {field} accuracy {acc:.3f} < baseline {base['accuracy'][field]:.3f}")
+        if result["p95_ms"] > base["p95_ms"] * (1 + latency_tolerance):
+            problems.append(f"{group}: p95 {result['p95_ms']:.0f}ms > baseline {base['p95_ms']:.0f}ms")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OCR accuracy and speed on labelled scoreboards.")
+    parser.add_argument("folder", nargs="?", default="synthetic_scoreboards")
+    parser.add_argument("--baseline", default=BASELINE_JSON)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.01)
+    parser.add_argument("--latency-tolerance", type=float, default=0.5,
+                        help="allowed p95 slowdown as a fraction of the baseline")
+    args = parser.parse_args()
+
+    groups = find_labelled(args.folder)
+    if not groups:
+        print(f"No labelled scoreboards found in {args.folder} (run synth.py first).")
+        return 1
+
+    hashes = ocr.load_hashes(ocr.HASH_JSON)
+    results = {}
+    for group, items in sorted(groups.items()):
+        result = results[group] = run_group(items, hashes)
+        acc = result["accuracy"]
+        print(f"[{group}] {result['scoreboards']} scoreboards ({result['failures']} failed), "
+              f"p50 {result['p50_ms']:.0f}ms, p95 {result['p95_ms']:.0f}ms, "
+              f"{result['scoreboards_per_sec']:.2f} scoreboards/s, "
+              f"{result['escalations_per_scoreboard']:.1f} escalations/scoreboard")
+        print("  champion {:.3f}  player {:.3f}  ".format(acc["champion"], acc["player"]) +
+              "  ".join(f"{f} {acc[f]:.3f}" for f in PLAYER_FIELDS[2:] + MATCH_FIELDS))
+        top = sorted(result["stage_share"].items(), key=lambda item: -item[1])[:4]
+        print("  time share: " + ", ".join(f"{stage} {share * 100:.0f}%" for stage, share in top))
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        problems = check_regressions(results, baseline, args.accuracy_tolerance, args.latency_tolerance)
+        for problem in problems:
+            print(f"REGRESSION: {problem}")
+        if problems:
+            return 1
+        print("No regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# bench_rating.py — timing for full rating replay and per-match incremental updates
+import sys
+import time
+import numpy as np
+
+from rating import RatingEngine, schedule_waves, replay_arrays, TEAM_SIZE
+
+N_MATCHES = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+N_PLAYERS = int(sys.argv[2]) if len(sys.argv) > 2 else 2_000
+
+
+def synthetic_history(n_matches, n_players, seed=0):
+    """Random 5v5 lobbies drawn from n_players, with hidden skill deciding the winner."""
+    rng = np.random.default_rng(seed)
+    skill = rng.normal(0.0, 1.0, n_players)
+    # Ten distinct players per match: top-10 of random keys per row, in chunks
+    chunk = max(1, 10_000_000 // n_players)
+    slots = np.concatenate([
+        np.argpartition(rng.random((min(chunk, n_matches - i), n_players), dtype=np.float32),
+                        2 * TEAM_SIZE, axis=1)[:, :2 * TEAM_SIZE]
+        for i in range(0, n_matches, chunk)
+    ])
+    sides = np.tile(np.r_[np.ones(TEAM_SIZE), -np.ones(TEAM_SIZE)], (n_matches, 1)).astype(np.int8)
+    margin = skill[slots[:, :TEAM_SIZE]].sum(axis=1) - skill[slots[:, TEAM_SIZE:]].sum(axis=1)
+    won = (margin + rng.normal(0.0, 1.0, n_matches) > 0).astype(np.int8)
+    return slots.astype(np.int64), sides, won
+
+
+def main():
+    print(f"Generating {N_MATCHES} matches over {N_PLAYERS} players...")
+    slots, sides, won = synthetic_history(N_MATCHES, N_PLAYERS)
+
+    t0 = time.perf_counter()
+    schedule = schedule_waves(slots)
+    t1 = time.perf_counter()
+    ratings, counts = replay_arrays(slots, sides, won, N_PLAYERS, schedule=schedule)
+    t2 = time.perf_counter()
+    print(f"Full replay: {t2 - t0:.2f}s ({t1 - t0:.2f}s scheduling, {t2 - t1:.2f}s updates, "
+          f"{len(schedule[1]) - 1} waves)")
+
+    # Incremental path: same matches one at a time through RatingEngine
+    engine = RatingEngine()
+    teams = [(row[:TEAM_SIZE], row[TEAM_SIZE:]) for row in slots.tolist()]
+    flags = won.astype(bool).tolist()
+    t3 = time.perf_counter()
+    for (team1, team2), team1_won in zip(teams, flags):
+        engine.apply_match(team1, team2, team1_won)
+    t4 = time.perf_counter()
+    print(f"Incremental: {(t4 - t3) / N_MATCHES * 1e6:.1f}us per match")
+
+    incremental = np.array([engine.ratings.get(i, 0.0) for i in range(N_PLAYERS)])
+    played = counts > 0
+    drift = np.abs(incremental[played] - ratings[played]).max() if played.any() else 0.0
+    print(f"Max difference between replay and incremental ratings: {drift:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+# bench_startup.py — bot import cost and time to first scoreboard: cold ocr.py per job vs warm workers
+import os
+import sys
+import json
+import time
+import asyncio
+import shutil
+import argparse
+import subprocess
+import tempfile
+
+from ocr_worker import OCRWorkerPool
+
+OCR_MODULES = ("cv2", "numpy", "PIL", "imagehash", "pytesseract")
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def bot_import():
+    """
+    Seconds to import run.py and the cogs it loads at start-up in a fresh interpreter,
+    and which OCR modules they pulled in.
+    """
+    code = ("import sys, time, json, importlib; t = time.perf_counter(); import run; "
+            "[importlib.import_module(name) for name in run.EXTENSIONS]; "
+            "print(json.dumps([time.perf_counter() - t, "
+            f"[m for m in {OCR_MODULES!r} if m in sys.modules]]))")
+    with tempfile.TemporaryDirectory() as workdir:
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=workdir,
+                             env=dict(os.environ, PYTHONPATH=HERE))
+    seconds, modules = json.loads(out.stdout.strip().splitlines()[-1])
+    return seconds, modules
+
+
+def prepare_workdir(workdir):
+    """A scratch copy of what OCR reads, with an empty database, so runs leave the bot's files alone."""
+    for name in ("champion_hashes.json", "maps.json", "players.json"):
+        shutil.copy(os.path.join(HERE, name), workdir)
+    subprocess.run([sys.executable, "-c", "import db; db.create_database()"], check=True, cwd=workdir,
+                   env=dict(os.environ, PYTHONPATH=HERE), capture_output=True)
+
+
+def cold_jobs(image, jobs, workdir):
+    """The old path: one `python ocr.py` per scoreboard. Returns seconds per job."""
+    times = []
+    for i in range(jobs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, os.path.join(HERE, "ocr.py"), image, "0",
+                        os.path.join(workdir, f"cold_{i}.json")], capture_output=True, text=True, cwd=workdir)
+        times.append(time.perf_counter() - started)
+    return times
+
+
+async def warm_jobs(image, jobs, workdir, workers):
+    """Warm workers: start-up seconds, then seconds per job."""
+    pool = OCRWorkerPool(workers, cwd=workdir)
+    ready = await pool.start()
+    times, errors = [], set()
+    for i in range(jobs):
+        started = time.perf_counter()
+        ok, error = await pool.parse(image, os.path.join(workdir, f"warm_{i}.json"))
+        times.append(time.perf_counter() - started)
+        if not ok:
+            errors.add(error)
+    await pool.close()
+    return ready, times, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure bot start-up and per-scoreboard OCR overhead.")
+    parser.add_argument("image", help="a scoreboard screenshot")
+    parser.add_argument("--jobs", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    image = os.path.abspath(args.image)
+
+    seconds, modules = bot_import()
+    print(f"Bot import: {seconds * 1000:.0f}ms, OCR modules imported: {', '.join(modules) or 'none'}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        prepare_workdir(workdir)
+        cold = cold_jobs(image, args.jobs, workdir)
+        ready, warm, errors = asyncio.run(warm_jobs(image, args.jobs, workdir, args.workers))
+
+    print(f"Cold (ocr.py per job): first scoreboard {(seconds + cold[0]) * 1000:.0f}ms after boot, "
+          f"{sum(cold) / len(cold) * 1000:.0f}ms per job")
+    print(f"Warm ({args.workers} worker(s)): ready in {ready * 1000:.0f}ms, "
+          f"first scoreboard {(seconds + ready + warm[0]) * 1000:.0f}ms after boot, "
+          f"{sum(warm) / len(warm) * 1000:.0f}ms per job")
+    if errors:
+        print(f"Jobs reported errors (timings still include all set-up): {'; '.join(sorted(errors))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# cache.py — small in-process caches shared by the cogs
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Dict-like cache whose entries expire ttl seconds after they were set.
+    When maxsize is given, the least recently used entry is evicted first.
+    """
+
+    def __init__(self, ttl, maxsize=None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return self.get(key, _MISSING) is not _MISSING
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self._forget(key)
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                evicted, _ = self._data.popitem(last=False)
+                self._forget(evicted)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return default
+        self._forget(key)
+        return entry[1]
+
+    def _forget(self, key):
+        """Called whenever key leaves the cache (expiry, eviction or pop)."""
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class QueryCache(TTLCache):
+    """
+    LRU/TTL cache for query results keyed by (query, args). Each entry carries tags
+    (e.g. the normalized IGNs it depends on) so invalidate() drops exactly the
+    entries a new match can have changed.
+    """
+
+    def __init__(self, ttl, maxsize=1024):
+        super().__init__(ttl, maxsize)
+        self._tags = {}      # tag -> set of keys
+        self._key_tags = {}  # key -> its tags, to unlink it when it leaves the cache
+        self.invalidations = 0
+
+    def cached(self, query, args, tags, compute):
+        """Return the cached result for query(*args), computing and storing it on a miss."""
+        key = (query, tuple(args))
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute(*args)
+            self.set(key, value)
+            if key in self._data:
+                self._key_tags[key] = tuple(tags)
+                for tag in tags:
+                    self._tags.setdefault(tag, set()).add(key)
+        return value
+
+    def invalidate(self, tags):
+        for tag in tags:
+            for key in self._tags.pop(tag, ()):
+                if self.pop(key, _MISSING) is not _MISSING:
+                    self.invalidations += 1
+
+    def _forget(self, key):
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def clear(self):
+        super().clear()
+        self._tags.clear()
+        self._key_tags.clear()
+
+    def stats(self):
+        return dict(super().stats(), invalidations=self.invalidations)
+
+
+_MISSING = object()
@@ -0,0 +1,295 @@
+# calibrate.py — fit the scoreboard geometry profile to a folder of labelled scoreboards
+import os
+import re
+import json
+import time
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+from PIL import Image
+
+import ocr
+import debug
+from registry import bounded_levenshtein
+from bench_ocr import find_labelled
+
+# Coarse-to-fine search: each pass tries offsets -radius..radius in `step` px around the best so far
+SEARCH_STEPS = (16, 4, 1)
+SEARCH_RADIUS = 48
+# Images each pool worker keeps decoded
+WORKER_IMAGE_CACHE = 4
+# Resolution ladder tried per field; a field keeps the lowest scale whose exact-read rate is
+# within SCALE_TOLERANCE of its full-resolution rate
+SCALE_LADDER = (0.25, 0.33, 0.5, 0.67, 0.75, 1.0)
+SCALE_TOLERANCE = 0.01
+
+_worker_images = OrderedDict()
+
+
+# -------------------------------
+# Geometry -> boxes
+# -------------------------------
+def player_box(geometry, row, key):
+    x1, y1, x2, y2 = ocr.PLAYER_BOXES[key]
+    y_start = (geometry["TEAM1_STARTS"] + geometry["TEAM2_STARTS"])[row]
+    return (x1 + geometry["X_SHIFT"], y_start + y1 + geometry["Y_SHIFT"],
+            x2 + geometry["X_SHIFT"], y_start + y2 + geometry["Y_SHIFT"])
+
+
+def match_box(geometry, key):
+    x1, y1, x2, y2 = ocr.MATCH_BOXES[key]
+    return (x1 + geometry["MATCH_X_SHIFT"], y1 + geometry["MATCH_Y_SHIFT"],
+            x2 + geometry["MATCH_X_SHIFT"], y2 + geometry["MATCH_Y_SHIFT"])
+
+
+def shifted(geometry, **changes):
+    """Copy of geometry with offsets added, e.g. shifted(g, X_SHIFT=4) or row=(3, -2)."""
+    moved = dict(geometry, TEAM1_STARTS=list(geometry["TEAM1_STARTS"]),
+                 TEAM2_STARTS=list(geometry["TEAM2_STARTS"]))
+    row = changes.pop("row", None)
+    if row is not None:
+        i, dy = row
+        n1 = len(moved["TEAM1_STARTS"])
+        team, j = ("TEAM1_STARTS", i) if i < n1 else ("TEAM2_STARTS", i - n1)
+        moved[team][j] += dy
+    for key, delta in changes.items():
+        moved[key] += delta
+    return moved
+
+
+# -------------------------------
+# Expected text and agreement
+# -------------------------------
+def expected_fields(truth):
+    """[(row or None, key, expected text)] for every ROI the labels cover."""
+    fields = []
+    rows = truth["teams"]["team1"] + truth["teams"]["team2"]
+    for i, p in enumerate(rows):
+        for key in ocr.PLAYER_BOXES:
+            if key == "KDA":
+                text = f"{p['kills']}/{p['deaths']}/{p['assists']}"
+            else:
+                text = str(p[key])
+            fields.append((i, key, text))
+    match = truth["match"]
+    fields += [(None, "duration", str(match["time_minutes"])), (None, "region", match["region"]),
+               (None, "map", match["map"]), (None, "team1_score", str(match["team1_score"])),
+               (None, "team2_score", str(match["team2_score"]))]
+    return fields
+
+
+def agreement(key, text, expected):
+    """1.0 for a perfect read, falling with edit distance, so near-misses still steer the search."""
+    if key == "KDA":
+        text = "/".join(re.findall(r"\d+", text))
+    elif key not in ("player", "region", "map"):
+        text = "".join(re.findall(r"\d+", text))
+    longest = max(len(text), len(expected), 1)
+    return 1.0 - bounded_levenshtein(text.casefold(), expected.casefold()) / longest
+
+
+# -------------------------------
+# ROI recognition (pool workers)
+# -------------------------------
+def _load_image(path):
+    img = _worker_images.get(path)
+    if img is None:
+        img = _worker_images[path] = cv2.imread(path)
+        while len(_worker_images) > WORKER_IMAGE_CACHE:
+            _worker_images.popitem(last=False)
+    else:
+        _worker_images.move_to_end(path)
+    return img
+
+
+def _recognize(job):
+    """Worker: OCR every (key, box, scale) of one image."""
+    path, rois = job
+    img = _load_image(path)
+    h, w = img.shape[:2]
+    texts = []
+    for key, (x1, y1, x2, y2), scale in rois:
+        # Candidates near the edge may hang off the image
+        x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+        texts.append(ocr.read_field(img[y1:y2, x1:x2], key, scale=scale) if x2 > x1 and y2 > y1 else "")
+    return texts
+
+
+class ROICache:
+    """(image, key, box, scale) -> OCR text; misses are recognized in parallel, one task per image."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.texts = {}
+        self.recognized = 0
+
+    def fill(self, wanted):
+        by_image = {}
+        for path, key, box, scale in wanted:
+            if (path, key, box, scale) not in self.texts:
+                by_image.setdefault(path, {})[(key, box, scale)] = None
+        jobs = [(path, list(rois)) for path, rois in by_image.items()]
+        for (path, rois), texts in zip(jobs, self.pool.map(_recognize, jobs)):
+            for (key, box, scale), text in zip(rois, texts):
+                self.texts[(path, key, box, scale)] = text
+            self.recognized += len(rois)
+
+    def __getitem__(self, roi):
+        return self.texts[roi]
+
+
+# -------------------------------
+# Search
+# -------------------------------
+def score_candidates(cache, corpus, candidates, fields_of):
+    """
+    Mean agreement of each candidate geometry over the fields fields_of(truth) selects.
+    corpus: [(path, [(row, key, expected)])].
+    """
+    wanted, plan = set(), []
+    for geometry in candidates:
+        rois = []
+        for path, fields in corpus:
+            for row, key, expected in fields_of(fields):
+                box = player_box(geometry, row, key) if row is not None else match_box(geometry, key)
+                rois.append((path, key, box, expected))
+                wanted.add((path, key, box, 1.0))
+        plan.append(rois)
+    cache.fill(wanted)
+    return [sum(agreement(key, cache[(path, key, box, 1.0)], expected) for path, key, box, expected in rois)
+            / max(len(rois), 1) for rois in plan]
+
+
+def search_offset(cache, corpus, geometry, make, fields_of, radius=SEARCH_RADIUS):
+    """Coarse-to-fine 1-D search: best delta for make(geometry, delta) and its score."""
+    best_delta, best_score = 0, None
+    for step in SEARCH_STEPS:
+        deltas = sorted({best_delta + d for d in range(-radius, radius + 1, step)})
+        scores = score_candidates(cache, corpus, [make(geometry, d) for d in deltas], fields_of)
+        for d, score in zip(deltas, scores):
+            # Prefer the smallest move among ties
+            if best_score is None or score > best_score or (score == best_score and abs(d) < abs(best_delta)):
+                best_delta, best_score = d, score
+        radius = step
+    return best_delta, best_score
+
+
+def fit_field_scales(cache, corpus, geometry, ladder=SCALE_LADDER, tolerance=SCALE_TOLERANCE):
+    """Lowest ladder scale per field whose exact-read rate keeps up with full resolution."""
+    reads = []
+    for path, fields in corpus:
+        for row, key, expected in fields:
+            box = player_box(geometry, row, key) if row is not None else match_box(geometry, key)
+            reads.append((path, key, box, expected))
+    cache.fill({(path, key, box, scale) for path, key, box, _ in reads for scale in ladder})
+
+    rates = {}
+    for path, key, box, expected in reads:
+        for scale in ladder:
+            exact = agreement(key, cache[(path, key, box, scale)], expected) == 1.0
+            rates.setdefault(key, {}).setdefault(scale, []).append(exact)
+    scales = {}
+    for key, by_scale in rates.items():
+        rate = {scale: sum(hits) / len(hits) for scale, hits in by_scale.items()}
+        full = rate[max(ladder)]
+        # Nothing to go on if the field never reads right, even at full resolution
+        scales[key] = min(scale for scale in ladder if rate[scale] >= full - tolerance) if full else max(ladder)
+        print(f"{key}: scale {scales[key]} (exact {rate[scales[key]]:.3f}, full resolution {full:.3f})")
+    return scales
+
+
+def image_size(path):
+    """(w, h) from the image header."""
+    with Image.open(path) as img:
+        return img.size
+
+
+def calibrate(folder, geometry=None, workers=None, rounds=2, fit_scales=True, size=None):
+    """
+    Fit X_SHIFT, each row start and the match-box shifts, then each field's ladder scale.
+    Boxes are absolute pixels, so one run fits one capture size: a folder holding several
+    needs size=(w, h) to pick one.
+    Returns (geometry, field scales or None, agreement, scoreboards).
+    """
+    geometry = dict(geometry or ocr.current_geometry())
+    by_size = {}
+    for items in find_labelled(folder).values():
+        for image_path, truth_path in items:
+            by_size.setdefault(image_size(image_path), []).append((image_path, truth_path))
+    if not by_size:
+        raise SystemExit(f"No labelled scoreboards found in {folder}")
+    if size is None and len(by_size) > 1:
+        sizes = ", ".join(f"{w}x{h} ({len(items)})" for (w, h), items in sorted(by_size.items()))
+        raise SystemExit(f"{folder} mixes capture sizes: {sizes}. Pick one with --size WxH.")
+    size = size or next(iter(by_size))
+    if size not in by_size:
+        raise SystemExit(f"No labelled scoreboards of size {size[0]}x{size[1]} in {folder}")
+    corpus = []
+    for image_path, truth_path in by_size[size]:
+        with open(truth_path, "r", encoding="utf-8") as f:
+            corpus.append((image_path, expected_fields(json.load(f))))
+
+    n_rows = len(geometry["TEAM1_STARTS"]) + len(geometry["TEAM2_STARTS"])
+    player_fields = lambda fields: [f for f in fields if f[0] is not None]
+    match_fields = lambda fields: [f for f in fields if f[0] is None]
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        cache = ROICache(pool)
+        for _ in range(rounds):
+            dx, score = search_offset(cache, corpus, geometry, lambda g, d: shifted(g, X_SHIFT=d), player_fields)
+            geometry = shifted(geometry, X_SHIFT=dx)
+            print(f"X_SHIFT -> {geometry['X_SHIFT']} (agreement {score:.3f})")
+            for row in range(n_rows):
+                row_fields = lambda fields, row=row: [f for f in fields if f[0] == row]
+                dy, score = search_offset(cache, corpus, geometry,
+                                          lambda g, d, row=row: shifted(g, row=(row, d)), row_fields)
+                geometry = shifted(geometry, row=(row, dy))
+                print(f"row {row} start moved {dy:+d} (agreement {score:.3f})")
+            dx, _ = search_offset(cache, corpus, geometry, lambda g, d: shifted(g, MATCH_X_SHIFT=d), match_fields)
+            geometry = shifted(geometry, MATCH_X_SHIFT=dx)
+            dy, score = search_offset(cache, corpus, geometry, lambda g, d: shifted(g, MATCH_Y_SHIFT=d), match_fields)
+            geometry = shifted(geometry, MATCH_Y_SHIFT=dy)
+            print(f"MATCH shift -> ({geometry['MATCH_X_SHIFT']}, {geometry['MATCH_Y_SHIFT']}) "
+                  f"(agreement {score:.3f})")
+
+        total = score_candidates(cache, corpus, [geometry], lambda fields: fields)[0]
+        field_scales = fit_field_scales(cache, corpus, geometry) if fit_scales else None
+        print(f"{cache.recognized} ROIs recognized for {len(corpus)} scoreboards")
+    return geometry, field_scales, total, len(corpus)
+
+
+def write_profile(path, name, geometry, score, images, field_scales=None):
+    profile = {"name": name, "fitted_at": int(time.time()), "images": images,
+               "agreement": round(score, 4), "geometry": geometry}
+    if field_scales:
+        profile["field_scales"] = field_scales
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2)
+    os.replace(tmp, path)
+    return profile
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fit row starts and shifts to labelled scoreboards.")
+    parser.add_argument("folder", help="labelled scoreboards (image + .json ground truth, see synth.py)")
+    parser.add_argument("--profile", default=ocr.GEOMETRY_PROFILE, help="where to write the profile")
+    parser.add_argument("--name", help="profile name (default: the folder name)")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--no-scales", action="store_true", help="keep every field at full resolution")
+    parser.add_argument("--size", help="capture size to fit, as WxH, when the folder holds several")
+    args = parser.parse_args()
+    size = tuple(int(v) for v in args.size.lower().split("x")) if args.size else None
+
+    fitted, field_scales, score, images = calibrate(args.folder, workers=args.workers, rounds=args.rounds,
+                                                    fit_scales=not args.no_scales, size=size)
+    write_profile(args.profile, args.name or os.path.basename(os.path.normpath(args.folder)),
+                  fitted, score, images, field_scales)
+    print(f"Profile written to {args.profile} (agreement {score:.3f})")
+
+    sample = next(path for items in find_labelled(args.folder).values() for path, _ in items
+                  if size is None or image_size(path) == size)
+    stem = os.path.splitext(os.path.basename(args.profile))[0]
+    debug.draw_boxes(sample, f"debug_{stem}.png", fitted)
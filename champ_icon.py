@@ -1,26 +1,33 @@
+import io
 import os
 import json
+import hashlib
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
 import imagehash
 
 # -------------------------------
 # Config
 # -------------------------------
-ICON_FOLDER = "champion_icons"                 # input folder (.webp icons)
+ICON_SOURCE = "champion_icons.zip"             # input zip (or folder) of .webp icons
 OUTPUT_FOLDER = "champion_icons_scoreboard"    # cropped/resized icons
 HASH_JSON = "champion_hashes.json"             # output hash file
+MANIFEST_JSON = "champion_hashes.manifest.json"  # source digest + hash per icon
 TARGET_W, TARGET_H = 228, 101                  # scoreboard champ size
-os.makedirs(OUTPUT_FOLDER, exist_ok=True)
+# Bump when normalize_icon changes, so every icon is re-hashed
+NORMALIZE_VERSION = 1
 
 
 # -------------------------------
 # Functions
 # -------------------------------
-def normalize_icon(path, save_path, target_w=TARGET_W, target_h=TARGET_H):
+def normalize_icon(path, save_path=None, target_w=TARGET_W, target_h=TARGET_H):
     """
     Normalize champion icon to scoreboard format:
     1. Resize input to 256x256 (ensures consistency)
     2. Crop center slice to target_w x target_h (228x101)
+    path may be a filename or a file object.
     """
     img = Image.open(path).convert("RGB")
 
@@ -35,34 +42,88 @@ def normalize_icon(path, save_path, target_w=TARGET_W, target_h=TARGET_H):
     img_cropped = img.crop((left, top, right, bottom))
 
     # Save cropped version
-    img_cropped.save(save_path, "PNG")
+    if save_path:
+        img_cropped.save(save_path, "PNG")
     return img_cropped
 
 
-def build_hashes(icon_folder=ICON_FOLDER, output_folder=OUTPUT_FOLDER, hash_json=HASH_JSON):
+def iter_icons(source=ICON_SOURCE):
+    """(name, webp bytes) for every icon in a zip or a folder; name is the file stem."""
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as z:
+            for info in z.infolist():
+                if info.filename.lower().endswith(".webp"):
+                    yield os.path.splitext(os.path.basename(info.filename))[0], z.read(info)
+        return
+    for file in sorted(os.listdir(source)):
+        if file.lower().endswith(".webp"):
+            with open(os.path.join(source, file), "rb") as f:
+                yield os.path.splitext(file)[0], f.read()
+
+
+def _hash_icon(job):
+    """Worker: normalize one icon (optionally saving the PNG) and return its perceptual hash."""
+    name, data, save_path = job
+    return name, str(imagehash.phash(normalize_icon(io.BytesIO(data), save_path)))
+
+
+def _write_json_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def load_manifest(path=MANIFEST_JSON):
+    if not os.path.exists(path):
+        return {"version": NORMALIZE_VERSION, "icons": {}}
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != NORMALIZE_VERSION:
+        return {"version": NORMALIZE_VERSION, "icons": {}}
+    return manifest
+
+
+def build_hashes(source=ICON_SOURCE, output_folder=OUTPUT_FOLDER, hash_json=HASH_JSON,
+                 manifest_json=MANIFEST_JSON, workers=None):
     """
-    Normalize all icons and build perceptual hashes.
+    Normalize icons and build perceptual hashes. Only icons whose bytes changed since the
+    last run (per the manifest) are re-normalized, across a process pool; removed icons
+    are dropped. The hash book and then the manifest are replaced atomically.
+    Pass output_folder=None to skip writing the cropped PNGs.
     """
-    hashes = {}
-    for file in os.listdir(icon_folder):
-        if file.lower().endswith(".webp"):
-            name = os.path.splitext(file)[0]  # use file name as key
-            src = os.path.join(icon_folder, file)
-            dst = os.path.join(output_folder, name + ".png")
+    manifest = load_manifest(manifest_json)
+    known = manifest["icons"]
+    if output_folder:
+        os.makedirs(output_folder, exist_ok=True)
 
-            # Normalize (resize + crop)
-            icon = normalize_icon(src, dst)
+    current, jobs = {}, []
+    for name, data in iter_icons(source):
+        digest = hashlib.sha1(data).hexdigest()
+        current[name] = digest
+        entry = known.get(name)
+        png_missing = output_folder and not os.path.exists(os.path.join(output_folder, name + ".png"))
+        if entry is None or entry["sha1"] != digest or png_missing:
+            save_path = os.path.join(output_folder, name + ".png") if output_folder else None
+            jobs.append((name, data, save_path))
 
-            # Compute perceptual hash
-            champ_hash = str(imagehash.phash(icon))
-            hashes[name] = champ_hash
+    removed = sorted(set(known) - set(current))
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for name, champ_hash in pool.map(_hash_icon, jobs, chunksize=max(1, len(jobs) // 32)):
+                known[name] = {"sha1": current[name], "hash": champ_hash}
+    for name in removed:
+        del known[name]
 
-    # Save hashes JSON
-    with open(hash_json, "w") as f:
-        json.dump(hashes, f, indent=2)
+    hashes = {name: known[name]["hash"] for name in sorted(known)}
+    if jobs or removed or not os.path.exists(hash_json):
+        _write_json_atomic(hash_json, hashes)
+        _write_json_atomic(manifest_json, manifest)
 
-    print(f"✅ Processed {len(hashes)} icons")
-    print(f"✅ Cropped scoreboard-style icons saved to: {output_folder}")
+    print(f"✅ {len(hashes)} icons: {len(jobs)} re-hashed, {len(removed)} removed, "
+          f"{len(hashes) - len(jobs)} unchanged")
+    if output_folder and jobs:
+        print(f"✅ Cropped scoreboard-style icons saved to: {output_folder}")
     print(f"✅ Hashes saved to: {hash_json}")
     return hashes
 
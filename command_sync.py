@@ -0,0 +1,47 @@
+# command_sync.py — sync the slash command tree only when it actually changed
+import os
+import json
+import hashlib
+
+SYNC_STATE_JSON = "command_sync.json"
+
+
+def tree_fingerprint(tree, guild=None):
+    """SHA-256 of the payload tree.sync() would upload for this scope."""
+    payload = sorted((command.to_dict(tree) for command in tree.get_commands(guild=guild)),
+                     key=lambda c: (c.get("type", 1), c["name"]))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _scope(bot, guild):
+    return f"{bot.application_id}:{'global' if guild is None else f'guild:{guild.id}'}"
+
+
+def load_sync_state(path=SYNC_STATE_JSON):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_sync_state(state, path):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+async def sync_if_changed(bot, guild=None, state_path=SYNC_STATE_JSON):
+    """
+    Sync one scope (a guild, or global when guild is None) if its command tree differs
+    from the last one synced. Returns the number of commands synced, or None if skipped.
+    """
+    fingerprint = tree_fingerprint(bot.tree, guild)
+    state = load_sync_state(state_path)
+    scope = _scope(bot, guild)
+    if state.get(scope) == fingerprint:
+        return None
+    synced = await bot.tree.sync(guild=guild)
+    state[scope] = fingerprint
+    _save_sync_state(state, state_path)
+    return len(synced)
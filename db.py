@@ -1,9 +1,31 @@
+import os
 import sqlite3
+import unicodedata
+from datetime import datetime
+
+DB_PATH = "match_data.db"
+# Registrations used to live in their own database (written by register.py)
+LEGACY_PLAYERS_DB = "players.db"
+
+# Callbacks run after insert_scoreboard commits (see add_insert_listener)
+_insert_listeners = []
+
+
+def normalize_ign(ign):
+    """
+    Normalize an IGN for lookups: consistent Unicode form, trimmed and case-folded.
+    """
+    return unicodedata.normalize("NFC", ign).strip().casefold()
+
+
+def display_form(ign):
+    """The IGN as stored and shown: NFC-normalized, otherwise as typed."""
+    return unicodedata.normalize("NFC", ign)
 
 
 def create_database():
     # Connect to SQLite database (or create it if it doesn't exist)
-    conn = sqlite3.connect("match_data.db")
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
     # Create matches table
@@ -15,19 +37,59 @@ def create_database():
         map TEXT,
         team1_score INTEGER,
         team2_score INTEGER,
-        won INTEGER CHECK(won IN (0, 1)) -- 1 if team1 won, 0 otherwise
+        won INTEGER CHECK(won IN (0, 1)), -- 1 if team1 won, 0 otherwise
+        ingested_at TEXT -- UTC ISO time the scoreboard was stored
     );
     """)
+    _upgrade_matches_table(cursor)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_matches_ingested_at ON matches(ingested_at);
+    """)
 
-    # Create players table
+    # Create players table (the single player registry)
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS players (
         player_id INTEGER PRIMARY KEY AUTOINCREMENT,
         player_ign TEXT UNIQUE,
         discord_name TEXT,
-        discord_id TEXT UNIQUE
+        discord_id TEXT UNIQUE,
+        ign_normalized TEXT,
+        registered_at TEXT
+    );
+    """)
+    _upgrade_players_table(cursor)
+    # discord_id is already indexed through its UNIQUE constraint
+    collisions = _normalized_ign_collisions(cursor)
+    if collisions:
+        # Rows an older version allowed (IGNs differing only by case or Unicode form) would make
+        # the unique index fail; index them plainly until they are merged or renamed by hand
+        for ign_normalized, rows in collisions.items():
+            players = ", ".join(f"'{ign}' (player_id {player_id})" for player_id, ign in rows)
+            print(f"Warning: players {players} share the normalized IGN '{ign_normalized}'. "
+                  f"Merge or rename them to enable the unique IGN index.")
+        cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_players_ign_normalized_lookup ON players(ign_normalized);
+        """)
+    else:
+        cursor.execute("DROP INDEX IF EXISTS idx_players_ign_normalized_lookup;")
+        cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_players_ign_normalized ON players(ign_normalized);
+        """)
+
+    # Create IGN history table (one row per /changeign)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS player_ign_history (
+        history_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        player_id INTEGER,
+        old_ign TEXT,
+        new_ign TEXT,
+        changed_at TEXT,
+        FOREIGN KEY (player_id) REFERENCES players(player_id)
     );
     """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_ign_history_player ON player_ign_history(player_id);
+    """)
 
     # Create player_stats table
     cursor.execute("""
@@ -50,16 +112,157 @@ def create_database():
         FOREIGN KEY (player_id) REFERENCES players(player_id)
     );
     """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_player_stats_player ON player_stats(player_id);
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_player_stats_match ON player_stats(match_id);
+    """)
 
     # Commit changes and close connection
     conn.commit()
     conn.close()
 
 
-def insert_scoreboard(scoreboard):
+def _upgrade_matches_table(cursor):
+    """Add ingested_at to a matches table created by an older version (old rows stay NULL)."""
+    cursor.execute("PRAGMA table_info(matches);")
+    if "ingested_at" not in {row[1] for row in cursor.fetchall()}:
+        cursor.execute("ALTER TABLE matches ADD COLUMN ingested_at TEXT;")
+
+
+def _upgrade_players_table(cursor):
+    """
+    Add the registry columns to a players table created by an older version,
+    and fill in normalized IGNs for rows that do not have one yet.
+    """
+    cursor.execute("PRAGMA table_info(players);")
+    columns = {row[1] for row in cursor.fetchall()}
+    if "ign_normalized" not in columns:
+        cursor.execute("ALTER TABLE players ADD COLUMN ign_normalized TEXT;")
+    if "registered_at" not in columns:
+        cursor.execute("ALTER TABLE players ADD COLUMN registered_at TEXT;")
+
+    cursor.execute("""
+    SELECT player_id, player_ign FROM players
+    WHERE ign_normalized IS NULL AND player_ign IS NOT NULL;
+    """)
+    for player_id, player_ign in cursor.fetchall():
+        cursor.execute("""
+        UPDATE players SET ign_normalized = ? WHERE player_id = ?;
+        """, (normalize_ign(player_ign), player_id))
+
+
+def _normalized_ign_collisions(cursor):
+    """{ign_normalized: [(player_id, player_ign), ...]} for normalized IGNs held by more than one row."""
+    cursor.execute("""
+    SELECT ign_normalized, player_id, player_ign FROM players
+    WHERE ign_normalized IN (
+        SELECT ign_normalized FROM players WHERE ign_normalized IS NOT NULL
+        GROUP BY ign_normalized HAVING COUNT(*) > 1
+    )
+    ORDER BY ign_normalized, player_id;
+    """)
+    collisions = {}
+    for ign_normalized, player_id, player_ign in cursor.fetchall():
+        collisions.setdefault(ign_normalized, []).append((player_id, player_ign))
+    return collisions
+
+
+def migrate_legacy_players(legacy_path=LEGACY_PLAYERS_DB):
+    """
+    One-shot import of registrations from the old players.db into the players table.
+    The legacy file is renamed afterwards so the import never runs twice, but only once
+    every row made it in; otherwise it is left in place and the failed rows are listed.
+    """
+    if not os.path.exists(legacy_path):
+        return 0
+
+    create_database()
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    migrated, failed = 0, []
+
+    try:
+        with sqlite3.connect(legacy_path) as legacy:
+            rows = legacy.execute(
+                "SELECT discord_id, ign, registered_at FROM players").fetchall()
+
+        for discord_id, ign, registered_at in rows:
+            # The legacy columns are nullable; such rows cannot be registered
+            if not ign or discord_id is None:
+                failed.append((discord_id, ign))
+            elif _upsert_registration(cursor, ign, None, discord_id, registered_at):
+                migrated += 1
+            else:
+                failed.append((discord_id, ign))
+
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"An error occurred while migrating {legacy_path}: {e}")
+        conn.rollback()
+        return 0
+    finally:
+        conn.close()
+
+    print(f"Migrated {migrated} player(s) from {legacy_path}.")
+    if failed:
+        print(f"Could not migrate {len(failed)} player(s) (IGN or Discord ID missing or already registered); "
+              f"{legacy_path} was kept:")
+        for discord_id, ign in failed:
+            print(f"  '{ign}' (Discord ID {discord_id})")
+        return migrated
+    os.replace(legacy_path, legacy_path + ".migrated")
+    return migrated
+
+
+def _upsert_registration(cursor, player_ign, discord_name, discord_id, registered_at):
+    """
+    Attach a Discord registration to a player row. A row that already has the IGN
+    but no Discord ID (e.g. added by hand) is claimed instead of duplicated.
+    Returns False if the IGN belongs to a different Discord user.
+    """
+    ign_normalized = normalize_ign(player_ign)
+    cursor.execute("""
+    SELECT player_id FROM players WHERE discord_id = ?;
+    """, (str(discord_id),))
+    owner = cursor.fetchone()
+    cursor.execute("""
+    SELECT player_id, discord_id FROM players WHERE ign_normalized = ?;
+    """, (ign_normalized,))
+    row = cursor.fetchone()
+
+    if row:
+        if row[1] not in (None, str(discord_id)) or (owner and owner[0] != row[0]):
+            return False
+        cursor.execute("""
+        UPDATE players SET discord_id = ?, discord_name = COALESCE(?, discord_name),
+            registered_at = COALESCE(registered_at, ?)
+        WHERE player_id = ?;
+        """, (str(discord_id), discord_name, registered_at, row[0]))
+        return True
+    if owner:
+        return False
+
+    cursor.execute("""
+    INSERT INTO players (player_ign, discord_name, discord_id, ign_normalized, registered_at)
+    VALUES (?, ?, ?, ?, ?);
+    """, (display_form(player_ign), discord_name, str(discord_id),
+          ign_normalized, registered_at))
+    return True
+
+
+def insert_scoreboard(scoreboard, replace=False):
+    """
+    Store a parsed scoreboard. A match_id that is already stored is skipped (returns False)
+    unless replace is set: then its match and player_stats rows are swapped for the new ones
+    in the same transaction, keeping the original ingest time, and listeners get the old
+    rows as match["replaced"] so they can take them back out. Returns True once committed.
+    """
     # Connect to SQLite database
-    conn = sqlite3.connect("match_data.db")
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
+    replaced = None
 
     try:
         # Extract match data
@@ -68,28 +271,39 @@ def insert_scoreboard(scoreboard):
         team1_score = match["team1_score"]
         team2_score = match["team2_score"]
         won = 1 if team1_score > team2_score else 0
+        # Backfills may carry their original ingest time
+        ingested_at = match.get("ingested_at")
 
         # Check if the match already exists
         cursor.execute("""
         SELECT 1 FROM matches WHERE match_id = ?;
         """, (match_id,))
         if cursor.fetchone():
-            print(
-                f"Warning: Match with match_id {match_id} already exists. Skipping insertion.")
-            return
+            if not replace:
+                print(
+                    f"Warning: Match with match_id {match_id} already exists. Skipping insertion.")
+                return False
+            replaced = _delete_match(cursor, match_id)
+            # A match stored before ingested_at existed is not dated today: it gets the archive's
+            # time (as rollup.backfill_ingested_at would) or stays NULL
+            ingested_at = ingested_at or replaced["match"]["ingested_at"] or _archived_at(cursor, match_id)
+        else:
+            ingested_at = ingested_at or datetime.utcnow().isoformat()
 
         # Insert match data
         cursor.execute("""
-        INSERT INTO matches (match_id, time_minutes, region, map, team1_score, team2_score, won)
-        VALUES (?, ?, ?, ?, ?, ?, ?);
-        """, (match_id, match["time_minutes"], match["region"], match["map"], team1_score, team2_score, won))
+        INSERT INTO matches (match_id, time_minutes, region, map, team1_score, team2_score, won, ingested_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+        """, (match_id, match["time_minutes"], match["region"], match["map"], team1_score, team2_score, won,
+              ingested_at))
+        inserted = []
 
         # Insert players and their stats for team1
         for player in scoreboard["teams"]["team1"]:
             # Check if player exists in the players table
             cursor.execute("""
-            SELECT player_id FROM players WHERE player_ign = ?;
-            """, (player["player"],))
+            SELECT player_id FROM players WHERE ign_normalized = ?;
+            """, (normalize_ign(player["player"]),))
             result = cursor.fetchone()
 
             if result:
@@ -100,6 +314,8 @@ def insert_scoreboard(scoreboard):
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
                 """, (match_id, player_id, "team1", player["champion"], player["credits"], player["kills"], player["deaths"],
                       player["assists"], player["damage"], player["taken"], player["objective_time"], player["shielding"], player["healing"]))
+                inserted.append({"player_id": player_id, "ign_normalized": normalize_ign(player["player"]),
+                                 "team": "team1", "champion": player["champion"]})
             else:
                 print(f"Error: Player '{player['player']}' is not registered.")
 
@@ -107,8 +323,8 @@ def insert_scoreboard(scoreboard):
         for player in scoreboard["teams"]["team2"]:
             # Check if player exists in the players table
             cursor.execute("""
-            SELECT player_id FROM players WHERE player_ign = ?;
-            """, (player["player"],))
+            SELECT player_id FROM players WHERE ign_normalized = ?;
+            """, (normalize_ign(player["player"]),))
             result = cursor.fetchone()
 
             if result:
@@ -119,43 +335,327 @@ def insert_scoreboard(scoreboard):
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
                 """, (match_id, player_id, "team2", player["champion"], player["credits"], player["kills"], player["deaths"],
                       player["assists"], player["damage"], player["taken"], player["objective_time"], player["shielding"], player["healing"]))
+                inserted.append({"player_id": player_id, "ign_normalized": normalize_ign(player["player"]),
+                                 "team": "team2", "champion": player["champion"]})
             else:
                 print(f"Error: Player '{player['player']}' is not registered.")
 
         # Commit changes
         conn.commit()
-        print(f"Scoreboard for match_id {match_id} inserted successfully.")
+        print(f"Scoreboard for match_id {match_id} {'replaced' if replaced else 'inserted'} successfully.")
 
     except sqlite3.Error as e:
         print(f"An error occurred: {e}")
         conn.rollback()
+        return False
 
     finally:
         # Close the connection
         conn.close()
 
+    match = dict(match, won=won, ingested_at=ingested_at)
+    if replaced:
+        match["replaced"] = replaced
+    _notify_insert_listeners(match, inserted)
+    return True
+
+
+def _delete_match(cursor, match_id):
+    """
+    Delete a match and its player_stats rows (uncommitted). Returns what was stored, shaped like
+    the listener arguments: {"match": match row, "inserted": [player row, ...]}.
+    """
+    cursor.execute("""
+    SELECT match_id, time_minutes, region, map, team1_score, team2_score, won, ingested_at
+    FROM matches WHERE match_id = ?;
+    """, (match_id,))
+    columns = [c[0] for c in cursor.description]
+    old_match = dict(zip(columns, cursor.fetchone()))
+    cursor.execute("""
+    SELECT s.player_id, p.ign_normalized, s.team, s.champion, s.kills, s.deaths, s.assists, s.damage, s.healing
+    FROM player_stats s JOIN players p ON p.player_id = s.player_id
+    WHERE s.match_id = ?
+    ORDER BY s.player_stats_id;
+    """, (match_id,))
+    columns = [c[0] for c in cursor.description]
+    old_rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    cursor.execute("DELETE FROM player_stats WHERE match_id = ?;", (match_id,))
+    cursor.execute("DELETE FROM matches WHERE match_id = ?;", (match_id,))
+    return {"match": old_match, "inserted": old_rows}
+
+
+def _archived_at(cursor, match_id):
+    """The archive's archived_at for match_id as a UTC ISO time, or None without an archive row."""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'screenshots';")
+    if not cursor.fetchone():
+        return None
+    cursor.execute("SELECT replace(archived_at, ' ', 'T') FROM screenshots WHERE match_id = ?;", (match_id,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def add_insert_listener(callback):
+    """
+    Register callback(match, inserted) to run after insert_scoreboard commits a match.
+    match is the scoreboard's match dict plus 'won' and 'ingested_at'; inserted has one dict per stored
+    player row (player_id, ign_normalized, team, champion). When the match replaced a stored one,
+    match["replaced"] holds the old {"match": row, "inserted": rows}, the rows also carrying
+    kills, deaths, assists, damage and healing.
+    """
+    if callback not in _insert_listeners:
+        _insert_listeners.append(callback)
+
+
+def remove_insert_listener(callback):
+    if callback in _insert_listeners:
+        _insert_listeners.remove(callback)
+
+
+def _notify_insert_listeners(match, inserted):
+    for callback in list(_insert_listeners):
+        try:
+            callback(match, inserted)
+        except Exception as e:
+            print(f"Insert listener {callback.__name__} failed: {e}")
+
 
 def register_player(player_ign, discord_name, discord_id):
     """
     Registers a new player by adding their IGN, Discord name, and Discord ID to the players table.
+    Returns True on success, False if the IGN or Discord ID is already registered.
     """
-    conn = sqlite3.connect("match_data.db")
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
     try:
         cursor.execute("""
-        INSERT INTO players (player_ign, discord_name, discord_id)
-        VALUES (?, ?, ?);
-        """, (player_ign, discord_name, discord_id))
+        SELECT 1 FROM players WHERE discord_id = ?;
+        """, (str(discord_id),))
+        if cursor.fetchone() or not _upsert_registration(
+                cursor, player_ign, discord_name, discord_id, datetime.utcnow().isoformat()):
+            print(
+                f"Player with IGN '{player_ign}' or Discord ID '{discord_id}' already exists.")
+            return False
         conn.commit()
         print(f"Player {player_ign} registered successfully.")
+        return True
 
     except sqlite3.IntegrityError:
         print(
             f"Player with IGN '{player_ign}' or Discord ID '{discord_id}' already exists.")
+        return False
 
     except sqlite3.Error as e:
         print(f"An error occurred: {e}")
+        return False
 
     finally:
         conn.close()
+
+
+def change_player_ign(discord_id, new_ign):
+    """
+    Changes the IGN of a registered player and records the old one in player_ign_history.
+    Returns the old IGN, or None if the player is not registered or the IGN is taken.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("""
+        SELECT player_id, player_ign FROM players WHERE discord_id = ?;
+        """, (str(discord_id),))
+        row = cursor.fetchone()
+        if not row:
+            return None
+
+        player_id, old_ign = row
+        now = datetime.utcnow().isoformat()
+        cursor.execute("""
+        UPDATE players SET player_ign = ?, ign_normalized = ? WHERE player_id = ?;
+        """, (display_form(new_ign), normalize_ign(new_ign), player_id))
+        cursor.execute("""
+        INSERT INTO player_ign_history (player_id, old_ign, new_ign, changed_at)
+        VALUES (?, ?, ?, ?);
+        """, (player_id, old_ign, new_ign, now))
+        conn.commit()
+        print(f"Player {old_ign} renamed to {new_ign}.")
+        return old_ign
+
+    except sqlite3.IntegrityError:
+        print(f"IGN '{new_ign}' is already registered to another player.")
+        conn.rollback()
+        return None
+
+    except sqlite3.Error as e:
+        print(f"An error occurred: {e}")
+        conn.rollback()
+        return None
+
+    finally:
+        conn.close()
+
+
+def get_player_ign(discord_id):
+    """
+    Returns the IGN registered to a Discord ID, or None.
+    """
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute("""
+        SELECT player_ign FROM players WHERE discord_id = ?;
+        """, (str(discord_id),)).fetchone()
+    return row[0] if row else None
+
+
+def get_registered_players(include_unlinked=False):
+    """
+    Returns (discord_id, player_ign) for every player registered through Discord, ordered by IGN.
+    With include_unlinked, players without a Discord ID are listed too (discord_id is None).
+    """
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute("""
+        SELECT discord_id, player_ign FROM players
+        WHERE (discord_id IS NOT NULL OR ?) AND player_ign IS NOT NULL
+        ORDER BY player_ign;
+        """, (1 if include_unlinked else 0,)).fetchall()
+
+
+def get_ign_history(discord_id):
+    """
+    Returns (old_ign, new_ign, changed_at) rows for a Discord user, oldest first.
+    """
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute("""
+        SELECT h.old_ign, h.new_ign, h.changed_at FROM player_ign_history h
+        JOIN players p ON p.player_id = h.player_id
+        WHERE p.discord_id = ?
+        ORDER BY h.history_id;
+        """, (str(discord_id),)).fetchall()
+
+
+def get_stats_by_discord_id(discord_id):
+    """
+    Aggregate stats for a Discord user in a single indexed join.
+    Returns a dict, or None if the user has no recorded matches.
+    """
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute("""
+        SELECT
+            p.player_ign,
+            COUNT(*) AS matches,
+            SUM(CASE
+                WHEN (s.team = 'team1' AND m.team1_score > m.team2_score) OR
+                     (s.team = 'team2' AND m.team2_score > m.team1_score)
+                THEN 1 ELSE 0 END) AS wins,
+            SUM(s.kills), SUM(s.deaths), SUM(s.assists),
+            SUM(s.damage), SUM(s.healing)
+        FROM players p
+        JOIN player_stats s ON s.player_id = p.player_id
+        JOIN matches m ON m.match_id = s.match_id
+        WHERE p.discord_id = ?
+        GROUP BY p.player_id;
+        """, (str(discord_id),)).fetchone()
+
+    if not row:
+        return None
+    ign, matches, wins, kills, deaths, assists, damage, healing = row
+    return {
+        "player": ign,
+        "matches": matches,
+        "wins": wins,
+        "kills": kills,
+        "deaths": deaths,
+        "assists": assists,
+        "damage": damage,
+        "healing": healing,
+    }
+
+
+def get_winrate(player_ign):
+    """
+    Returns (wins, total_matches) for a player.
+    """
+    with sqlite3.connect(DB_PATH) as conn:
+        wins, total = conn.execute("""
+        SELECT
+            SUM(CASE
+                WHEN (s.team = 'team1' AND m.team1_score > m.team2_score) OR
+                     (s.team = 'team2' AND m.team2_score > m.team1_score)
+                THEN 1 ELSE 0 END),
+            COUNT(*)
+        FROM players p
+        JOIN player_stats s ON s.player_id = p.player_id
+        JOIN matches m ON m.match_id = s.match_id
+        WHERE p.ign_normalized = ?;
+        """, (normalize_ign(player_ign),)).fetchone()
+    return wins or 0, total
+
+
+def get_top_champions(player_ign, limit=5):
+    """
+    Returns (champion, matches, wins) for a player's most played champions.
+    """
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute("""
+        SELECT
+            s.champion,
+            COUNT(*) AS frequency,
+            SUM(CASE
+                WHEN (s.team = 'team1' AND m.team1_score > m.team2_score) OR
+                     (s.team = 'team2' AND m.team2_score > m.team1_score)
+                THEN 1 ELSE 0 END) AS wins
+        FROM players p
+        JOIN player_stats s ON s.player_id = p.player_id
+        JOIN matches m ON m.match_id = s.match_id
+        WHERE p.ign_normalized = ?
+        GROUP BY s.champion
+        ORDER BY frequency DESC
+        LIMIT ?;
+        """, (normalize_ign(player_ign), limit)).fetchall()
+
+
+def get_leaderboard(min_matches=5, limit=10):
+    """
+    Returns (player_ign, matches, wins) for the best winrates among players
+    with at least min_matches recorded.
+    """
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute("""
+        SELECT p.player_ign, COUNT(*) AS matches,
+            SUM(CASE
+                WHEN (s.team = 'team1' AND m.team1_score > m.team2_score) OR
+                     (s.team = 'team2' AND m.team2_score > m.team1_score)
+                THEN 1 ELSE 0 END) AS wins
+        FROM players p
+        JOIN player_stats s ON s.player_id = p.player_id
+        JOIN matches m ON m.match_id = s.match_id
+        GROUP BY p.player_id
+        HAVING matches >= ?
+        ORDER BY CAST(wins AS REAL) / matches DESC, matches DESC
+        LIMIT ?;
+        """, (min_matches, limit)).fetchall()
+
+
+def get_champion_pools(player_igns, top=3):
+    """
+    Returns {player_ign: [champion, ...]} with each player's top most played champions.
+    """
+    keys = [normalize_ign(ign) for ign in player_igns]
+    if not keys:
+        return {}
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute(f"""
+        SELECT p.ign_normalized, s.champion, COUNT(*) AS frequency
+        FROM players p
+        JOIN player_stats s ON s.player_id = p.player_id
+        WHERE p.ign_normalized IN ({', '.join('?' * len(keys))}) AND s.champion != 'Unknown'
+        GROUP BY p.player_id, s.champion
+        ORDER BY p.ign_normalized, frequency DESC;
+        """, keys).fetchall()
+
+    pools = {}
+    for key, champion, _ in rows:
+        pool = pools.setdefault(key, [])
+        if len(pool) < top:
+            pool.append(champion)
+    return {ign: pools.get(key, []) for ign, key in zip(player_igns, keys)}
@@ -1,7 +1,7 @@
 import sqlite3
 import json
 import unicodedata
-from db import insert_scoreboard, register_player, create_database
+from db import DB_PATH, insert_scoreboard, register_player, create_database
 
 
 def normalize_string(input_string):
@@ -32,39 +32,12 @@ def insert_scoreboard_from_file(json_file_path):
         print(f"An error occurred: {e}")
 
 
-def register_player(player_ign, discord_name, discord_id):
-    """
-    Registers a new player by adding their IGN, Discord name, and Discord ID to the players table.
-    """
-    player_ign = normalize_string(player_ign)  # Normalize the player IGN
-    conn = sqlite3.connect("match_data.db")
-    cursor = conn.cursor()
-
-    try:
-        cursor.execute("""
-        INSERT INTO players (player_ign, discord_name, discord_id)
-        VALUES (?, ?, ?);
-        """, (player_ign, discord_name, discord_id))
-        conn.commit()
-        print(f"Player {player_ign} registered successfully.")
-
-    except sqlite3.IntegrityError:
-        print(
-            f"Player with IGN '{player_ign}' or Discord ID '{discord_id}' already exists.")
-
-    except sqlite3.Error as e:
-        print(f"An error occurred: {e}")
-
-    finally:
-        conn.close()
-
-
 def get_player_winrate(player_ign):
     """
     Calculates and returns the winrate of a given player based on their IGN.
     """
     player_ign = normalize_string(player_ign)  # Normalize the player IGN
-    conn = sqlite3.connect("match_data.db")
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
     try:
@@ -110,7 +83,7 @@ def get_top_champions_with_winrate(player_ign):
     Lists the top 5 most played champions by a player based on frequency and their winrate per champion.
     """
     player_ign = normalize_string(player_ign)  # Normalize the player IGN
-    conn = sqlite3.connect("match_data.db")
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
     try:
@@ -1,51 +1,38 @@
 # debug_boxes_by_row_start.py
+import os
+import sys
+import json
 import cv2
 
+import ocr
+
 # -------------------------------
 # Config
 # -------------------------------
 IMG_PATH = "1273609932.png"
 OUT_PATH = "debug_all_boxes.png"
 
-# Column boxes are RELATIVE to a row's top (y_start). Do not change
-ADJUSTED_BOXES = {
-    "player":   (140, 0,    460, 62),
-    "credits":  (620, 0,    790, 100),
-    "KDA":      (795, 0,    1010, 100),
-    "damage":   (1020, 0,   1260, 100),
-    "taken":    (1270, 0,   1500, 100),
-    "objective_time": (1510, 0, 1650, 100),
-    "shielding":      (1660, 0, 1910, 100),
-    "healing":        (1920, 0, 2140, 100),
-}
-
-# You only change these: the absolute starting Y of each row
-# (Pre-filled with your current auto-calculated values as a starting point)
-TEAM1_STARTS = [60, 180, 302, 422, 544]
-TEAM2_STARTS = [927, 1042, 1160, 1274, 1392]
-
-# Global shifts if the entire table needs nudging left/right/up/down
-X_SHIFT = 122
-Y_SHIFT = 7
-
-# Match-level boxes (unchanged; independent of rows)
-MATCH_BOXES = {
-    "duration":     (150, 720, 400, 770),
-    "region":       (150, 770, 480, 820),
-    "map":          (150, 820, 650, 880),
-    "team1_score":  (1050, 670, 1090, 730),
-    "team2_score":  (1050, 830, 1090, 880),
-}
-MATCH_X_SHIFT = 370
-MATCH_Y_SHIFT = 32
+# Boxes and row geometry are ocr.py's own (PLAYER_BOXES, MATCH_BOXES, current_geometry()),
+# so the overlay always shows what the parser reads. Nudge them there or fit a profile
+# with calibrate.py.
+
+
+def load_profile(path):
+    """Geometry from a calibrate.py profile, on top of ocr.py's current geometry."""
+    with open(path, "r", encoding="utf-8") as f:
+        return dict(ocr.current_geometry(), **json.load(f)["geometry"])
+
 
 # -------------------------------
 # Drawing
 # -------------------------------
 
 
-def draw_boxes():
-    img = cv2.imread(IMG_PATH)
+def draw_boxes(img_path=IMG_PATH, out_path=OUT_PATH, geometry=None):
+    geometry = geometry or ocr.current_geometry()
+    img = cv2.imread(img_path)
+    x_shift, y_shift = geometry["X_SHIFT"], geometry["Y_SHIFT"]
+    match_x_shift, match_y_shift = geometry["MATCH_X_SHIFT"], geometry["MATCH_Y_SHIFT"]
 
     colors = {
         "player": (0, 255, 0),
@@ -64,38 +51,45 @@ def draw_boxes():
     }
 
     def draw_row(y_start):
-        for key, (x1, y1, x2, y2) in ADJUSTED_BOXES.items():
+        for key, (x1, y1, x2, y2) in ocr.PLAYER_BOXES.items():
             box = (
-                x1 + X_SHIFT,
-                y_start + y1 + Y_SHIFT,
-                x2 + X_SHIFT,
-                y_start + y2 + Y_SHIFT,
+                x1 + x_shift,
+                y_start + y1 + y_shift,
+                x2 + x_shift,
+                y_start + y2 + y_shift,
             )
             cv2.rectangle(img, (box[0], box[1]), (box[2], box[3]), colors.get(
                 key, (255, 255, 255)), 2)
             cv2.putText(img, key, (box[0], box[1] - 5), cv2.FONT_HERSHEY_SIMPLEX,
                         0.5, colors.get(key, (255, 255, 255)), 1)
 
-    # --- Team 1 rows (edit TEAM1_STARTS to adjust vertically)
-    for y in TEAM1_STARTS:
+    # --- Team 1 rows (ocr.TEAM1_STARTS or the profile's)
+    for y in geometry["TEAM1_STARTS"]:
         draw_row(y)
 
-    # --- Team 2 rows (edit TEAM2_STARTS to adjust vertically)
-    for y in TEAM2_STARTS:
+    # --- Team 2 rows (ocr.TEAM2_STARTS or the profile's)
+    for y in geometry["TEAM2_STARTS"]:
         draw_row(y)
 
     # --- Match data (independent)
-    for key, (x1, y1, x2, y2) in MATCH_BOXES.items():
-        box = (x1 + MATCH_X_SHIFT, y1 + MATCH_Y_SHIFT,
-               x2 + MATCH_X_SHIFT, y2 + MATCH_Y_SHIFT)
+    for key, (x1, y1, x2, y2) in ocr.MATCH_BOXES.items():
+        box = (x1 + match_x_shift, y1 + match_y_shift,
+               x2 + match_x_shift, y2 + match_y_shift)
         cv2.rectangle(img, (box[0], box[1]), (box[2], box[3]),
                       colors.get(key, (200, 200, 200)), 2)
         cv2.putText(img, key, (box[0], box[1] - 5), cv2.FONT_HERSHEY_SIMPLEX,
                     0.5, colors.get(key, (200, 200, 200)), 1)
 
-    cv2.imwrite(OUT_PATH, img)
-    print(f"Debug image written to {OUT_PATH}")
+    cv2.imwrite(out_path, img)
+    print(f"Debug image written to {out_path}")
 
 
 if __name__ == "__main__":
-    draw_boxes()
+    # python debug.py [image] [profile.json ...] -> one overlay per profile (or the defaults)
+    img_path = sys.argv[1] if len(sys.argv) > 1 else IMG_PATH
+    profiles = sys.argv[2:]
+    if not profiles:
+        draw_boxes(img_path)
+    for profile in profiles:
+        stem = os.path.splitext(os.path.basename(profile))[0]
+        draw_boxes(img_path, f"debug_{stem}.png", load_profile(profile))
@@ -0,0 +1,99 @@
+# dispatcher.py — route PaladinsAssistant replies to the >>match command waiting for them
+import re
+import asyncio
+
+ASSISTANT_NAME = "PaladinsAssistant"
+ASSISTANT_DISCRIMINATOR = "2894"
+MATCH_ID_PATTERN = re.compile(r"\d+")
+
+
+def is_assistant_reply(message):
+    author = message.author
+    return (author.name == ASSISTANT_NAME and author.discriminator == ASSISTANT_DISCRIMINATOR
+            and bool(message.attachments))
+
+
+def _mentioned_ids(message):
+    """Every number in the reply's content and embeds, as strings."""
+    texts = [message.content or ""]
+    for embed in getattr(message, "embeds", ()):
+        texts.append(embed.title or "")
+        texts.append(embed.description or "")
+        for field in getattr(embed, "fields", ()):
+            texts.append(f"{field.name} {field.value}")
+    return MATCH_ID_PATTERN.findall(" ".join(texts))
+
+
+class ReplyDispatcher:
+    """
+    Pending >>match requests keyed by (channel id, match id). A reply is routed in O(1):
+    by the command message it references, else by a pending match id it mentions, else to
+    the only request pending in its channel. Anything else is left unrouted.
+    """
+
+    def __init__(self):
+        self.pending = {}           # channel id -> {match id: future}
+        self.by_command = {}        # command message id -> (channel id, match id)
+        self.command_ids = {}       # (channel id, match id) -> command message id
+        self.unrouted = 0
+
+    def __len__(self):
+        return len(self.command_ids)
+
+    def is_pending(self, channel_id, match_id):
+        return match_id in self.pending.get(channel_id, {})
+
+    def expect(self, channel_id, match_id, command_id):
+        """Register a request; raises KeyError if this match is already pending in the channel."""
+        if self.is_pending(channel_id, match_id):
+            raise KeyError((channel_id, match_id))
+        future = asyncio.get_running_loop().create_future()
+        self.pending.setdefault(channel_id, {})[match_id] = future
+        self.by_command[command_id] = (channel_id, match_id)
+        self.command_ids[(channel_id, match_id)] = command_id
+        return future
+
+    def discard(self, channel_id, match_id):
+        waiting = self.pending.get(channel_id)
+        if not waiting or match_id not in waiting:
+            return
+        future = waiting.pop(match_id)
+        if not waiting:
+            del self.pending[channel_id]
+        if not future.done():
+            future.cancel()
+        self.by_command.pop(self.command_ids.pop((channel_id, match_id)), None)
+
+    async def wait(self, channel_id, match_id, command_id, timeout):
+        """Wait for the reply to one request; raises asyncio.TimeoutError after `timeout` seconds."""
+        future = self.expect(channel_id, match_id, command_id)
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.discard(channel_id, match_id)
+
+    def route(self, message):
+        """Hand an assistant reply to its waiter. Returns the match id it went to, or None."""
+        channel_id = message.channel.id
+        waiting = self.pending.get(channel_id)
+        if not waiting:
+            self.unrouted += 1
+            return None
+
+        match_id = None
+        reference = getattr(message, "reference", None)
+        if reference is not None:
+            key = self.by_command.get(reference.message_id)
+            if key is not None and key[0] == channel_id:
+                match_id = key[1]
+        if match_id is None:
+            match_id = next((m for m in _mentioned_ids(message) if m in waiting), None)
+        if match_id is None and len(waiting) == 1:
+            match_id = next(iter(waiting))
+
+        future = waiting.get(match_id)
+        if future is None or future.done():
+            self.unrouted += 1
+            return None
+        future.set_result(message)
+        return match_id
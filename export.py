@@ -0,0 +1,281 @@
+# export.py — incremental columnar export of match history for analysis
+import os
+import json
+import sqlite3
+import numpy as np
+
+from db import DB_PATH, add_insert_listener
+
+EXPORT_DIR = "match_export"
+MANIFEST = "manifest.json"
+
+# Column layout per table: (column, dtype). Dictionary-encoded columns store int16 codes.
+TABLES = {
+    "matches": [
+        ("match_id", "int64"),
+        ("time_minutes", "int32"),
+        ("region", "int16"),
+        ("map", "int16"),
+        ("team1_score", "int16"),
+        ("team2_score", "int16"),
+        ("won", "int8"),
+    ],
+    "player_stats": [
+        ("match_id", "int64"),
+        ("player_id", "int64"),
+        ("team", "int8"),          # 1 or 2
+        ("champion", "int16"),
+        ("credits", "int32"),
+        ("kills", "int32"),
+        ("deaths", "int32"),
+        ("assists", "int32"),
+        ("damage", "int32"),
+        ("taken", "int32"),
+        ("objective_time", "int32"),
+        ("shielding", "int32"),
+        ("healing", "int32"),
+    ],
+}
+DICTIONARY_COLUMNS = {"region", "map", "champion"}
+
+# Rows of the matches listed in the export_ids temp table
+QUERIES = {
+    "matches": """
+    SELECT match_id, time_minutes, region, map, team1_score, team2_score, won
+    FROM matches WHERE match_id IN (SELECT match_id FROM export_ids) ORDER BY match_id;
+    """,
+    "player_stats": """
+    SELECT match_id, player_id, CASE team WHEN 'team1' THEN 1 ELSE 2 END, champion,
+        credits, kills, deaths, assists, damage, taken, objective_time, shielding, healing
+    FROM player_stats WHERE match_id IN (SELECT match_id FROM export_ids) AND player_id IS NOT NULL
+    ORDER BY match_id, player_stats_id;
+    """,
+}
+
+
+# -------------------------------
+# Replaced matches
+# -------------------------------
+def create_export_tables(db_path=DB_PATH):
+    conn = sqlite3.connect(db_path)
+    # Matches rewritten by insert_scoreboard(..., replace=True) since the last export
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS export_pending (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        match_id INTEGER
+    );
+    """)
+    conn.commit()
+    conn.close()
+
+
+def note_replaced_match(match, inserted):
+    """Insert listener: remember re-parsed matches, whose exported rows are out of date."""
+    if not match.get("replaced"):
+        return
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        conn.execute("INSERT INTO export_pending (match_id) VALUES (?);", (match["match_id"],))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"An error occurred while noting a replaced match for export: {e}")
+    finally:
+        conn.close()
+
+
+def enable_export_tracking():
+    """Track replaced matches so the next export rewrites them; enable wherever matches get replaced."""
+    create_export_tables()
+    add_insert_listener(note_replaced_match)
+
+
+# -------------------------------
+# Manifest
+# -------------------------------
+def new_manifest():
+    return {
+        "rows": {table: 0 for table in TABLES},
+        "columns": {table: dict(cols) for table, cols in TABLES.items()},
+        "dictionaries": {name: [] for name in sorted(DICTIONARY_COLUMNS)},
+    }
+
+
+def load_manifest(export_dir=EXPORT_DIR):
+    path = os.path.join(export_dir, MANIFEST)
+    if not os.path.exists(path):
+        return new_manifest()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_manifest(manifest, export_dir):
+    path = os.path.join(export_dir, MANIFEST)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def _column_path(export_dir, table, column):
+    return os.path.join(export_dir, table, column + ".bin")
+
+
+def _exported_match_ids(manifest, export_dir):
+    """match_ids already in the export, read from its own match_id column."""
+    rows = manifest["rows"]["matches"]
+    if not rows:
+        return set()
+    return set(np.fromfile(_column_path(export_dir, "matches", "match_id"), dtype="int64", count=rows).tolist())
+
+
+# -------------------------------
+# Export
+# -------------------------------
+def export_incremental(db_path=DB_PATH, export_dir=EXPORT_DIR):
+    """
+    Append every match not exported yet (and its player_stats) to the column files.
+    Matches are picked by comparing the database's match_ids with the exported match_id
+    column rather than by a high-water mark, because matches are not stored in match_id
+    order; a late, lower id is appended after higher ones. If a match already in the export
+    was replaced since (see enable_export_tracking), everything is exported again from scratch.
+    The manifest is replaced last, so an interrupted run leaves trailing bytes that the next
+    run truncates away.
+    """
+    create_export_tables(db_path)
+    manifest = load_manifest(export_dir)
+    for table in TABLES:
+        os.makedirs(os.path.join(export_dir, table), exist_ok=True)
+
+    exported = _exported_match_ids(manifest, export_dir)
+    with sqlite3.connect(db_path) as conn:
+        pending = conn.execute("SELECT seq, match_id FROM export_pending;").fetchall()
+    seen_seq = max((seq for seq, _ in pending), default=0)
+    replaced = exported & {match_id for _, match_id in pending}
+    if replaced:
+        print(f"{len(replaced)} exported match(es) were replaced; exporting everything again.")
+        manifest, exported = new_manifest(), set()
+    dictionaries = manifest["dictionaries"]
+    codes = {name: {v: i for i, v in enumerate(values)} for name, values in dictionaries.items()}
+
+    with sqlite3.connect(db_path) as conn:
+        new_ids = [(match_id,) for (match_id,) in conn.execute("SELECT match_id FROM matches;")
+                   if match_id not in exported]
+        conn.execute("CREATE TEMP TABLE export_ids (match_id INTEGER PRIMARY KEY);")
+        conn.executemany("INSERT INTO export_ids (match_id) VALUES (?);", new_ids)
+        fetched = {table: conn.execute(sql).fetchall() for table, sql in QUERIES.items()}
+
+    if not fetched["matches"]:
+        _clear_pending(db_path, seen_seq)
+        print(f"Export is up to date ({len(exported)} matches).")
+        return manifest
+
+    for table, columns in TABLES.items():
+        rows = fetched[table]
+        expected_bytes = {name: manifest["rows"][table] * np.dtype(dtype).itemsize for name, dtype in columns}
+        for i, (name, dtype) in enumerate(columns):
+            values = [row[i] for row in rows]
+            if name in DICTIONARY_COLUMNS:
+                lookup = codes[name]
+                for v in values:
+                    if v not in lookup:
+                        lookup[v] = len(dictionaries[name])
+                        dictionaries[name].append(v)
+                values = [lookup[v] for v in values]
+            array = np.asarray([0 if v is None else v for v in values], dtype=dtype)
+
+            path = _column_path(export_dir, table, name)
+            with open(path, "ab") as f:
+                f.truncate(expected_bytes[name])
+                f.seek(expected_bytes[name])
+                f.write(array.tobytes())
+        manifest["rows"][table] += len(rows)
+
+    manifest.pop("watermark", None)  # written by older versions
+    _save_manifest(manifest, export_dir)
+    _clear_pending(db_path, seen_seq)
+    print(f"Exported {len(fetched['matches'])} matches and {len(fetched['player_stats'])} player rows "
+          f"({manifest['rows']['matches']} matches in total).")
+    return manifest
+
+
+def _clear_pending(db_path, seen_seq):
+    """Forget the replacements this export has accounted for (later ones keep their rows)."""
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DELETE FROM export_pending WHERE seq <= ?;", (seen_seq,))
+
+
+# -------------------------------
+# Loader
+# -------------------------------
+def load_export(export_dir=EXPORT_DIR):
+    """
+    Memory-map the exported columns. Returns {"matches": {col: array}, "player_stats": {...},
+    "dictionaries": {name: [values]}}; nothing is read until an array is touched.
+    """
+    manifest = load_manifest(export_dir)
+    data = {"dictionaries": manifest["dictionaries"]}
+    for table, columns in manifest["columns"].items():
+        rows = manifest["rows"][table]
+        data[table] = {
+            name: (np.memmap(_column_path(export_dir, table, name), dtype=dtype, mode="r", shape=(rows,))
+                   if rows else np.empty(0, dtype=dtype))
+            for name, dtype in columns.items()
+        }
+    return data
+
+
+def match_rows(data):
+    """Row in data["matches"] of each player_stats row's match."""
+    # Each export run is in match_id order but a later run can append lower ids,
+    # so search through a sorted view of the match_id column
+    match_ids = np.asarray(data["matches"]["match_id"])
+    order = np.argsort(match_ids, kind="stable")
+    return order[np.searchsorted(match_ids, data["player_stats"]["match_id"], sorter=order)]
+
+
+def champion_summary(data):
+    """Per champion: games, winrate and mean damage/healing, from the mapped columns."""
+    stats, matches = data["player_stats"], data["matches"]
+    champions = data["dictionaries"]["champion"]
+    n = len(champions)
+
+    match_row = match_rows(data)
+    team1_won = np.asarray(matches["won"])[match_row] == 1
+    won = np.where(np.asarray(stats["team"]) == 1, team1_won, ~team1_won)
+
+    champ = np.asarray(stats["champion"])
+    games = np.bincount(champ, minlength=n)
+    safe = np.maximum(games, 1)
+    wins = np.bincount(champ, weights=won, minlength=n)
+    damage = np.bincount(champ, weights=stats["damage"], minlength=n)
+    healing = np.bincount(champ, weights=stats["healing"], minlength=n)
+    return {
+        champions[i]: {
+            "games": int(games[i]),
+            "winrate": float(wins[i] / safe[i]),
+            "damage": float(damage[i] / safe[i]),
+            "healing": float(healing[i] / safe[i]),
+        }
+        for i in np.flatnonzero(games)
+    }
+
+
+def champion_pick_rates_by_map(data):
+    """(maps x champions) share of picks per map, plus the two label lists."""
+    stats, matches = data["player_stats"], data["matches"]
+    maps, champions = data["dictionaries"]["map"], data["dictionaries"]["champion"]
+
+    match_row = match_rows(data)
+    map_code = np.asarray(matches["map"])[match_row].astype(np.int64)
+    cell = map_code * len(champions) + np.asarray(stats["champion"])
+    counts = np.bincount(cell, minlength=len(maps) * len(champions)).reshape(len(maps), len(champions))
+    totals = np.maximum(counts.sum(axis=1, keepdims=True), 1)
+    return counts / totals, maps, champions
+
+
+if __name__ == "__main__":
+    export_incremental()
+    summary = champion_summary(load_export())
+    for champion, s in sorted(summary.items(), key=lambda item: -item[1]["games"]):
+        print(f"{champion}: {s['games']} games, Winrate: {s['winrate'] * 100:.2f}%, "
+              f"Damage: {s['damage']:.0f}, Healing: {s['healing']:.0f}")
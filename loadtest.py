@@ -0,0 +1,321 @@
+# loadtest.py — drive the >>match flow offline with fake Discord objects and a local image server
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import numpy as np
+from aiohttp import web
+
+from dispatcher import ASSISTANT_NAME, ASSISTANT_DISCRIMINATOR
+from ocr_worker import OCRWorkerPool
+
+LAG_INTERVAL = 0.01
+FIRST_MATCH_ID = 2_000_000
+
+
+# -------------------------------
+# Discord stand-ins
+# -------------------------------
+class FakeUser:
+    def __init__(self, name, discriminator="0", user_id=0):
+        self.name = name
+        self.discriminator = discriminator
+        self.id = user_id
+        self.bot = name == ASSISTANT_NAME
+
+    def __str__(self):
+        return self.name
+
+
+class FakeChannel:
+    """Records everything the bot sends, with a timestamp."""
+
+    def __init__(self, channel_id):
+        self.id = channel_id
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append((time.perf_counter(), content))
+
+
+class FakeAttachment:
+    def __init__(self, url, filename):
+        self.url = url
+        self.filename = filename
+
+
+class FakeEmbed:
+    def __init__(self, title="", description=""):
+        self.title = title
+        self.description = description
+
+
+class FakeReference:
+    def __init__(self, message_id, channel_id):
+        self.message_id = message_id
+        self.channel_id = channel_id
+
+
+class FakeMessage:
+    _next_id = 1
+
+    def __init__(self, author, channel, content="", attachments=(), embeds=(), reference=None):
+        self.id = FakeMessage._next_id
+        FakeMessage._next_id += 1
+        self.author = author
+        self.channel = channel
+        self.content = content
+        self.attachments = list(attachments)
+        self.embeds = list(embeds)
+        self.reference = reference
+
+
+# -------------------------------
+# Local attachment server
+# -------------------------------
+def make_payloads(match_ids, images_dir=None, size_kb=256):
+    """{match_id: image bytes}; real scoreboards cycled from images_dir, else filler tagged with the id."""
+    if images_dir:
+        files = sorted(os.path.join(images_dir, f) for f in os.listdir(images_dir)
+                       if f.lower().endswith((".png", ".jpg", ".jpeg")))
+        if not files:
+            raise SystemExit(f"No images found in {images_dir}")
+        payloads = {}
+        for i, match_id in enumerate(match_ids):
+            with open(files[i % len(files)], "rb") as f:
+                # Tag each copy so every match has distinct bytes
+                payloads[match_id] = f.read() + f"\n{match_id}".encode()
+        return payloads
+    filler = os.urandom(size_kb * 1024)
+    return {match_id: f"scoreboard:{match_id}\n".encode() + filler for match_id in match_ids}
+
+
+async def start_server(payloads, host="127.0.0.1"):
+    async def handle(request):
+        data = payloads.get(request.match_info["match_id"])
+        if data is None:
+            raise web.HTTPNotFound()
+        return web.Response(body=data, content_type="image/png")
+
+    app = web.Application()
+    app.router.add_get("/attachments/{match_id}.png", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    sock = socket.socket()
+    sock.bind((host, 0))
+    await web.SockSite(runner, sock).start()
+    port = sock.getsockname()[1]
+    return runner, f"http://{host}:{port}/attachments"
+
+
+# -------------------------------
+# OCR stand-in
+# -------------------------------
+def fake_scoreboard(match_id):
+    player = {"champion": "Unknown", "player": "", "credits": 0, "kills": 0, "deaths": 0, "assists": 0,
+              "damage": 0, "taken": 0, "objective_time": 0, "shielding": 0, "healing": 0}
+    return {
+        "match": {"time_minutes": 10, "region": "North America", "map": "Frog Isle",
+                  "team1_score": 4, "team2_score": 0, "match_id": int(match_id)},
+        "teams": {"team1": [dict(player) for _ in range(5)], "team2": [dict(player) for _ in range(5)]},
+    }
+
+
+def fake_worker(delay):
+    """
+    Stand-in for ocr_worker.serve(): same ready line and job protocol, but each job just
+    sleeps for `delay` seconds and writes a minimal scoreboard.
+    """
+    print(json.dumps({"ready": True, "pid": os.getpid()}), flush=True)
+    for line in sys.stdin:
+        job = json.loads(line)
+        time.sleep(delay)
+        match_id = job.get("match_id") or "".join(filter(str.isdigit, os.path.basename(job["image_path"])))
+        with open(job["output_path"], "w", encoding="utf-8") as f:
+            json.dump(fake_scoreboard(match_id), f)
+        print(json.dumps({"ok": True, "ms": delay * 1000}), flush=True)
+
+
+def checking_ocr(ocr, expected, mismatches):
+    """Wrap run.run_ocr so it records matches whose downloaded image is not their own."""
+    async def run(image_path, match_id, output_path):
+        with open(image_path, "rb") as f:
+            if hashlib.sha1(f.read()).hexdigest() != expected[match_id]:
+                mismatches.append(match_id)
+        return await ocr(image_path, match_id, output_path)
+    return run
+
+
+# -------------------------------
+# Load generation
+# -------------------------------
+async def measure_lag(samples, stop):
+    while not stop.is_set():
+        expected = time.perf_counter() + LAG_INTERVAL
+        await asyncio.sleep(LAG_INTERVAL)
+        samples.append(max(0.0, time.perf_counter() - expected))
+
+
+async def drive(bot, on_message, match_ids, base_url, channels, rate, reply_delay, rng):
+    """
+    Issue one >>match per id (Poisson arrivals at `rate`/s, or all at once when rate is 0),
+    each followed by the assistant's reply after a random delay, so replies interleave.
+    Returns {match_id: (command start, channel)}.
+    """
+    user = FakeUser("loadtest", user_id=1)
+    assistant = FakeUser(ASSISTANT_NAME, ASSISTANT_DISCRIMINATOR, user_id=2)
+    started = {}
+    tasks = []
+
+    async def reply(command, match_id):
+        await asyncio.sleep(rng.uniform(0, reply_delay))
+        message = FakeMessage(
+            assistant, command.channel,
+            attachments=[FakeAttachment(f"{base_url}/{match_id}.png", f"{match_id}.png")],
+            embeds=[FakeEmbed(title=f"Match {match_id}")],
+            reference=FakeReference(command.id, command.channel.id),
+        )
+        bot.dispatch("message", message)
+
+    for i, match_id in enumerate(match_ids):
+        if rate:
+            await asyncio.sleep(rng.expovariate(rate))
+        channel = channels[i % len(channels)]
+        command = FakeMessage(user, channel, content=f">>match {match_id}")
+        started[match_id] = (time.perf_counter(), channel)
+        tasks.append(asyncio.create_task(on_message(command)))
+        tasks.append(asyncio.create_task(reply(command, match_id)))
+    await asyncio.gather(*tasks)
+    return started
+
+
+def summarize(started, channels, elapsed, lag, mismatches):
+    latencies = []
+    completed = failed = 0
+    for channel in channels:
+        for sent_at, content in channel.sent:
+            match_id = content.rsplit(" ", 1)[-1] if content else ""
+            if content and content.startswith("Processed image for match") and match_id in started:
+                latencies.append(sent_at - started[match_id][0])
+                completed += 1
+            else:
+                failed += 1
+    latencies = np.array(latencies) if latencies else np.zeros(1)
+    lag = np.array(lag) if lag else np.zeros(1)
+    return {
+        "commands": len(started),
+        "completed": completed,
+        "failed": failed,
+        "wrong_image": len(mismatches),
+        "elapsed_s": elapsed,
+        "throughput_per_s": completed / elapsed if elapsed else 0.0,
+        "latency_p50_s": float(np.percentile(latencies, 50)),
+        "latency_p95_s": float(np.percentile(latencies, 95)),
+        "latency_p99_s": float(np.percentile(latencies, 99)),
+        "latency_max_s": float(latencies.max()),
+        "loop_lag_p99_s": float(np.percentile(lag, 99)),
+        "loop_lag_max_s": float(lag.max()),
+        "loop_blocked_s": float(lag[lag > 0.05].sum()),
+    }
+
+
+async def run_load(args):
+    workdir = tempfile.mkdtemp(prefix="loadtest_")
+    here = os.path.dirname(os.path.abspath(__file__))
+    sys.path.insert(0, here)
+    # The bot creates its database in the working directory on import
+    os.chdir(workdir)
+    import run
+
+    run.SAVE_DIR = workdir
+    # Entering the client initializes it for dispatch without logging in; run.setup_hook() only
+    # runs on login, so the OCR pool is started directly
+    async with run.bot as bot:
+        return await drive_bot(args, run, bot, workdir)
+
+
+async def drive_bot(args, run, bot, workdir):
+    from metrics import bot_metrics
+    # Only the >>match path is under test; skip prefix command parsing
+    async def no_commands(message):
+        pass
+    bot.process_commands = no_commands
+
+    match_ids = [str(FIRST_MATCH_ID + i) for i in range(args.commands)]
+    payloads = make_payloads(match_ids, args.images, args.image_kb)
+    expected = {m: hashlib.sha1(data).hexdigest() for m, data in payloads.items()}
+    mismatches = []
+    if not args.real_ocr:
+        run.ocr_pool = OCRWorkerPool(args.workers, command=[sys.executable, os.path.abspath(__file__),
+                                                           "--fake-worker", str(args.ocr_delay)])
+    else:
+        run.ocr_pool = OCRWorkerPool(args.workers)
+    ready = await run.ocr_pool.start()
+    run.run_ocr = checking_ocr(run.run_ocr, expected, mismatches)
+
+    runner, base_url = await start_server(payloads)
+    channels = [FakeChannel(100 + i) for i in range(args.channels)]
+    lag, stop = [], asyncio.Event()
+    lag_task = asyncio.create_task(measure_lag(lag, stop))
+    t0 = time.perf_counter()
+    try:
+        started = await drive(bot, run.on_message, match_ids, base_url, channels,
+                              args.rate, args.reply_delay, random.Random(args.seed))
+    finally:
+        elapsed = time.perf_counter() - t0
+        stop.set()
+        await lag_task
+        await runner.cleanup()
+        await run.ocr_pool.close()
+
+    result = summarize(started, channels, elapsed, lag, mismatches)
+    result["reply_timeouts"] = bot_metrics.get("match_reply_timeouts_total") or 0
+    result["ocr_workers_ready_s"] = ready
+    result["workdir"] = workdir
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the >>match flow without Discord.")
+    parser.add_argument("--commands", type=int, default=50, help="number of >>match commands")
+    parser.add_argument("--channels", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=0.0, help="commands per second (0: all at once)")
+    parser.add_argument("--reply-delay", type=float, default=2.0, help="max assistant reply delay, seconds")
+    parser.add_argument("--ocr-delay", type=float, default=0.5, help="seconds the OCR stand-in takes")
+    parser.add_argument("--workers", type=int, default=4, help="OCR worker processes")
+    parser.add_argument("--real-ocr", action="store_true", help="run ocr.py instead of the stand-in")
+    parser.add_argument("--images", help="folder of scoreboards to serve (default: random bytes)")
+    parser.add_argument("--image-kb", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    parser.add_argument("--fake-worker", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.fake_worker is not None:
+        fake_worker(args.fake_worker)
+        return
+    if args.real_ocr and not args.images:
+        parser.error("--real-ocr needs --images")
+
+    result = asyncio.run(run_load(args))
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['commands']} commands over {args.channels} channel(s) in {result['elapsed_s']:.2f}s: "
+          f"{result['completed']} completed, {result['failed']} failed, "
+          f"{result['wrong_image']} parsed someone else's image, {result['reply_timeouts']} reply timeouts")
+    print(f"OCR workers ({args.workers}) ready in {result['ocr_workers_ready_s']:.2f}s")
+    print(f"Throughput: {result['throughput_per_s']:.2f} matches/s")
+    print(f"Latency: p50 {result['latency_p50_s']:.2f}s, p95 {result['latency_p95_s']:.2f}s, "
+          f"p99 {result['latency_p99_s']:.2f}s, max {result['latency_max_s']:.2f}s")
+    print(f"Event loop: lag p99 {result['loop_lag_p99_s'] * 1000:.0f}ms, max {result['loop_lag_max_s'] * 1000:.0f}ms, "
+          f"blocked {result['loop_blocked_s']:.2f}s in total")
+
+
+if __name__ == "__main__":
+    main()
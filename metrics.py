@@ -0,0 +1,228 @@
+# metrics.py — low-overhead stage timers, counters and histograms
+import os
+import sys
+import json
+import time
+import bisect
+from contextlib import contextmanager
+
+# Latency buckets in milliseconds (upper bounds); the last bucket is +Inf
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+# Same bounds in seconds, for Prometheus-style metrics
+LATENCY_BUCKETS_S = tuple(b / 1000 for b in LATENCY_BUCKETS_MS)
+SIZE_BUCKETS_BYTES = (16_384, 65_536, 262_144, 1_048_576, 4_194_304, 16_777_216)
+
+
+class Histogram:
+    """Fixed-bucket histogram; cheap to observe and to merge across processes."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def merge(self, other):
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (inf for the overflow bucket)."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def summary(self):
+        mean = self.sum / self.count if self.count else 0.0
+        return (f"n={self.count} mean={mean:.1f} p50<={self.quantile(0.5)} "
+                f"p95<={self.quantile(0.95)} p99<={self.quantile(0.99)}")
+
+
+class StageTrace:
+    """
+    Per-scoreboard record of where time went. stage() accumulates wall time under a
+    name (repeated stages, e.g. one OCR column over ten rows, add up); count() bumps
+    a counter.
+    """
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.stages = {}
+        self.counters = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - t0)
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def record(self):
+        return dict(
+            self.fields,
+            total_ms=round(self.total_ms(), 3),
+            stages_ms={k: round(v * 1000, 3) for k, v in self.stages.items()},
+            counters=dict(self.counters),
+        )
+
+
+class NullTrace(StageTrace):
+    """Trace that records nothing, for callers that do not care."""
+
+    @contextmanager
+    def stage(self, name):
+        yield
+
+    def count(self, name, n=1):
+        pass
+
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and histograms with optional labels, rendered in
+    the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics = {}  # name -> [type, help, buckets, {label tuple: value or Histogram}]
+
+    def _series(self, kind, name, help_text, buckets=None):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = [kind, help_text, buckets, {}]
+        return metric[3]
+
+    def describe(self, kind, name, help_text, buckets=None):
+        """Declare a metric up front so it is exported (as zero) before its first update."""
+        self._series(kind, name, help_text, buckets)
+
+    def inc(self, name, value=1, help_text="", **labels):
+        series = self._series("counter", name, help_text)
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, help_text="", **labels):
+        self._series("gauge", name, help_text)[tuple(sorted(labels.items()))] = value
+
+    def add(self, name, value, help_text="", **labels):
+        series = self._series("gauge", name, help_text)
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+
+    def observe(self, name, value, help_text="", buckets=LATENCY_BUCKETS_S, **labels):
+        series = self._series("histogram", name, help_text, buckets)
+        key = tuple(sorted(labels.items()))
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = Histogram(self._metrics[name][2] or buckets)
+        hist.observe(value)
+
+    @contextmanager
+    def time(self, name, help_text="", **labels):
+        """Observe the wall time of a block, in seconds."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, help_text, **labels)
+
+    def get(self, name, **labels):
+        metric = self._metrics.get(name)
+        return metric[3].get(tuple(sorted(labels.items()))) if metric else None
+
+    def series(self, name):
+        """{label tuple: value or Histogram} for every series of a metric."""
+        metric = self._metrics.get(name)
+        return dict(metric[3]) if metric else {}
+
+    def render(self):
+        lines = []
+        for name, (kind, help_text, _, series) in sorted(self._metrics.items()):
+            if help_text:
+                lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in sorted(series.items()):
+                if kind != "histogram":
+                    lines.append(f"{name}{_labels(key)} {value}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(value.buckets + (float("inf"),), value.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(key + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(key)} {value.sum}")
+                lines.append(f"{name}_count{_labels(key)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(key):
+    if not key:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in key)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + "}"
+
+
+# Shared metrics for the bot process
+bot_metrics = MetricsRegistry()
+
+
+def append_record(path, record):
+    """Append one JSON record per line."""
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def stage_histograms(records):
+    """Histogram per stage (plus 'total') over an iterable of trace records."""
+    histograms = {}
+    for record in records:
+        histograms.setdefault("total", Histogram()).observe(record["total_ms"])
+        for stage, ms in record["stages_ms"].items():
+            histograms.setdefault(stage, Histogram()).observe(ms)
+    return histograms
+
+
+def read_records(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+if __name__ == "__main__":
+    # Summarize a per-scoreboard log, e.g. `python metrics.py ocr_metrics.jsonl`
+    log_path = sys.argv[1] if len(sys.argv) > 1 else "ocr_metrics.jsonl"
+    if not os.path.exists(log_path):
+        print(f"No metrics log found: {log_path}")
+        sys.exit(1)
+    records = list(read_records(log_path))
+    totals = {}
+    for record in records:
+        for name, n in record["counters"].items():
+            totals[name] = totals.get(name, 0) + n
+    print(f"{len(records)} scoreboard(s) in {log_path}")
+    for stage, hist in sorted(stage_histograms(records).items(), key=lambda item: -item[1].sum):
+        print(f"  {stage:<24} {hist.summary()} (ms)")
+    for name, n in sorted(totals.items()):
+        print(f"  {name:<24} {n}")
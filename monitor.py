@@ -0,0 +1,122 @@
+from discord.ext import commands
+from aiohttp import web
+import asyncio
+import os
+import sys
+import time
+import traceback
+from metrics import bot_metrics
+
+# Local Prometheus endpoint: http://127.0.0.1:9108/metrics
+METRICS_HOST = os.environ.get("BOT_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("BOT_METRICS_PORT", "9108"))
+# How often the event loop is asked to wake up; lateness beyond this is lag
+LOOP_LAG_INTERVAL = 0.5
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class MonitorCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.runner = None
+        self.lag_task = None
+
+    async def cog_load(self):
+        bot_metrics.describe("histogram", "event_loop_lag_seconds",
+                             "How late the event loop woke up for a timer", LOOP_LAG_BUCKETS)
+        self.lag_task = asyncio.create_task(self.measure_loop_lag())
+        try:
+            app = web.Application()
+            app.router.add_get("/metrics", self.handle_metrics)
+            self.runner = web.AppRunner(app)
+            await self.runner.setup()
+            await web.TCPSite(self.runner, METRICS_HOST, METRICS_PORT).start()
+            print(f"Metrics endpoint listening on http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            print(f"Failed to start metrics endpoint: {e}")
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def cog_unload(self):
+        if self.lag_task:
+            self.lag_task.cancel()
+        if self.runner:
+            await self.runner.cleanup()
+
+    async def handle_metrics(self, request):
+        return web.Response(text=bot_metrics.render(), content_type="text/plain", charset="utf-8")
+
+    async def measure_loop_lag(self):
+        while True:
+            expected = time.perf_counter() + LOOP_LAG_INTERVAL
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            lag = max(0.0, time.perf_counter() - expected)
+            bot_metrics.observe("event_loop_lag_seconds", lag, buckets=LOOP_LAG_BUCKETS)
+            bot_metrics.set("event_loop_lag_last_seconds", lag, "Most recent event loop lag sample")
+
+    # -------------------------------
+    # Command latency
+    # -------------------------------
+    @commands.Cog.listener()
+    async def on_command(self, ctx: commands.Context):
+        ctx.metrics_started = time.perf_counter()
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx: commands.Context):
+        self.observe_command(ctx, "ok")
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx: commands.Context, error):
+        # A listener replaces discord.py's default error printout; print the traceback as it did
+        print(f"Ignoring exception in command {ctx.command}:", file=sys.stderr)
+        traceback.print_exception(type(error), error, error.__traceback__, file=sys.stderr)
+        self.observe_command(ctx, "error")
+
+    def observe_command(self, ctx: commands.Context, status):
+        started = getattr(ctx, "metrics_started", None)
+        if started is None or ctx.command is None:
+            return
+        cog = ctx.command.cog_name or "none"
+        bot_metrics.observe("command_latency_seconds", time.perf_counter() - started,
+                            "Command latency per cog command", cog=cog, command=ctx.command.qualified_name)
+        bot_metrics.inc("commands_total", 1, "Commands handled", cog=cog,
+                        command=ctx.command.qualified_name, status=status)
+
+    # -------------------------------
+    # Admin view
+    # -------------------------------
+    @commands.hybrid_command(name="metrics", description="Show bot metrics (admin only)")
+    async def metrics(self, ctx: commands.Context):
+        print(f"Received metrics command from {ctx.author}")
+        if not ctx.guild or not ctx.author.guild_permissions.administrator:
+            await ctx.send("You need admin permissions to view metrics!")
+            return
+
+        def hist_line(label, name, **labels):
+            hist = bot_metrics.get(name, **labels)
+            if hist is None or not hist.count:
+                return f"{label}: no samples"
+            return (f"{label}: n={hist.count} mean={hist.sum / hist.count * 1000:.0f}ms "
+                    f"p95<={hist.quantile(0.95) * 1000:.0f}ms")
+
+        lines = [
+            "**Bot metrics:**",
+            f">>match requests: {bot_metrics.get('match_requests_total') or 0}, "
+            f"in flight: {bot_metrics.get('match_in_flight') or 0}",
+            hist_line("Assistant reply wait", "match_reply_wait_seconds"),
+            hist_line("Download", "match_download_seconds"),
+            f"Downloaded: {(bot_metrics.get('match_download_bytes_total') or 0) / 1_048_576:.1f} MiB",
+            hist_line("OCR", "match_ocr_seconds"),
+            hist_line("DB insert", "match_db_insert_seconds"),
+            hist_line("Event loop lag", "event_loop_lag_seconds"),
+        ]
+        slowest = sorted(((h.sum / h.count, dict(k)["command"]) for k, h in
+                          bot_metrics.series("command_latency_seconds").items() if h.count), reverse=True)[:5]
+        if slowest:
+            lines.append("Slowest commands: " + ", ".join(f"{c} {m * 1000:.0f}ms" for m, c in slowest))
+        lines.append(f"Prometheus: `http://{METRICS_HOST}:{METRICS_PORT}/metrics`")
+        await ctx.send("\n".join(lines))
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MonitorCog(bot))
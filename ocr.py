@@ -8,22 +8,50 @@ import imagehash
 import pytesseract
 import re
 import sys
+import cProfile
 from typing import Dict
 
+from registry import registry, WhitelistIndex
+from metrics import StageTrace, NullTrace, append_record
+from vocab import VocabRecognizer, load_learned, VOCAB_TEMPLATES
+
 # -------------------------------
 # Paths / IO
 # -------------------------------
 pytesseract.pytesseract.tesseract_cmd = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
 
-IMG_PATH = sys.argv[1]
 HASH_JSON = "champion_hashes.json"
+MAP_WHITELIST_JSON = "maps.json"      # "maps" and "regions"
 OUTPUT_JSON = "parsed_scoreboard2.json"
+PLAYER_WHITELIST_JSON = "players.json"   # lobby list, used when nobody is registered
+
+# Max edit distance when re-pairing leftover names against the full roster
+RECONCILE_MAX_DISTANCE = 5
+
+# Bump whenever a change alters what gets parsed, so archived matches can be re-parsed
+# (archive.py stale)
+PARSE_VERSION = 1
+
+# Per-scoreboard stage timings are appended here (one JSON record per line)
+METRICS_LOG = os.environ.get("OCR_METRICS_LOG", "ocr_metrics.jsonl")
+# Opt-in: dump a cProfile for any scoreboard slower than this many milliseconds
+PROFILE_SLOW_MS = float(os.environ["OCR_PROFILE_SLOW_MS"]) if os.environ.get("OCR_PROFILE_SLOW_MS") else None
+PROFILE_DIR = os.environ.get("OCR_PROFILE_DIR", ".")
+
+NULL_TRACE = NullTrace()
 
 # -------------------------------
 # Geometry (from debug.py)
 # -------------------------------
 ICON_W, ICON_H = 228, 101
 
+# Portrait locator: only the left strip is searched, at reduced resolution
+PORTRAIT_STRIP_W = ICON_W + 30
+LOCATOR_SCALE = 0.25
+LOCATOR_EDGE_THRESHOLD = 24     # gradient magnitude that counts as portrait texture
+LOCATOR_ROW_FILL = 0.2          # share of textured pixels for a row to belong to a portrait
+LOCATOR_ASPECT_TOLERANCE = 0.25
+
 # Column boxes RELATIVE to the row's top (y_start)
 PLAYER_BOXES = {
     "player":   (140, 0, 460, 62),   # height 62 per debug
@@ -55,6 +83,37 @@ MATCH_BOXES = {
 MATCH_X_SHIFT = 370
 MATCH_Y_SHIFT = 32
 
+# Resolution ladder: each field is first read from its ROI downscaled by FIELD_SCALES[key],
+# and re-read at full resolution only when that text does not parse (FIELD_CHECKS).
+# calibrate.py fits the scales; 1.0 everywhere reads at native resolution only.
+FIELD_SCALES = {key: 1.0 for key in (*PLAYER_BOXES, *MATCH_BOXES)}
+
+# Fitted layout written by calibrate.py; overrides the values above when present
+GEOMETRY_PROFILE = os.environ.get("OCR_GEOMETRY_PROFILE", "geometry_profile.json")
+GEOMETRY_KEYS = ("TEAM1_STARTS", "TEAM2_STARTS", "X_SHIFT", "Y_SHIFT", "MATCH_X_SHIFT", "MATCH_Y_SHIFT")
+
+
+def current_geometry():
+    return {key: globals()[key] for key in GEOMETRY_KEYS}
+
+
+def load_geometry_profile(path=GEOMETRY_PROFILE):
+    """Apply a geometry profile's offsets and field scales over the module defaults. Returns the profile, or None."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        profile = json.load(f)
+    for key, value in profile["geometry"].items():
+        if key in GEOMETRY_KEYS:
+            globals()[key] = value
+    for key, scale in profile.get("field_scales", {}).items():
+        if key in FIELD_SCALES:
+            FIELD_SCALES[key] = scale
+    return profile
+
+
+load_geometry_profile()
+
 # -------------------------------
 # Helpers
 # -------------------------------
@@ -74,36 +133,85 @@ def phash(img_bgr: np.ndarray) -> imagehash.ImageHash:
 
 def match_champion(icon_bgr: np.ndarray,
                    hash_book: Dict[str, imagehash.ImageHash],
-                   max_dist: int = 20) -> str:
+                   max_dist: int = 20,
+                   quality: float = 1.0) -> str:
+    """
+    Nearest champion by pHash distance. quality (0..1, from detect_champion_boxes) tightens
+    the cut-off for boxes that were guessed rather than located: a misaligned crop is more
+    likely to land near the wrong champion, and "Unknown" is cheaper than a wrong pick.
+    """
     h = phash(icon_bgr)
     best_k, best_d = None, 9999
     for k, hv in hash_book.items():
         d = h - hv
         if d < best_d:
             best_k, best_d = k, d
-    return best_k if best_d <= max_dist else "Unknown"
+    limit = max_dist * (0.75 + 0.25 * quality)
+    return best_k if best_d <= limit else "Unknown"
+
+
+def _portrait_runs(active, icon_h):
+    """
+    (start, end) of consecutive rows whose textured share exceeds LOCATOR_ROW_FILL.
+    A run too tall for one portrait (neighbours whose thin gap blurred away) is cut into
+    evenly spaced portrait-high pieces.
+    """
+    rows = active.mean(axis=1) > LOCATOR_ROW_FILL
+    edges = np.flatnonzero(np.diff(np.concatenate(([0], rows.astype(np.int8), [0]))))
+    piece = int(round(icon_h)) + 2  # plus the gradient bleed above and below
+    runs = []
+    for top, bottom in zip(edges[::2], edges[1::2]):
+        k = int(round((bottom - top) / piece))
+        if k <= 1:
+            runs.append((top, bottom))
+            continue
+        runs += [(int(t), int(t) + piece) for t in np.linspace(top, bottom - piece, k).round()]
+    return runs
 
 
 def detect_champion_boxes(img_bgr: np.ndarray):
-    """Try to detect champ portraits; if not enough found, fall back to row-based tops."""
-    gray = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2GRAY)
-    _, thr = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)
-    cnts, _ = cv2.findContours(thr, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    boxes = [cv2.boundingRect(c) for c in cnts]
-    champs = [b for b in boxes if 180 < b[2] <
-              260 and 80 < b[3] < 120 and b[0] < 80]
-    champs = sorted(champs, key=lambda b: b[1])
-
-    if len(champs) < 10:
-        # Fallback: build tops from manual row starts; icons sit a few px above text rows
-        row_starts = TEAM1_STARTS + TEAM2_STARTS
-        guess_tops = [max(0, y - 4) for y in row_starts]
-        champs = [(4, y, ICON_W, ICON_H) for y in guess_tops][:10]
-    else:
-        # convert (x,y,w,h) -> (x,y,w,h) as expected; caller will slice with y:y+h etc.
-        pass
-
-    return champs[:10]
+    """
+    Locate the 10 champion portraits as (x, y, w, h, quality), top to bottom.
+
+    Only the left strip is searched, downscaled by LOCATOR_SCALE: rows with enough
+    gradient texture form vertical runs, and each run's horizontal extent gives a box
+    that is verified against the ICON_W x ICON_H aspect. quality is 1.0 for a perfect
+    fit, falling towards 0; rows with no verified box fall back to the guessed top
+    from the row starts with quality 0.
+    """
+    strip = img_bgr[:, :PORTRAIT_STRIP_W]
+    small = cv2.resize(strip, None, fx=LOCATOR_SCALE, fy=LOCATOR_SCALE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    grad = cv2.addWeighted(cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 1, 0)), 0.5,
+                           cv2.convertScaleAbs(cv2.Sobel(gray, cv2.CV_16S, 0, 1)), 0.5, 0)
+    active = grad > LOCATOR_EDGE_THRESHOLD
+
+    expected_aspect = ICON_W / ICON_H
+    found = []
+    for top, bottom in _portrait_runs(active, ICON_H * LOCATOR_SCALE):
+        cols = np.flatnonzero(active[top:bottom].mean(axis=0) > LOCATOR_ROW_FILL)
+        if len(cols) < 4 or bottom - top < 4:
+            continue
+        # The gradient bleeds one (downscaled) pixel past each portrait edge
+        x, y = (cols[0] + 1) / LOCATOR_SCALE, (top + 1) / LOCATOR_SCALE
+        w, h = (cols[-1] - cols[0] - 1) / LOCATOR_SCALE, (bottom - top - 2) / LOCATOR_SCALE
+        error = abs(np.log((w / h) / expected_aspect))
+        if error > LOCATOR_ASPECT_TOLERANCE or not 0.6 * ICON_H < h < 1.6 * ICON_H:
+            continue
+        quality = 1.0 - error / LOCATOR_ASPECT_TOLERANCE
+        found.append((int(x), int(y), int(w), int(h), round(float(quality), 3)))
+
+    if len(found) >= 10:
+        best = sorted(found, key=lambda b: -b[4])[:10]
+        return sorted(best, key=lambda b: b[1])
+
+    # Fill rows without a verified box from the manual row starts; icons sit a few px above text rows
+    champs = []
+    for y_start in TEAM1_STARTS + TEAM2_STARTS:
+        guess = max(0, y_start - 4)
+        near = [b for b in found if abs(b[1] - guess) < ICON_H / 2]
+        champs.append(min(near, key=lambda b: abs(b[1] - guess)) if near else (4, guess, ICON_W, ICON_H, 0.0))
+    return champs
 
 
 def extract_region(img, box):
@@ -111,6 +219,56 @@ def extract_region(img, box):
     return img[y1:y2, x1:x2]
 
 
+class RegionImage:
+    """
+    Just the parts of a scoreboard that parsing reads, copied into compact contiguous crops
+    so the full decoded frame can be freed. Indexed with full-frame coordinates
+    (img[y1:y2, x1:x2]), so parse_scoreboard runs on it unchanged.
+    """
+
+    def __init__(self, img, boxes):
+        self.shape = img.shape
+        h, w = img.shape[:2]
+        self.regions = {}
+        for x1, y1, x2, y2 in boxes:
+            box = (max(0, x1), max(0, y1), min(w, x2), min(h, y2))
+            if box[2] > box[0] and box[3] > box[1] and box not in self.regions:
+                self.regions[box] = np.ascontiguousarray(img[box[1]:box[3], box[0]:box[2]])
+
+    @property
+    def nbytes(self):
+        return sum(crop.nbytes for crop in self.regions.values())
+
+    def __getitem__(self, index):
+        ys, xs = index
+        h, w = self.shape[:2]
+        y1, y2, _ = ys.indices(h)
+        x1, x2, _ = xs.indices(w)
+        if x2 <= x1 or y2 <= y1:
+            # Off-frame boxes read as empty, as they would on the full array
+            return np.empty((max(0, y2 - y1), max(0, x2 - x1)) + self.shape[2:], np.uint8)
+        crop = self.regions.get((x1, y1, x2, y2))
+        if crop is not None:
+            return crop
+        for (rx1, ry1, rx2, ry2), crop in self.regions.items():
+            if rx1 <= x1 and ry1 <= y1 and x2 <= rx2 and y2 <= ry2:
+                return crop[y1 - ry1:y2 - ry1, x1 - rx1:x2 - rx1]
+        raise IndexError(f"({x1}, {y1}, {x2}, {y2}) is outside the retained regions")
+
+
+def parse_boxes():
+    """Every absolute box parse_scoreboard reads under the current geometry, portrait strip first."""
+    boxes = [(0, 0, PORTRAIT_STRIP_W, 10 ** 6)]
+    for y_start in TEAM1_STARTS + TEAM2_STARTS:
+        boxes += [(x1 + X_SHIFT, y_start + y1 + Y_SHIFT, x2 + X_SHIFT, y_start + y2 + Y_SHIFT)
+                  for x1, y1, x2, y2 in PLAYER_BOXES.values()]
+    return boxes + [match_field_box(key) for key in MATCH_BOXES]
+
+
+def retain_regions(img) -> RegionImage:
+    return RegionImage(img, parse_boxes())
+
+
 def load_player_whitelist(file_path: str) -> list:
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Whitelist file not found: {file_path}")
@@ -121,6 +279,23 @@ def load_player_whitelist(file_path: str) -> list:
     return data["players"]
 
 
+_whitelist_cache = {"version": None, "index": None}
+
+
+def get_whitelist_index():
+    """
+    Returns (WhitelistIndex, lobby_only). The index covers the registered roster and is
+    rebuilt only when the registry version changes; if the registry is empty the static
+    players.json lobby list is used instead (lobby_only=True).
+    """
+    reg = registry.ensure_loaded()
+    if len(reg.index):
+        if _whitelist_cache["version"] != reg.version:
+            _whitelist_cache["version"], _whitelist_cache["index"] = reg.version, reg.index
+        return _whitelist_cache["index"], False
+    return WhitelistIndex(load_player_whitelist(PLAYER_WHITELIST_JSON)), True
+
+
 def load_map_whitelist(file_path: str) -> list:
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Map whitelist file not found: {file_path}")
@@ -128,7 +303,35 @@ def load_map_whitelist(file_path: str) -> list:
         data = json.load(f)
     if "maps" not in data or not isinstance(data["maps"], list):
         raise ValueError(f"Invalid map whitelist format in {file_path}")
-    return data["maps"]
+    return list(dict.fromkeys(data["maps"]))
+
+
+def load_region_whitelist(file_path: str) -> list:
+    with open(file_path, "r", encoding="utf-8") as f:
+        return list(dict.fromkeys(json.load(f).get("regions", [])))
+
+
+_map_whitelist = []
+
+
+def get_map_whitelist() -> list:
+    """maps.json, read once per process."""
+    if not _map_whitelist:
+        _map_whitelist.extend(load_map_whitelist(MAP_WHITELIST_JSON))
+    return _map_whitelist
+
+
+# Match fields with a fixed set of values, recognized by template before falling back to OCR
+VOCAB_FIELDS = ("map", "region")
+_vocab = {}
+
+
+def get_vocab(field) -> VocabRecognizer:
+    """Closed-set recognizer for a VOCAB_FIELDS field, built once per process."""
+    if field not in _vocab:
+        strings = get_map_whitelist() if field == "map" else load_region_whitelist(MAP_WHITELIST_JSON)
+        _vocab[field] = VocabRecognizer.build(strings, load_learned(VOCAB_TEMPLATES).get(field))
+    return _vocab[field]
 
 
 def levenshtein_distance(s1, s2):
@@ -148,29 +351,65 @@ def levenshtein_distance(s1, s2):
     return previous_row[-1]
 
 
-def ocr_text(img, box, whitelist, unmatched_players):
-    roi = extract_region(img, box)
+def run_tesseract(roi, trace=NULL_TRACE, **kwargs) -> str:
+    trace.count("ocr_calls")
+    return pytesseract.image_to_string(roi, **kwargs)
+
+
+def scale_roi(roi, scale):
+    if scale >= 1.0:
+        return roi
+    return cv2.resize(roi, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+
+def read_field(roi, key, trace=NULL_TRACE, scale=1.0) -> str:
+    """Raw OCR text of one ROI, preprocessed the way its field needs (names are binarized)."""
+    roi = scale_roi(roi, scale)
+    if key != "player":
+        return run_tesseract(roi, trace, config="--psm 7").strip()
     gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
     gray = cv2.GaussianBlur(gray, (3, 3), 0)
     thr = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
                                 cv2.THRESH_BINARY, 11, 2)
     kernel = np.ones((2, 2), np.uint8)
     thr = cv2.dilate(thr, kernel, iterations=1)
-    text = pytesseract.image_to_string(
-        thr,
+    text = run_tesseract(
+        thr, trace,
         config="--psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789öéàáèíòóùúÄÖÜäöüÉ",
         lang="eng"
     ).strip()
-    text = re.sub(r"[^\w\söéàáèíòóùúÄÖÜäöüÉ]", "", text)
+    return re.sub(r"[^\w\söéàáèíòóùúÄÖÜäöüÉ]", "", text)
+
+
+def read_laddered(img, box, key, trace=NULL_TRACE, check=None) -> str:
+    """
+    Read a field at its FIELD_SCALES scale, escalating to full resolution when check(text)
+    (default FIELD_CHECKS[key]) rejects the downscaled read.
+    """
+    roi = extract_region(img, box)
+    scale = FIELD_SCALES.get(key, 1.0)
+    text = read_field(roi, key, trace, scale)
+    if scale < 1.0 and not (check or FIELD_CHECKS[key])(text):
+        trace.count("escalations")
+        text = read_field(roi, key, trace)
+    return text
+
+
+def ocr_text(img, box, whitelist, taken, unmatched_players, trace=NULL_TRACE):
+    # The ladder's check already looked up the text it accepted; don't search the whitelist twice
+    matches = {}
+
+    def closest(t):
+        if t not in matches:
+            matches[t] = whitelist.closest(t, max_distance=3, exclude=taken)[0]
+        return matches[t]
+
+    text = read_laddered(img, box, "player", trace, check=lambda t: closest(t) is not None)
     print(f"OCR raw before matching: '{text}'")
 
-    closest_match, min_distance = None, float("inf")
-    for name in whitelist:
-        d = levenshtein_distance(text, name)
-        if d < min_distance:
-            closest_match, min_distance = name, d
-    if closest_match and min_distance <= 3:
-        whitelist.remove(closest_match)
+    closest_match = closest(text)
+    if closest_match:
+        taken.add(closest_match)
         return closest_match
     else:
         unmatched_players.append(text)
@@ -187,6 +426,10 @@ def match_map_name(ocr_result: str, map_whitelist: list) -> str:
     return closest_match if closest_match else ocr_result
 
 
+def map_name_distance(ocr_result: str, map_whitelist: list) -> int:
+    return min((levenshtein_distance(ocr_result, m) for m in map_whitelist), default=0)
+
+
 def to_int(val: str) -> int:
     val = val.replace(",", "").strip()
     return int(val) if val.isdigit() else 0
@@ -199,16 +442,41 @@ def parse_kda(kda_str: str):
     return 0, 0, 0
 
 
-def parse_match_data(img):
-    match_data = {}
-    map_whitelist_file = "maps.json"
-    map_whitelist = load_map_whitelist(map_whitelist_file)
+# Does a read parse? A downscaled read that fails is repeated at full resolution
+_is_number = lambda t: re.fullmatch(r"[\d,]+", t.strip()) is not None
+FIELD_CHECKS = {
+    **{key: _is_number for key in PLAYER_BOXES},
+    "player": bool,
+    "KDA": lambda t: re.match(r"(\d+)\s*/\s*(\d+)\s*/\s*(\d+)", t.replace(" ", "")) is not None,
+    "duration": lambda t: re.search(r"\d+", t) is not None,
+    "team1_score": lambda t: re.search(r"\d+$", t) is not None,
+    "team2_score": lambda t: re.search(r"\d+$", t) is not None,
+    "region": bool,
+    "map": lambda t: bool(t) and map_name_distance(t, get_map_whitelist()) <= 3,
+}
+
 
-    for key, (x1, y1, x2, y2) in MATCH_BOXES.items():
-        box = (x1 + MATCH_X_SHIFT, y1 + MATCH_Y_SHIFT,
-               x2 + MATCH_X_SHIFT, y2 + MATCH_Y_SHIFT)
-        text = pytesseract.image_to_string(
-            extract_region(img, box), config="--psm 7").strip()
+def match_field_box(key):
+    x1, y1, x2, y2 = MATCH_BOXES[key]
+    return (x1 + MATCH_X_SHIFT, y1 + MATCH_Y_SHIFT,
+            x2 + MATCH_X_SHIFT, y2 + MATCH_Y_SHIFT)
+
+
+def parse_match_data(img, trace=NULL_TRACE):
+    match_data = {}
+    map_whitelist = get_map_whitelist()
+
+    for key in MATCH_BOXES:
+        box = match_field_box(key)
+        if key in VOCAB_FIELDS:
+            # Known values by template; OCR only for values the templates do not cover
+            label, _ = get_vocab(key).classify(extract_region(img, box))
+            if label is not None:
+                trace.count("vocab_hits")
+                match_data[key] = label
+                continue
+            trace.count("vocab_misses")
+        text = read_laddered(img, box, key, trace)
 
         if key == "duration":
             m = re.search(r"(\d+)", text)
@@ -228,24 +496,25 @@ def parse_match_data(img):
 # -------------------------------
 
 
-def main():
-    img = cv2.imread(IMG_PATH)
-    if img is None:
-        raise FileNotFoundError(f"Could not read image: {IMG_PATH}")
-
-    hashes = load_hashes(HASH_JSON)
-
-    # Match ID from filename
-    match_id = int(''.join(filter(str.isdigit, os.path.basename(IMG_PATH))))
-
+def parse_scoreboard(img, match_id, hashes, trace=NULL_TRACE, lobby=None):
+    """
+    Parse a decoded scoreboard into the {"match": ..., "teams": ...} dict insert_scoreboard takes.
+    lobby: optional list of the names in this match, used instead of the registered roster.
+    """
     # Load whitelists
-    whitelist_file = "players.json"
-    whitelist = load_player_whitelist(whitelist_file)
+    if lobby is not None:
+        whitelist, lobby_only = WhitelistIndex(lobby), True
+    else:
+        whitelist, lobby_only = get_whitelist_index()
+    taken = set()
 
     # Detect champions (10 rows)
-    champ_boxes = detect_champion_boxes(img)
-    champs = [match_champion(img[y:y+h, x:x+w], hashes)
-              for (x, y, w, h) in champ_boxes]
+    with trace.stage("detect_champion_boxes"):
+        champ_boxes = detect_champion_boxes(img)
+    with trace.stage("match_champion"):
+        champs = [match_champion(img[y:y+h, x:x+w], hashes, quality=q)
+                  for (x, y, w, h, q) in champ_boxes]
+    trace.count("unknown_champions", champs.count("Unknown"))
 
     # Build flat row list and process
     team1, team2 = [], []
@@ -262,68 +531,115 @@ def main():
                    x2 + X_SHIFT,
                    y_start + y2 + Y_SHIFT)
 
-            if key == "player":
-                val = ocr_text(img, box, whitelist, unmatched_players)
-                pdata["player"] = val
-            elif key == "credits":
-                val = pytesseract.image_to_string(
-                    extract_region(img, box), config="--psm 7").strip()
-                pdata["credits"] = to_int(val)
-            elif key == "KDA":
-                val = pytesseract.image_to_string(
-                    extract_region(img, box), config="--psm 7").strip()
-                k, d, a = parse_kda(val)
-                pdata["kills"], pdata["deaths"], pdata["assists"] = k, d, a
-            else:
-                val = pytesseract.image_to_string(
-                    extract_region(img, box), config="--psm 7").strip()
-                pdata[key] = to_int(val)
+            with trace.stage("column:" + key):
+                if key == "player":
+                    val = ocr_text(img, box, whitelist, taken, unmatched_players, trace)
+                    pdata["player"] = val
+                elif key == "KDA":
+                    val = read_laddered(img, box, key, trace)
+                    k, d, a = parse_kda(val)
+                    pdata["kills"], pdata["deaths"], pdata["assists"] = k, d, a
+                else:
+                    val = read_laddered(img, box, key, trace)
+                    pdata[key] = to_int(val)
 
         team.append(pdata)
 
+    with trace.stage("reconcile_names"):
+        unmatched_ocr = reconcile_names(team1, team2, whitelist, lobby_only, taken, unmatched_players)
+    trace.count("unmatched_names", len(unmatched_ocr))
+
+    # Match-level info
+    with trace.stage("parse_match_data"):
+        match_data = parse_match_data(img, trace)
+    match_data["match_id"] = match_id
+
+    return {"match": match_data, "teams": {"team1": team1, "team2": team2}}
+
+
+def reconcile_names(team1, team2, whitelist, lobby_only, taken, unmatched_players):
+    """
+    Pair OCR names that missed the whitelist with the closest unclaimed names.
+    Returns the OCR names that are still unmatched.
+    """
     # Try to match any leftover player OCRs to whitelist
-    matched_players = set(p['player'] for p in team1 + team2)
-    unmatched_ocr = [p['player'] for p in team1 + team2 if p['player']
-                     not in matched_players or p['player'] in unmatched_players]
-    # Remove already matched whitelist names
-    unmatched_whitelist = [
-        name for name in whitelist if name not in matched_players]
+    unmatched_ocr = list(unmatched_players)
+    # A lobby list is paired unconditionally; the full roster only within a bound
+    limit = None if lobby_only else RECONCILE_MAX_DISTANCE
     # Assign closest whitelist name to each unmatched OCR result
-    while unmatched_whitelist and unmatched_ocr:
+    while unmatched_ocr:
         best_pair = None
         best_dist = float('inf')
         for ocr_name in unmatched_ocr:
-            for whitelist_name in unmatched_whitelist:
-                dist = levenshtein_distance(ocr_name, whitelist_name)
-                if dist < best_dist:
-                    best_dist = dist
-                    best_pair = (ocr_name, whitelist_name)
-        if best_pair:
-            ocr_name, whitelist_name = best_pair
-            # Update the player entry with the whitelist value
-            for team in (team1, team2):
-                for pdata in team:
-                    if pdata['player'] == ocr_name:
-                        pdata['player'] = whitelist_name
-                        matched_players.add(whitelist_name)
-                        break
-            unmatched_ocr.remove(ocr_name)
-            unmatched_whitelist.remove(whitelist_name)
-    # Add any remaining whitelist players not matched in OCR
-    for name in whitelist:
-        if name not in matched_players:
-            # Add to team1 if less than 5, else team2
-            target_team = team1 if len(team1) < len(TEAM1_STARTS) else team2
-            target_team.append({'player': name, 'champion': 'Unknown'})
-
-    # Match-level info
-    match_data = parse_match_data(img)
-    match_data["match_id"] = match_id
-
-    out = {"match": match_data, "teams": {"team1": team1, "team2": team2}}
-    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(out, f, ensure_ascii=False, indent=2)
-    print(f"✅ Wrote {OUTPUT_JSON}")
+            whitelist_name, dist = whitelist.closest(
+                ocr_name, max_distance=limit, exclude=taken)
+            if whitelist_name and dist < best_dist:
+                best_dist = dist
+                best_pair = (ocr_name, whitelist_name)
+        if not best_pair:
+            break
+        ocr_name, whitelist_name = best_pair
+        # Update the player entry with the whitelist value
+        for team in (team1, team2):
+            for pdata in team:
+                if pdata['player'] == ocr_name:
+                    pdata['player'] = whitelist_name
+                    break
+        taken.add(whitelist_name)
+        unmatched_ocr.remove(ocr_name)
+    # Add any remaining lobby players not matched in OCR
+    if lobby_only:
+        for name in whitelist:
+            if name not in taken:
+                # Add to team1 if less than 5, else team2
+                target_team = team1 if len(team1) < len(TEAM1_STARTS) else team2
+                target_team.append({'player': name, 'champion': 'Unknown'})
+    return unmatched_ocr
+
+
+def main(img_path, output_json=OUTPUT_JSON, hashes=None, match_id=None):
+    """
+    Parse one screenshot to output_json. Long-lived callers (ocr_worker.py) pass preloaded hashes.
+    match_id defaults to the digits in the file name; archived images are named by hash instead.
+    """
+    if match_id is None:
+        match_id = ''.join(filter(str.isdigit, os.path.basename(img_path)))
+    match_id = int(match_id)
+    trace = StageTrace(match_id=match_id, image=os.path.basename(img_path))
+    profiler = cProfile.Profile() if PROFILE_SLOW_MS is not None else None
+    if profiler:
+        profiler.enable()
+
+    with trace.stage("load_image"):
+        img = cv2.imread(img_path)
+        if img is None:
+            raise FileNotFoundError(f"Could not read image: {img_path}")
+        # Keep only the ROIs; the full frame is released here rather than after parsing
+        img = retain_regions(img)
+
+    if hashes is None:
+        with trace.stage("load_hashes"):
+            hashes = load_hashes(HASH_JSON)
+
+    out = parse_scoreboard(img, match_id, hashes, trace)
+    out["parse_version"] = PARSE_VERSION
+
+    with trace.stage("write_json"):
+        with open(output_json, "w", encoding="utf-8") as f:
+            json.dump(out, f, ensure_ascii=False, indent=2)
+    print(f"✅ Wrote {output_json}")
+
+    record = trace.record()
+    if profiler:
+        profiler.disable()
+        if record["total_ms"] > PROFILE_SLOW_MS:
+            profile_path = os.path.join(PROFILE_DIR, f"ocr_profile_{match_id}.prof")
+            profiler.dump_stats(profile_path)
+            record["profile"] = profile_path
+            print(f"Slow scoreboard ({record['total_ms']:.0f} ms), profile written to {profile_path}")
+    append_record(METRICS_LOG, record)
+    print(f"Stage timings (ms): {record['stages_ms']} counters: {record['counters']}")
+    return out
 
 # Optional utility: add match_id into an existing JSON
 
@@ -350,4 +666,4 @@ def add_match_id_to_json(file_path):
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1], sys.argv[3] if len(sys.argv) > 3 else OUTPUT_JSON)
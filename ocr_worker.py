@@ -0,0 +1,181 @@
+# ocr_worker.py — long-lived OCR processes, warmed up once and fed scoreboards over a pipe
+#
+# Worker side: `python ocr_worker.py` imports ocr.py (cv2, numpy, PIL, imagehash, pytesseract),
+# loads the hash book and whitelists, writes one ready line, then answers one JSON job per
+# stdin line. The bot side (OCRWorkerPool) only needs the standard library, so the bot
+# process never imports anything OCR-related.
+import os
+import sys
+import json
+import time
+import asyncio
+
+from metrics import bot_metrics
+
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", "1"))
+# A job that takes longer than this gets its worker killed and replaced
+OCR_JOB_TIMEOUT = 120.0
+BOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# -------------------------------
+# Worker process
+# -------------------------------
+def serve():
+    protocol = sys.stdout
+    # ocr.py prints progress; keep the protocol channel for replies only
+    sys.stdout = sys.stderr
+
+    import ocr
+    from registry import registry
+    hashes = ocr.load_hashes(ocr.HASH_JSON)
+    ocr.get_map_whitelist()
+    for field in ocr.VOCAB_FIELDS:
+        ocr.get_vocab(field)
+    registry_version = None
+
+    protocol.write(json.dumps({"ready": True, "pid": os.getpid()}) + "\n")
+    protocol.flush()
+    for line in sys.stdin:
+        job = json.loads(line)
+        started = time.perf_counter()
+        try:
+            # The bot sends its registry version; reload the roster whenever it moves
+            if job.get("registry_version") != registry_version:
+                registry.load()
+                registry_version = job.get("registry_version")
+            ocr.main(job["image_path"], job["output_path"], hashes, job.get("match_id"))
+            reply = {"ok": True}
+        except Exception as e:
+            reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        reply["ms"] = round((time.perf_counter() - started) * 1000, 3)
+        protocol.write(json.dumps(reply) + "\n")
+        protocol.flush()
+
+
+# -------------------------------
+# Bot side
+# -------------------------------
+class OCRWorkerPool:
+    """
+    A fixed number of warm worker processes. parse() takes an idle worker, sends it one
+    job and waits for the reply; a worker that exits, hangs past the timeout or is
+    abandoned mid-job is killed and replaced in the background.
+    """
+
+    def __init__(self, size=OCR_WORKERS, command=None, cwd=BOT_DIR):
+        self.size = size
+        self.command = command or [sys.executable, os.path.join(BOT_DIR, "ocr_worker.py")]
+        self.cwd = cwd
+        self.idle = None
+        self.ready_seconds = None
+        self._start_lock = asyncio.Lock()
+        self._restarts = set()
+        self._procs = set()  # every live worker, idle or checked out, so close() can reap them all
+
+    async def _spawn(self):
+        proc = await asyncio.create_subprocess_exec(
+            *self.command, stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.PIPE, cwd=self.cwd)
+        self._procs.add(proc)
+        line = await proc.stdout.readline()
+        if not line:
+            await proc.wait()
+            self._procs.discard(proc)
+            raise RuntimeError(f"OCR worker exited during start-up (code {proc.returncode})")
+        return proc
+
+    async def start(self):
+        """Start every worker and wait until all have loaded; returns the seconds it took."""
+        async with self._start_lock:
+            if self.idle is not None:
+                return self.ready_seconds
+            started = time.perf_counter()
+            procs = await asyncio.gather(*(self._spawn() for _ in range(self.size)))
+            self.idle = asyncio.Queue()
+            for proc in procs:
+                self.idle.put_nowait(proc)
+            self.ready_seconds = time.perf_counter() - started
+            bot_metrics.set("ocr_workers", self.size, "Warm OCR worker processes")
+            bot_metrics.set("ocr_workers_ready_seconds", self.ready_seconds, "OCR worker start-up time")
+            return self.ready_seconds
+
+    async def _replace(self, proc):
+        if proc.returncode is None:
+            proc.kill()
+        await proc.wait()
+        self._procs.discard(proc)
+        if self.idle is None:  # closed meanwhile
+            return
+        bot_metrics.inc("ocr_worker_restarts_total", 1, "OCR workers killed and replaced")
+        try:
+            proc = await self._spawn()
+            if self.idle is None:
+                await self._stop(proc)
+            else:
+                self.idle.put_nowait(proc)
+        except Exception as e:
+            print(f"Failed to restart OCR worker: {e}")
+
+    async def parse(self, image_path, output_path, registry_version=None, timeout=OCR_JOB_TIMEOUT,
+                    match_id=None):
+        """Parse one scoreboard into output_path. Returns (ok, error message or None)."""
+        if self.idle is None:
+            await self.start()
+        proc = await self.idle.get()
+        healthy = False
+        try:
+            job = {"image_path": image_path, "output_path": output_path, "registry_version": registry_version,
+                   "match_id": match_id}
+            proc.stdin.write((json.dumps(job) + "\n").encode())
+            await proc.stdin.drain()
+            line = await asyncio.wait_for(proc.stdout.readline(), timeout)
+            if not line:
+                return False, "OCR worker exited"
+            healthy = True
+            reply = json.loads(line)
+            return reply["ok"], reply.get("error")
+        except asyncio.TimeoutError:
+            return False, f"OCR timed out after {timeout:.0f}s"
+        except ConnectionError as e:
+            return False, f"OCR worker pipe closed: {e}"
+        finally:
+            if healthy and self.idle is not None:
+                self.idle.put_nowait(proc)
+            elif healthy:  # the pool was closed while this job ran
+                await self._stop(proc)
+            else:
+                task = asyncio.ensure_future(self._replace(proc))
+                self._restarts.add(task)
+                task.add_done_callback(self._restarts.discard)
+
+    async def _stop(self, proc, grace=5.0):
+        """Close the worker's stdin so it exits on its own; kill it if it has not within grace seconds."""
+        if proc.returncode is None:
+            proc.stdin.close()
+            try:
+                await asyncio.wait_for(proc.wait(), grace)
+            except asyncio.TimeoutError:
+                proc.kill()
+                await proc.wait()
+        self._procs.discard(proc)
+
+    async def close(self):
+        """Stop every worker, including ones still busy with a job (their parse() reports an error)."""
+        if self.idle is None:
+            return
+        idle = set()
+        while not self.idle.empty():
+            idle.add(self.idle.get_nowait())
+        self.idle = None
+        for task in list(self._restarts):
+            task.cancel()
+        await asyncio.gather(*self._restarts, return_exceptions=True)
+        # A worker mid-job would finish it first; closing is not worth waiting a whole job for
+        for proc in self._procs - idle:
+            if proc.returncode is None:
+                proc.kill()
+        await asyncio.gather(*(self._stop(proc) for proc in list(self._procs)))
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,336 @@
+# rating.py — team Elo ratings per player and per (player, champion)
+import sqlite3
+# numpy is imported inside the replay functions, so the bot starts without it
+
+from db import DB_PATH, normalize_ign, add_insert_listener
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 32.0
+TEAM_SIZE = 5
+
+
+# -------------------------------
+# Schema / persistence
+# -------------------------------
+def create_rating_tables():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS player_ratings (
+        player_id INTEGER PRIMARY KEY,
+        rating REAL,
+        matches INTEGER,
+        last_match_id INTEGER,
+        FOREIGN KEY (player_id) REFERENCES players(player_id)
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS champion_ratings (
+        player_id INTEGER,
+        champion TEXT,
+        rating REAL,
+        matches INTEGER,
+        last_match_id INTEGER,
+        PRIMARY KEY (player_id, champion),
+        FOREIGN KEY (player_id) REFERENCES players(player_id)
+    );
+    """)
+
+    conn.commit()
+    conn.close()
+
+
+# -------------------------------
+# Core math
+# -------------------------------
+def expected_score(team1_rating, team2_rating):
+    """Probability that team1 beats team2 under Elo."""
+    return 1.0 / (1.0 + 10.0 ** ((team2_rating - team1_rating) / 400.0))
+
+
+class RatingEngine:
+    """
+    Incremental team Elo. Keys are player_ids (or (player_id, champion) pairs);
+    a team's strength is the mean rating of its known members.
+    """
+
+    def __init__(self, k=K_FACTOR, initial=INITIAL_RATING):
+        self.k = k
+        self.initial = initial
+        self.ratings = {}
+        self.matches = {}
+
+    def team_rating(self, keys):
+        if not keys:
+            return self.initial
+        get = self.ratings.get
+        return sum(get(key, self.initial) for key in keys) / len(keys)
+
+    def apply_match(self, team1_keys, team2_keys, team1_won):
+        """Update the ratings of both teams in place. Returns team1's rating change."""
+        e1 = expected_score(self.team_rating(team1_keys), self.team_rating(team2_keys))
+        delta = self.k * ((1.0 if team1_won else 0.0) - e1)
+        for keys, d in ((team1_keys, delta), (team2_keys, -delta)):
+            for key in keys:
+                self.ratings[key] = self.ratings.get(key, self.initial) + d
+                self.matches[key] = self.matches.get(key, 0) + 1
+        return delta
+
+
+# -------------------------------
+# Incremental updates on insert
+# -------------------------------
+def _load_engine(cursor, table, key_columns, keys):
+    """RatingEngine seeded with the stored ratings of just the given keys."""
+    engine = RatingEngine()
+    where = " OR ".join(["(" + " AND ".join(f"{c} = ?" for c in key_columns) + ")"] * len(keys))
+    params = [v for key in keys for v in (key if isinstance(key, tuple) else (key,))]
+    if keys:
+        cursor.execute(f"SELECT {', '.join(key_columns)}, rating, matches FROM {table} WHERE {where};",
+                       params)
+        for row in cursor.fetchall():
+            key = tuple(row[:len(key_columns)]) if len(key_columns) > 1 else row[0]
+            engine.ratings[key] = row[-2]
+            engine.matches[key] = row[-1]
+    return engine
+
+
+def first_per_player(rows):
+    """
+    Rows of one match with repeated player_ids dropped (the first row wins), so a
+    misread scoreboard never rates a player twice. load_history applies the same rule.
+    """
+    seen = set()
+    unique = []
+    for row in rows:
+        if row["player_id"] not in seen:
+            seen.add(row["player_id"])
+            unique.append(row)
+    return unique
+
+
+def update_ratings_for_match(match, inserted):
+    """
+    Insert listener: apply one newly stored match to player_ratings and champion_ratings.
+    Matches arrive in insertion order; use replay_from_db() to recompute in match_id order.
+    """
+    if match.get("replaced"):
+        # The old result is already folded into every later rating; only a replay takes it out
+        replay_from_db()
+        return
+    inserted = first_per_player(inserted)
+    team1 = [row for row in inserted if row["team"] == "team1"]
+    team2 = [row for row in inserted if row["team"] == "team2"]
+    team1_won = match["team1_score"] > match["team2_score"]
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        player_keys = [row["player_id"] for row in inserted]
+        players = _load_engine(cursor, "player_ratings", ("player_id",), player_keys)
+        players.apply_match([r["player_id"] for r in team1], [r["player_id"] for r in team2], team1_won)
+
+        champ_keys = [(row["player_id"], row["champion"]) for row in inserted]
+        champions = _load_engine(cursor, "champion_ratings", ("player_id", "champion"), champ_keys)
+        champions.apply_match([(r["player_id"], r["champion"]) for r in team1],
+                              [(r["player_id"], r["champion"]) for r in team2], team1_won)
+
+        cursor.executemany("""
+        INSERT OR REPLACE INTO player_ratings (player_id, rating, matches, last_match_id)
+        VALUES (?, ?, ?, ?);
+        """, [(key, players.ratings[key], players.matches[key], match["match_id"]) for key in player_keys])
+        cursor.executemany("""
+        INSERT OR REPLACE INTO champion_ratings (player_id, champion, rating, matches, last_match_id)
+        VALUES (?, ?, ?, ?, ?);
+        """, [(key[0], key[1], champions.ratings[key], champions.matches[key], match["match_id"])
+              for key in champ_keys])
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"An error occurred while updating ratings: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def enable_incremental_ratings():
+    """Create the rating tables and keep them updated as scoreboards are inserted."""
+    create_rating_tables()
+    add_insert_listener(update_ratings_for_match)
+
+
+# -------------------------------
+# Vectorized full replay
+# -------------------------------
+def schedule_waves(slots):
+    """
+    Group matches (rows of slots, in chronological order) into waves such that no
+    key appears twice in a wave and every match lands after all earlier matches
+    sharing a key with it. Replaying wave by wave is then identical to replaying
+    match by match. Returns (order, bounds): match indices sorted by wave, and
+    the start offset of each wave in order.
+    """
+    import numpy as np
+    last_wave = {}
+    waves = np.empty(len(slots), dtype=np.int64)
+    for m, row in enumerate(slots.tolist()):
+        row = [key for key in row if key >= 0]
+        w = max([last_wave.get(key, -1) for key in row], default=-1) + 1
+        waves[m] = w
+        for key in row:
+            last_wave[key] = w
+    order = np.argsort(waves, kind="stable")
+    bounds = np.searchsorted(waves[order], np.arange(waves.max() + 2 if len(waves) else 1))
+    return order, bounds
+
+
+def replay_arrays(slots, sides, team1_won, n_keys=None, k=K_FACTOR, initial=INITIAL_RATING,
+                  schedule=None):
+    """
+    Replay every match at once per wave.
+      slots:     (M, S) int key index per participant, -1 for empty slots
+      sides:     (M, S) +1 for team1, -1 for team2, 0 for empty slots
+      team1_won: (M,) bool/int
+    Returns (ratings, matches) arrays indexed by key.
+    """
+    import numpy as np
+    slots = np.asarray(slots, dtype=np.int64)
+    sides = np.asarray(sides, dtype=np.float64)
+    won = np.asarray(team1_won, dtype=np.float64)
+    if n_keys is None:
+        n_keys = int(slots.max()) + 1 if slots.size else 0
+
+    ratings = np.full(n_keys + 1, initial)  # last cell is a sink for empty slots
+    counts = np.zeros(n_keys + 1, dtype=np.int64)
+    if not len(slots):
+        return ratings[:-1], counts[:-1]
+
+    order, bounds = schedule if schedule is not None else schedule_waves(slots)
+    keys = np.where(slots < 0, n_keys, slots)
+    is1 = (sides > 0).astype(np.float64)
+    is2 = (sides < 0).astype(np.float64)
+    n1 = is1.sum(axis=1)
+    n2 = is2.sum(axis=1)
+
+    for w in range(len(bounds) - 1):
+        ms = order[bounds[w]:bounds[w + 1]]
+        if not len(ms):
+            continue
+        kk = keys[ms]
+        r = ratings[kk]
+        r1 = np.where(n1[ms] > 0, (r * is1[ms]).sum(axis=1) / np.maximum(n1[ms], 1), initial)
+        r2 = np.where(n2[ms] > 0, (r * is2[ms]).sum(axis=1) / np.maximum(n2[ms], 1), initial)
+        delta = k * (won[ms] - expected_score(r1, r2))
+        ratings[kk] = r + delta[:, None] * sides[ms]
+        counts[kk] += 1
+        ratings[n_keys] = initial
+
+    return ratings[:-1], counts[:-1]
+
+
+def load_history(conn):
+    """
+    Read matches and player_stats in match_id order into replay arrays.
+    A player_id repeated within a match keeps only its first row, as in update_ratings_for_match.
+    Returns (match_ids, player_slots, champ_slots, sides, team1_won, player_ids, champ_keys).
+    """
+    import numpy as np
+    matches = conn.execute("""
+    SELECT match_id, team1_score > team2_score FROM matches ORDER BY match_id;
+    """).fetchall()
+    rows = conn.execute("""
+    SELECT match_id, player_id, team, champion FROM player_stats
+    WHERE player_id IS NOT NULL
+    ORDER BY match_id, player_stats_id;
+    """).fetchall()
+
+    match_ids = np.array([m[0] for m in matches], dtype=np.int64)
+    team1_won = np.array([m[1] for m in matches], dtype=np.int8)
+    position = {mid: i for i, mid in enumerate(match_ids.tolist())}
+
+    width = 2 * TEAM_SIZE
+    player_slots = np.full((len(matches), width), -1, dtype=np.int64)
+    champ_slots = np.full((len(matches), width), -1, dtype=np.int64)
+    sides = np.zeros((len(matches), width), dtype=np.int8)
+    fill = np.zeros(len(matches), dtype=np.int64)
+
+    player_index, champ_index = {}, {}
+    seen = set()
+    for match_id, player_id, team, champion in rows:
+        m = position[match_id]
+        s = fill[m]
+        if s >= width or (match_id, player_id) in seen:
+            continue
+        seen.add((match_id, player_id))
+        player_slots[m, s] = player_index.setdefault(player_id, len(player_index))
+        champ_slots[m, s] = champ_index.setdefault((player_id, champion), len(champ_index))
+        sides[m, s] = 1 if team == "team1" else -1
+        fill[m] = s + 1
+
+    return (match_ids, player_slots, champ_slots, sides, team1_won,
+            list(player_index), list(champ_index))
+
+
+def _last_match_ids(slots, match_ids, n_keys):
+    """match_id of the latest match each key took part in."""
+    import numpy as np
+    last = np.zeros(n_keys, dtype=np.int64)
+    rows = np.broadcast_to(np.arange(len(slots))[:, None], slots.shape)
+    mask = slots >= 0
+    np.maximum.at(last, slots[mask], rows[mask])
+    return match_ids[last]
+
+
+def replay_from_db():
+    """Recompute player_ratings and champion_ratings from the full history."""
+    create_rating_tables()
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        match_ids, player_slots, champ_slots, sides, won, player_ids, champ_keys = load_history(conn)
+        schedule = schedule_waves(player_slots)
+        p_ratings, p_counts = replay_arrays(player_slots, sides, won, len(player_ids), schedule=schedule)
+        # Champion keys never repeat within a match unless the player does, so the
+        # player schedule is valid for them as well
+        c_ratings, c_counts = replay_arrays(champ_slots, sides, won, len(champ_keys), schedule=schedule)
+
+        last_match = _last_match_ids(player_slots, match_ids, len(player_ids))
+        last_champ = _last_match_ids(champ_slots, match_ids, len(champ_keys))
+
+        cursor.execute("DELETE FROM player_ratings;")
+        cursor.execute("DELETE FROM champion_ratings;")
+        cursor.executemany("""
+        INSERT INTO player_ratings (player_id, rating, matches, last_match_id) VALUES (?, ?, ?, ?);
+        """, [(pid, float(p_ratings[i]), int(p_counts[i]), int(last_match[i]))
+              for i, pid in enumerate(player_ids)])
+        cursor.executemany("""
+        INSERT INTO champion_ratings (player_id, champion, rating, matches, last_match_id)
+        VALUES (?, ?, ?, ?, ?);
+        """, [(pid, champ, float(c_ratings[i]), int(c_counts[i]), int(last_champ[i]))
+              for i, (pid, champ) in enumerate(champ_keys)])
+        conn.commit()
+        print(f"Replayed {len(match_ids)} matches for {len(player_ids)} players.")
+    except sqlite3.Error as e:
+        print(f"An error occurred while replaying ratings: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def get_player_ratings(player_igns):
+    """Returns {player_ign: rating} for the given IGNs (unrated players are left out)."""
+    keys = [normalize_ign(ign) for ign in player_igns]
+    if not keys:
+        return {}
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute(f"""
+        SELECT p.ign_normalized, r.rating FROM players p
+        JOIN player_ratings r ON r.player_id = p.player_id
+        WHERE p.ign_normalized IN ({', '.join('?' * len(keys))});
+        """, keys).fetchall()
+    by_key = dict(rows)
+    return {ign: by_key[key] for ign, key in zip(player_igns, keys) if key in by_key}
+
+
+if __name__ == "__main__":
+    replay_from_db()
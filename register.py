@@ -1,31 +1,33 @@
 import discord
 from discord.ext import commands
-import sqlite3
 import re
-from datetime import datetime
+import asyncio
+from db import create_database, migrate_legacy_players
+from registry import registry
+from cache import TTLCache
+
+# Discord caps messages at 2000 characters
+MESSAGE_LIMIT = 2000
+# Concurrent fetch_user calls when a name is not in the member cache
+FETCH_CONCURRENCY = 8
+# Resolved display names are reused for this many seconds
+DISPLAY_NAME_TTL = 600
 
 
 class RegisterCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.display_names = TTLCache(DISPLAY_NAME_TTL)
+        self.fetch_semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
         self.init_db()
 
     def init_db(self):
-        """Initialize the SQLite database and players table."""
+        """Initialize the shared match database and import any legacy players.db registrations."""
         try:
-            with sqlite3.connect('players.db') as conn:
-                c = conn.cursor()
-                c.execute(
-                    '''
-                    CREATE TABLE IF NOT EXISTS players (
-                        discord_id TEXT PRIMARY KEY,
-                        ign TEXT,
-                        registered_at TEXT
-                    )
-                    '''
-                )
-                conn.commit()
-                print("Database initialized successfully in RegisterCog.")
+            create_database()
+            migrate_legacy_players()
+            registry.load()
+            print("Database initialized successfully in RegisterCog.")
         except Exception as e:
             print(f"Database error in RegisterCog: {e}")
 
@@ -41,6 +43,60 @@ class RegisterCog(commands.Cog):
         except ValueError:
             return None
 
+    def cached_display_name(self, guild, discord_id: str):
+        """Display name from the TTL cache or the guild member cache, without any REST call."""
+        name = self.display_names.get(discord_id)
+        if name is None and guild is not None:
+            member = guild.get_member(int(discord_id))
+            if member is not None:
+                name = member.display_name
+                self.display_names.set(discord_id, name)
+        return name
+
+    async def fetch_display_name(self, discord_id: str):
+        """Fetch a user over REST, at most FETCH_CONCURRENCY at a time."""
+        async with self.fetch_semaphore:
+            try:
+                user = await self.bot.fetch_user(int(discord_id))
+            except Exception:
+                return "Unknown User"
+        self.display_names.set(discord_id, user.display_name)
+        return user.display_name
+
+    async def send_player_list(self, ctx: commands.Context, players):
+        """
+        Send the playerlist in MESSAGE_LIMIT-sized parts. Uncached users are fetched
+        concurrently up front, and each part goes out as soon as it is full.
+        """
+        pending = {}
+        for discord_id, _ in players:
+            if discord_id not in pending and self.cached_display_name(ctx.guild, discord_id) is None:
+                pending[discord_id] = asyncio.ensure_future(self.fetch_display_name(discord_id))
+
+        part = 1
+        header = "**Player List:**"
+        lines, length = [], len(header)
+        try:
+            for discord_id, ign in players:
+                name = self.cached_display_name(ctx.guild, discord_id)
+                if name is None:
+                    name = await pending[discord_id]
+                line = f"{ign} - {name}"
+
+                if length + len(line) + 1 > MESSAGE_LIMIT:
+                    await ctx.send(header + "\n" + "\n".join(lines))
+                    part += 1
+                    header = f"**Player List (Part {part}):**"
+                    lines, length = [], len(header)
+                lines.append(line)
+                length += len(line) + 1
+
+            if lines:
+                await ctx.send(header + "\n" + "\n".join(lines))
+        finally:
+            for task in pending.values():
+                task.cancel()
+
     @commands.hybrid_command(name="ping", description="Test if the bot is online")
     async def ping(self, ctx: commands.Context):
         print(f"Received ping command from {ctx.author}")
@@ -91,23 +147,16 @@ class RegisterCog(commands.Cog):
                     await ctx.send(f"User with ID {user_id} not found!")
                     return
 
-            with sqlite3.connect('players.db') as conn:
-                c = conn.cursor()
-                c.execute("SELECT ign FROM players WHERE discord_id = ?", (str(user.id),))
-                existing = c.fetchone()
-
-                if existing:
-                    await ctx.send(
-                        f"User {user.display_name} (ID: {user.id}) is already registered as `{existing[0]}`. "
-                        f"Use `/changeign` to update."
-                    )
-                else:
-                    c.execute(
-                        "INSERT INTO players (discord_id, ign, registered_at) VALUES (?, ?, ?)",
-                        (str(user.id), ign, datetime.utcnow().isoformat())
-                    )
-                    conn.commit()
-                    await ctx.send(f"Registered user {user.display_name} (ID: {user.id}) as `{ign}`.")
+            existing = registry.get_ign(user.id)
+            if existing:
+                await ctx.send(
+                    f"User {user.display_name} (ID: {user.id}) is already registered as `{existing}`. "
+                    f"Use `/changeign` to update."
+                )
+            elif registry.register(ign, user.name, user.id):
+                await ctx.send(f"Registered user {user.display_name} (ID: {user.id}) as `{ign}`.")
+            else:
+                await ctx.send(f"The IGN `{ign}` is already registered to another user.")
         except Exception as e:
             print(f"Error in register command: {e}")
             await ctx.send(f"An error occurred: {e}")
@@ -141,20 +190,12 @@ class RegisterCog(commands.Cog):
                     await ctx.send(f"User with ID {user_id} not found!")
                     return
 
-            with sqlite3.connect('players.db') as conn:
-                c = conn.cursor()
-                c.execute("SELECT ign FROM players WHERE discord_id = ?", (str(user.id),))
-                existing = c.fetchone()
-
-                if not existing:
-                    await ctx.send(f"User {user.display_name} (ID: {user.id}) is not registered. Use `/register` first.")
-                else:
-                    c.execute(
-                        "UPDATE players SET ign = ?, registered_at = ? WHERE discord_id = ?",
-                        (new_ign, datetime.utcnow().isoformat(), str(user.id))
-                    )
-                    conn.commit()
-                    await ctx.send(f"Updated user {user.display_name} (ID: {user.id})'s IGN to `{new_ign}`.")
+            if not registry.get_ign(user.id):
+                await ctx.send(f"User {user.display_name} (ID: {user.id}) is not registered. Use `/register` first.")
+            elif registry.change_ign(user.id, new_ign) is None:
+                await ctx.send(f"The IGN `{new_ign}` is already registered to another user.")
+            else:
+                await ctx.send(f"Updated user {user.display_name} (ID: {user.id})'s IGN to `{new_ign}`.")
         except Exception as e:
             print(f"Error in changeign command: {e}")
             await ctx.send(f"An error occurred: {e}")
@@ -168,12 +209,9 @@ class RegisterCog(commands.Cog):
         try:
             if target.lower() == 'me':
                 user = ctx.author
-                with sqlite3.connect('players.db') as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT ign FROM players WHERE discord_id = ?", (str(user.id),))
-                    result = c.fetchone()
+                result = registry.get_ign(user.id)
                 if result:
-                    await ctx.send(f"Your IGN is: `{result[0]}`")
+                    await ctx.send(f"Your IGN is: `{result}`")
                 else:
                     await ctx.send("You are not registered. Use `/register` to register yourself.")
 
@@ -182,30 +220,12 @@ class RegisterCog(commands.Cog):
                     await ctx.send("You need the 'Executive' role to view the playerlist!")
                     return
 
-                with sqlite3.connect('players.db') as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT discord_id, ign FROM players ORDER BY ign")
-                    players = c.fetchall()
+                players = registry.players()
 
                 if not players:
                     await ctx.send("No players are currently registered.")
                 else:
-                    player_list = []
-                    for discord_id, ign in players:
-                        try:
-                            user = await self.bot.fetch_user(int(discord_id))
-                            player_list.append(f"{ign} - {user.display_name}")
-                        except Exception:
-                            player_list.append(f"{ign} - Unknown User")
-
-                    message = "**Player List:**\n" + "\n".join(player_list)
-                    if len(message) > 2000:
-                        chunks = [player_list[i:i + 30] for i in range(0, len(player_list), 30)]
-                        for i, chunk in enumerate(chunks):
-                            chunk_message = f"**Player List (Part {i + 1}):**\n" + "\n".join(chunk)
-                            await ctx.send(chunk_message)
-                    else:
-                        await ctx.send(message)
+                    await self.send_player_list(ctx, players)
 
             else:
                 user_id = self.extract_user_id(target)
@@ -221,13 +241,9 @@ class RegisterCog(commands.Cog):
                     await ctx.send(f"User with ID {user_id} not found!")
                     return
 
-                with sqlite3.connect('players.db') as conn:
-                    c = conn.cursor()
-                    c.execute("SELECT ign FROM players WHERE discord_id = ?", (str(user.id),))
-                    result = c.fetchone()
-
+                result = registry.get_ign(user.id)
                 if result:
-                    await ctx.send(f"{user.display_name}'s IGN is: `{result[0]}`")
+                    await ctx.send(f"{user.display_name}'s IGN is: `{result}`")
                 else:
                     await ctx.send(f"{user.display_name} is not registered.")
         except Exception as e:
@@ -0,0 +1,166 @@
+# registry.py — process-wide, write-through cache of the player registry
+import threading
+
+from db import (normalize_ign, display_form, get_registered_players, register_player,
+                change_player_ign)
+
+
+def bounded_levenshtein(s1, s2, max_distance=None):
+    """
+    Levenshtein distance that gives up once every cell of a row exceeds max_distance.
+    Returns max_distance + 1 in that case (or the exact distance when max_distance is None).
+    """
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    if max_distance is not None and len(s1) - len(s2) > max_distance:
+        return max_distance + 1
+    if len(s2) == 0:
+        return len(s1)
+
+    previous_row = list(range(len(s2) + 1))
+    for i, c1 in enumerate(s1):
+        current_row = [i + 1]
+        for j, c2 in enumerate(s2):
+            current_row.append(min(previous_row[j + 1] + 1,
+                                   current_row[j] + 1,
+                                   previous_row[j] + (c1 != c2)))
+        if max_distance is not None and min(current_row) > max_distance:
+            return max_distance + 1
+        previous_row = current_row
+    return previous_row[-1]
+
+
+class WhitelistIndex:
+    """
+    Fuzzy-match index over normalized IGNs, bucketed by length so a lookup with
+    max_distance d only compares against names whose length is within d.
+    """
+
+    def __init__(self, names):
+        self.names = {}      # normalized -> display IGN
+        self.by_length = {}  # length -> [normalized, ...]
+        for name in names:
+            key = normalize_ign(name)
+            if key in self.names:
+                continue
+            self.names[key] = name
+            self.by_length.setdefault(len(key), []).append(key)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return iter(self.names.values())
+
+    def closest(self, text, max_distance=3, exclude=()):
+        """
+        Returns (display IGN, distance) of the closest name not in exclude,
+        or (None, None) if nothing is within max_distance (None = unbounded).
+        """
+        key = normalize_ign(text)
+        if key in self.names and self.names[key] not in exclude:
+            return self.names[key], 0
+
+        if max_distance is None:
+            lengths = self.by_length.keys()
+        else:
+            lengths = range(max(0, len(key) - max_distance), len(key) + max_distance + 1)
+
+        best_name, best_d = None, None
+        limit = max_distance
+        for length in lengths:
+            for candidate in self.by_length.get(length, ()):
+                name = self.names[candidate]
+                if name in exclude:
+                    continue
+                d = bounded_levenshtein(key, candidate, limit)
+                if limit is None or d <= limit:
+                    if best_d is None or d < best_d:
+                        best_name, best_d = name, d
+                        limit = d
+        return best_name, best_d
+
+
+class PlayerRegistry:
+    """
+    discord_id <-> IGN maps loaded once from match_data.db and kept current by
+    register()/change_ign(), which write to the database first. version is bumped
+    on every change so OCR workers know when to rebuild their whitelist.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.ign_by_discord_id = {}
+        self.discord_id_by_ign = {}  # normalized IGN -> discord_id (None if unlinked)
+        self.display_ign = {}        # normalized IGN -> IGN as registered
+        self.index = WhitelistIndex([])
+        self.version = 0
+        self.loaded = False
+
+    def load(self):
+        """(Re)load the whole registry from the database."""
+        rows = get_registered_players(include_unlinked=True)
+        with self._lock:
+            self.ign_by_discord_id = {d: ign for d, ign in rows if d is not None}
+            self.discord_id_by_ign = {normalize_ign(ign): d for d, ign in rows}
+            self.display_ign = {normalize_ign(ign): ign for _, ign in rows}
+            self._rebuild_index()
+            self.loaded = True
+        print(f"Player registry loaded: {len(rows)} player(s), version {self.version}.")
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+        return self
+
+    def _rebuild_index(self):
+        # Called with the lock held, after the dicts have been updated
+        self.index = WhitelistIndex(self.display_ign.values())
+        self.version += 1
+
+    def get_ign(self, discord_id):
+        self.ensure_loaded()
+        return self.ign_by_discord_id.get(str(discord_id))
+
+    def get_discord_id(self, ign):
+        self.ensure_loaded()
+        return self.discord_id_by_ign.get(normalize_ign(ign))
+
+    def players(self):
+        """(discord_id, ign) for Discord-linked players, ordered by IGN like the database query."""
+        self.ensure_loaded()
+        return sorted(self.ign_by_discord_id.items(), key=lambda item: item[1])
+
+    def register(self, ign, discord_name, discord_id):
+        """Write-through /register. Returns False if the IGN or Discord ID is taken."""
+        self.ensure_loaded()
+        if not register_player(ign, discord_name, str(discord_id)):
+            return False
+        with self._lock:
+            key = normalize_ign(ign)
+            # Claiming an unlinked row keeps the IGN as it was stored
+            self.display_ign.setdefault(key, display_form(ign))
+            self.ign_by_discord_id[str(discord_id)] = self.display_ign[key]
+            self.discord_id_by_ign[key] = str(discord_id)
+            self._rebuild_index()
+        return True
+
+    def change_ign(self, discord_id, new_ign):
+        """Write-through /changeign. Returns the old IGN, or None on failure."""
+        self.ensure_loaded()
+        old_ign = change_player_ign(str(discord_id), new_ign)
+        if old_ign is None:
+            return None
+        new_ign = display_form(new_ign)  # as change_player_ign stored it
+        with self._lock:
+            self.discord_id_by_ign.pop(normalize_ign(old_ign), None)
+            self.display_ign.pop(normalize_ign(old_ign), None)
+            self.ign_by_discord_id[str(discord_id)] = new_ign
+            self.discord_id_by_ign[normalize_ign(new_ign)] = str(discord_id)
+            self.display_ign[normalize_ign(new_ign)] = new_ign
+            self._rebuild_index()
+        return old_ign
+
+
+# Shared instance for the bot process (and each OCR worker process)
+registry = PlayerRegistry()
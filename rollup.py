@@ -0,0 +1,339 @@
+# rollup.py — daily/monthly stat buckets per player, champion and map for time-windowed queries
+import os
+import sqlite3
+import argparse
+from calendar import monthrange
+from datetime import datetime, timedelta
+
+from db import DB_PATH, normalize_ign, add_insert_listener
+
+DIMENSIONS = ("player", "champion", "map")
+STAT_COLUMNS = ("matches", "wins", "kills", "deaths", "assists", "damage", "healing", "minutes")
+# Compaction keeps this many months (the current one included) as daily buckets
+COMPACT_KEEP_MONTHS = 2
+# Before the archive, run.py saved each download as <dir>/<match_id>.png next to itself
+LEGACY_IMAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# -------------------------------
+# Schema
+# -------------------------------
+def create_rollup_tables():
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    # wins: the player's team won (player, champion) or team1 won (map)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS stat_rollups (
+        dimension TEXT CHECK(dimension IN ('player', 'champion', 'map')),
+        key TEXT,             -- player_id, champion name or map name
+        period TEXT CHECK(period IN ('day', 'month')),
+        bucket TEXT,          -- UTC YYYY-MM-DD for days, YYYY-MM for months
+        matches INTEGER,
+        wins INTEGER,
+        kills INTEGER,
+        deaths INTEGER,
+        assists INTEGER,
+        damage INTEGER,
+        healing INTEGER,
+        minutes INTEGER,
+        PRIMARY KEY (dimension, key, period, bucket)
+    );
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_stat_rollups_window ON stat_rollups(dimension, period, bucket);
+    """)
+
+    conn.commit()
+    conn.close()
+
+
+# -------------------------------
+# Buckets
+# -------------------------------
+def match_deltas(match, rows):
+    """
+    {(dimension, key): [matches, wins, kills, deaths, assists, damage, healing, minutes]} for one match.
+    rows: (player_id, team, champion, kills, deaths, assists, damage, healing) per stored player.
+    """
+    team1_won = match["team1_score"] > match["team2_score"]
+    minutes = match.get("time_minutes") or 0
+    deltas = {("map", match["map"]): [1, int(team1_won), 0, 0, 0, 0, 0, minutes]}
+    for player_id, team, champion, kills, deaths, assists, damage, healing in rows:
+        won = int((team == "team1") == team1_won)
+        stats = [1, won, kills or 0, deaths or 0, assists or 0, damage or 0, healing or 0, minutes]
+        deltas[("player", str(player_id))] = stats
+        if champion != "Unknown":
+            totals = deltas.setdefault(("champion", champion), [0] * len(STAT_COLUMNS))
+            for i, value in enumerate(stats):
+                totals[i] += value
+    return deltas
+
+
+def _add_to_buckets(cursor, period, bucket_rows):
+    """bucket_rows: [(dimension, key, bucket, stats)] added onto whatever is stored."""
+    cursor.executemany(f"""
+    INSERT INTO stat_rollups (dimension, key, period, bucket, {', '.join(STAT_COLUMNS)})
+    VALUES (?, ?, '{period}', ?, {', '.join('?' * len(STAT_COLUMNS))})
+    ON CONFLICT(dimension, key, period, bucket) DO UPDATE SET
+        {', '.join(f'{c} = {c} + excluded.{c}' for c in STAT_COLUMNS)};
+    """, [(dimension, key, bucket, *stats) for dimension, key, bucket, stats in bucket_rows])
+
+
+def _player_rows(cursor, match_id):
+    cursor.execute("""
+    SELECT player_id, team, champion, kills, deaths, assists, damage, healing
+    FROM player_stats WHERE match_id = ? AND player_id IS NOT NULL;
+    """, (match_id,))
+    return cursor.fetchall()
+
+
+def update_rollups_for_match(match, inserted):
+    """
+    Insert listener: add one newly stored match to the daily buckets of its ingest day.
+    A re-parsed match first takes the stats of the version it replaced back out.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        bucket_rows = []
+        replaced = match.get("replaced")
+        # Matches stored before ingested_at existed were never bucketed
+        if replaced and replaced["match"]["ingested_at"]:
+            old_day = replaced["match"]["ingested_at"][:10]
+            old_rows = [(r["player_id"], r["team"], r["champion"], r["kills"], r["deaths"], r["assists"],
+                         r["damage"], r["healing"]) for r in replaced["inserted"]]
+            # In a compacted month this leaves a negative daily bucket; the next compact() folds it in
+            bucket_rows += [(dim, key, old_day, [-v for v in stats])
+                            for (dim, key), stats in match_deltas(replaced["match"], old_rows).items()]
+        # ...and a re-parse of one with no ingest time on record still isn't
+        if match["ingested_at"]:
+            day = match["ingested_at"][:10]
+            deltas = match_deltas(match, _player_rows(cursor, match["match_id"]))
+            bucket_rows += [(dim, key, day, stats) for (dim, key), stats in deltas.items()]
+        _add_to_buckets(cursor, "day", bucket_rows)
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"An error occurred while updating rollups: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def enable_rollups():
+    """Create the rollup table and keep it updated as scoreboards are inserted."""
+    create_rollup_tables()
+    add_insert_listener(update_rollups_for_match)
+
+
+def backfill_ingested_at(image_dir=LEGACY_IMAGE_DIR):
+    """
+    Give matches stored before ingested_at existed the best ingest time still on record: the
+    archive's archived_at, else the mtime of the screenshot run.py saved as <image_dir>/<match_id>.png.
+    Returns (matches filled, matches still without one).
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    filled = 0
+    try:
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'screenshots';")
+        if cursor.fetchone():
+            # archived_at is SQLite's CURRENT_TIMESTAMP, UTC 'YYYY-MM-DD HH:MM:SS'
+            cursor.execute("""
+            UPDATE matches SET ingested_at = (
+                SELECT replace(s.archived_at, ' ', 'T') FROM screenshots s WHERE s.match_id = matches.match_id
+            )
+            WHERE ingested_at IS NULL AND match_id IN (
+                SELECT match_id FROM screenshots WHERE archived_at IS NOT NULL
+            );
+            """)
+            filled += cursor.rowcount
+        cursor.execute("SELECT match_id FROM matches WHERE ingested_at IS NULL;")
+        for (match_id,) in cursor.fetchall():
+            path = os.path.join(image_dir, f"{match_id}.png")
+            if os.path.exists(path):
+                cursor.execute("UPDATE matches SET ingested_at = ? WHERE match_id = ?;",
+                               (datetime.utcfromtimestamp(os.path.getmtime(path)).isoformat(), match_id))
+                filled += 1
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"An error occurred while backfilling ingest times: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+    return filled, undated_matches()
+
+
+def undated_matches():
+    """Matches with no ingest time, which no window can count."""
+    with sqlite3.connect(DB_PATH) as conn:
+        return conn.execute("SELECT COUNT(*) FROM matches WHERE ingested_at IS NULL;").fetchone()[0]
+
+
+def rebuild_rollups(keep_months=COMPACT_KEEP_MONTHS, image_dir=LEGACY_IMAGE_DIR):
+    """
+    Recompute every bucket from matches and player_stats, then compact.
+    Ingest times are backfilled first where they can be; matches still without one are left out.
+    """
+    create_rollup_tables()
+    filled, undated = backfill_ingested_at(image_dir)
+    if filled or undated:
+        print(f"Backfilled the ingest time of {filled} match(es); {undated} have none and are left out.")
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+        SELECT match_id, time_minutes, map, team1_score, team2_score, ingested_at
+        FROM matches WHERE ingested_at IS NOT NULL ORDER BY match_id;
+        """)
+        totals = {}
+        matches = cursor.fetchall()
+        for match_id, time_minutes, map_name, team1_score, team2_score, ingested_at in matches:
+            match = {"time_minutes": time_minutes, "map": map_name,
+                     "team1_score": team1_score, "team2_score": team2_score}
+            for (dim, key), stats in match_deltas(match, _player_rows(cursor, match_id)).items():
+                bucket = totals.setdefault((dim, key, ingested_at[:10]), [0] * len(STAT_COLUMNS))
+                for i, value in enumerate(stats):
+                    bucket[i] += value
+
+        cursor.execute("DELETE FROM stat_rollups;")
+        _add_to_buckets(cursor, "day", [(dim, key, day, stats) for (dim, key, day), stats in totals.items()])
+        conn.commit()
+        print(f"Rebuilt rollups from {len(matches)} matches.")
+    except sqlite3.Error as e:
+        print(f"An error occurred while rebuilding rollups: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+    return compact(keep_months)
+
+
+def compact(keep_months=COMPACT_KEEP_MONTHS, today=None):
+    """
+    Merge the daily buckets of months older than the newest keep_months into monthly ones.
+    Returns (daily rows merged, monthly rows written).
+    """
+    today = today or datetime.utcnow().date()
+    month = today.year * 12 + today.month - 1 - (keep_months - 1)
+    cutoff = f"{month // 12:04d}-{month % 12 + 1:02d}-01"
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""
+        SELECT COUNT(*), COUNT(DISTINCT dimension || '|' || key || '|' || substr(bucket, 1, 7))
+        FROM stat_rollups WHERE period = 'day' AND bucket < ?;
+        """, (cutoff,))
+        merged, months = cursor.fetchone()
+        cursor.execute(f"""
+        INSERT INTO stat_rollups (dimension, key, period, bucket, {', '.join(STAT_COLUMNS)})
+        SELECT dimension, key, 'month', substr(bucket, 1, 7), {', '.join(f'SUM({c})' for c in STAT_COLUMNS)}
+        FROM stat_rollups WHERE period = 'day' AND bucket < ?
+        GROUP BY dimension, key, substr(bucket, 1, 7)
+        ON CONFLICT(dimension, key, period, bucket) DO UPDATE SET
+            {', '.join(f'{c} = {c} + excluded.{c}' for c in STAT_COLUMNS)};
+        """, (cutoff,))
+        cursor.execute("DELETE FROM stat_rollups WHERE period = 'day' AND bucket < ?;", (cutoff,))
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"An error occurred while compacting rollups: {e}")
+        conn.rollback()
+        return 0, 0
+    finally:
+        conn.close()
+    return merged, months
+
+
+# -------------------------------
+# Window queries
+# -------------------------------
+def last_days(days, today=None):
+    """(start, end) ISO dates covering the last `days` days, today (UTC) included."""
+    today = today or datetime.utcnow().date()
+    return (today - timedelta(days=days - 1)).isoformat(), today.isoformat()
+
+
+def get_window(dimension, start, end, keys=None):
+    """
+    {key: {matches, wins, ...}} summed over buckets from start to end (ISO dates, inclusive).
+    Compacted months have no daily detail and count whole if they overlap the window;
+    window_coverage() says which months that was.
+    """
+    start, end = str(start)[:10], str(end)[:10]
+    params = [dimension, start, end, start[:7], end[:7]]
+    key_filter = ""
+    if keys is not None:
+        keys = [str(k) for k in keys]
+        if not keys:
+            return {}
+        key_filter = f"AND key IN ({', '.join('?' * len(keys))})"
+        params += keys
+    with sqlite3.connect(DB_PATH) as conn:
+        rows = conn.execute(f"""
+        SELECT key, {', '.join(f'SUM({c})' for c in STAT_COLUMNS)}
+        FROM stat_rollups
+        WHERE dimension = ? AND (
+            (period = 'day' AND bucket BETWEEN ? AND ?) OR
+            (period = 'month' AND bucket BETWEEN ? AND ?)
+        ) {key_filter}
+        GROUP BY key;
+        """, params).fetchall()
+    return {row[0]: dict(zip(STAT_COLUMNS, row[1:])) for row in rows}
+
+
+def window_coverage(start, end):
+    """
+    What a window's totals really cover: {"whole_months": compacted months (YYYY-MM) the window
+    only partly overlaps but that count in full, "undated_matches": matches no window counts}.
+    """
+    start, end = str(start)[:10], str(end)[:10]
+    with sqlite3.connect(DB_PATH) as conn:
+        months = [row[0] for row in conn.execute("""
+        SELECT DISTINCT bucket FROM stat_rollups
+        WHERE period = 'month' AND bucket BETWEEN ? AND ?
+        ORDER BY bucket;
+        """, (start[:7], end[:7]))]
+    whole_months = []
+    for month in months:
+        year, mon = int(month[:4]), int(month[5:7])
+        first, last = f"{month}-01", f"{month}-{monthrange(year, mon)[1]:02d}"
+        if first < start or last > end:
+            whole_months.append(month)
+    return {"whole_months": whole_months, "undated_matches": undated_matches()}
+
+
+def get_window_winrate(player_ign, start, end):
+    """Returns (wins, total_matches) for a player within the window, like db.get_winrate."""
+    with sqlite3.connect(DB_PATH) as conn:
+        row = conn.execute("SELECT player_id FROM players WHERE ign_normalized = ?;",
+                           (normalize_ign(player_ign),)).fetchone()
+    if not row:
+        return 0, 0
+    stats = get_window("player", start, end, [row[0]]).get(str(row[0]))
+    return (stats["wins"], stats["matches"]) if stats else (0, 0)
+
+
+def get_window_leaderboard(start, end, min_matches=5, limit=10):
+    """Returns (player_ign, matches, wins) like db.get_leaderboard, for the window only."""
+    totals = get_window("player", start, end)
+    with sqlite3.connect(DB_PATH) as conn:
+        names = dict(conn.execute("SELECT CAST(player_id AS TEXT), player_ign FROM players;").fetchall())
+    rows = [(names[key], s["matches"], s["wins"]) for key, s in totals.items()
+            if key in names and s["matches"] >= min_matches]
+    rows.sort(key=lambda r: (-r[2] / r[1], -r[1]))
+    return rows[:limit]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the stat rollup buckets.")
+    parser.add_argument("command", choices=("compact", "rebuild"))
+    parser.add_argument("--keep-months", type=int, default=COMPACT_KEEP_MONTHS,
+                        help="months (current one included) kept as daily buckets")
+    args = parser.parse_args()
+
+    create_rollup_tables()
+    if args.command == "rebuild":
+        merged, months = rebuild_rollups(args.keep_months)
+    else:
+        merged, months = compact(args.keep_months)
+    print(f"Compacted {merged} daily bucket(s) into {months} monthly bucket(s).")
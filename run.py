@@ -2,8 +2,18 @@ import discord
 from discord.ext import commands
 import aiohttp
 import os
-import subprocess
 import asyncio
+import json
+import time
+from db import create_database, insert_scoreboard
+from metrics import bot_metrics, SIZE_BUCKETS_BYTES
+from rating import enable_incremental_ratings
+from rollup import enable_rollups
+from dispatcher import ReplyDispatcher, is_assistant_reply
+from ocr_worker import OCRWorkerPool
+from registry import registry
+from command_sync import sync_if_changed
+import archive
 
 # Enable necessary intents for message content and members
 intents = discord.Intents.default()
@@ -13,67 +23,128 @@ intents.members = True
 # Initialize the bot with multiple prefixes
 bot = commands.Bot(command_prefix=['--', '>>'], intents=intents)
 
-# Directory to save downloaded images
+# Keep player ratings and the daily stat buckets current as matches are stored
+create_database()
+enable_incremental_ratings()
+enable_rollups()
+archive.create_archive_table()
+
+# Directory for parsed scoreboard JSON; images go to the archive (archive.ARCHIVE_DIR)
 SAVE_DIR = os.path.dirname(os.path.abspath(__file__))
 if not os.path.exists(SAVE_DIR):
     os.makedirs(SAVE_DIR)
 
+# Seconds a >>match waits for the PaladinsAssistant reply
+MATCH_REPLY_TIMEOUT = 60.0
+# Pending >>match requests, keyed by (channel id, match id)
+replies = ReplyDispatcher()
+# Cogs loaded on the first ready event
+EXTENSIONS = ['register', 'stats', 'balance', 'monitor']
+GUILD_ID = 1363341336341909535
+# Warm OCR processes (OCR_WORKERS env var); the bot itself never imports ocr.py
+ocr_pool = OCRWorkerPool()
+
+
+async def run_ocr(image_path, match_id, output_path):
+    """Parse one scoreboard on a warm OCR worker. Returns (ok, error)."""
+    return await ocr_pool.parse(image_path, output_path, registry.version, match_id=match_id)
+
 @bot.event
-async def on_ready():
-    print(f'Logged in as {bot.user}')
-    try:
-        # Load the register cog
-        await bot.load_extension('register')
-        print("Loaded register cog")
-        # Guild-specific syncing (replace YOUR_GUILD_ID)
-        synced = await bot.tree.sync(guild=discord.Object(id=1363341336341909535))
-        print(f"Synced {len(synced)} command(s) to guild")
-    except Exception as e:
-        print(f"Failed to sync commands or load cog: {e}")
+async def setup_hook():
+    # Runs once before connecting, so the first >>match finds the workers loaded
     try:
-        # Global syncing as fallback
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} command(s) globally")
+        ready = await ocr_pool.start()
+        print(f"{ocr_pool.size} OCR worker(s) ready in {ready:.1f}s")
     except Exception as e:
-        print(f"Failed to sync commands globally: {e}")
+        print(f"Failed to start OCR workers (will retry on first >>match): {e}")
+
+@bot.event
+async def on_ready():
+    # on_ready fires again on every reconnect; cogs load once and syncs are skipped
+    # unless the command tree changed since the last sync
+    print(f'Logged in as {bot.user}')
+    for extension in EXTENSIONS:
+        if extension in bot.extensions:
+            continue
+        try:
+            await bot.load_extension(extension)
+            print(f"Loaded {extension} cog")
+        except Exception as e:
+            print(f"Failed to load {extension} cog: {e}")
+    for label, guild in (("to guild", discord.Object(id=GUILD_ID)), ("globally", None)):
+        try:
+            synced = await sync_if_changed(bot, guild)
+            if synced is None:
+                print(f"Commands unchanged, skipped sync {label}")
+            else:
+                print(f"Synced {synced} command(s) {label}")
+        except Exception as e:
+            print(f"Failed to sync commands {label}: {e}")
 
 @bot.event
 async def on_message(message):
     if message.author == bot.user:
         return
 
+    if is_assistant_reply(message) and replies.route(message) is None:
+        bot_metrics.inc("match_replies_unrouted_total", 1, "Assistant replies with no matching >>match")
+
     if message.content.startswith('>>match'):
         print(f"Received >>match command from {message.author}")
+        bot_metrics.inc("match_requests_total", 1, ">>match commands received")
+        bot_metrics.add("match_in_flight", 1, ">>match commands currently being handled")
+        started = time.perf_counter()
         try:
             match_id = message.content.split()[1].strip()
+            if replies.is_pending(message.channel.id, match_id):
+                await message.channel.send(f"Already waiting for match {match_id} in this channel.")
+                return
 
-            def check(m):
-                return m.author.name == "PaladinsAssistant" and m.author.discriminator == "2894" and m.attachments
-
-            bot_response = await bot.wait_for('message', check=check, timeout=60.0)
+            try:
+                bot_metrics.set("match_pending_replies", len(replies) + 1, ">>match commands awaiting a reply")
+                with bot_metrics.time("match_reply_wait_seconds", "Wait for the PaladinsAssistant reply"):
+                    bot_response = await replies.wait(message.channel.id, match_id, message.id,
+                                                      MATCH_REPLY_TIMEOUT)
+            finally:
+                bot_metrics.set("match_pending_replies", len(replies))
 
             if bot_response.attachments:
                 attachment = bot_response.attachments[0]
-                image_path = os.path.join(SAVE_DIR, f"{match_id}.png")
+                output_path = os.path.join(SAVE_DIR, f"parsed_{match_id}.json")
                 async with aiohttp.ClientSession() as session:
+                    download_started = time.perf_counter()
                     async with session.get(attachment.url) as resp:
                         if resp.status == 200:
-                            with open(image_path, 'wb') as f:
-                                f.write(await resp.read())
-                            print(f"Image downloaded: {image_path}")
+                            data = await resp.read()
+                            # Stored once per distinct image, named by its SHA-256
+                            image_path = archive.store(match_id, data)
+                            bot_metrics.observe("match_download_seconds", time.perf_counter() - download_started,
+                                                "Scoreboard image download time")
+                            bot_metrics.inc("match_download_bytes_total", len(data), "Scoreboard bytes downloaded")
+                            bot_metrics.observe("match_download_size_bytes", len(data), "Scoreboard image size",
+                                                buckets=SIZE_BUCKETS_BYTES)
+                            print(f"Image archived: {image_path}")
 
                             try:
-                                result = subprocess.run(
-                                    ['python', 'ocr.py', image_path, match_id],
-                                    capture_output=True,
-                                    text=True
-                                )
-                                print(f"ocr.py output: {result.stdout}")
-                                if result.stderr:
-                                    print(f"ocr.py error: {result.stderr}")
+                                with bot_metrics.time("match_ocr_seconds", "OCR time per scoreboard"):
+                                    ok, error = await run_ocr(image_path, match_id, output_path)
+                                if error:
+                                    print(f"OCR error: {error}")
+                                if ok:
+                                    # Store the match; this also invalidates cached stats
+                                    with open(output_path, 'r', encoding='utf-8') as f:
+                                        scoreboard = json.load(f)
+                                    with bot_metrics.time("match_db_insert_seconds", "insert_scoreboard time"):
+                                        inserted = insert_scoreboard(scoreboard)
+                                    # A match that is already stored stays as it is; its new image is
+                                    # left stale in the archive for `batch.py archive` to re-parse
+                                    if inserted:
+                                        archive.record_parse(match_id, scoreboard.get("parse_version"))
+                                else:
+                                    bot_metrics.inc("match_ocr_failures_total", 1, "OCR jobs that failed")
                                 await message.channel.send(f"Processed image for match {match_id}")
                             except Exception as e:
-                                print(f"Error running ocr.py: {e}")
+                                print(f"Error running OCR: {e}")
                                 await message.channel.send("Error processing the image.")
                         else:
                             await message.channel.send("Failed to download the image.")
@@ -82,12 +153,18 @@ async def on_message(message):
         except IndexError:
             await message.channel.send("Please provide a valid match ID after >>match")
         except asyncio.TimeoutError:
+            bot_metrics.inc("match_reply_timeouts_total", 1, "No PaladinsAssistant reply within the timeout")
             await message.channel.send("Timed out waiting for PaladinsAssistant's response.")
         except Exception as e:
             print(f"Error in >>match: {e}")
             await message.channel.send("An error occurred while processing the command.")
+        finally:
+            bot_metrics.add("match_in_flight", -1)
+            bot_metrics.observe("match_total_seconds", time.perf_counter() - started,
+                                "End-to-end >>match handling time")
 
     await bot.process_commands(message)
 
-# Replace with your actual bot token
-bot.run('MTQwODE5NDUxNDMyOTUzNDU0Ng.G4Otp1.SfPdMOVqqJk_1heAAQIBQ0UApp9ZKX46IxAiNU')
\ No newline at end of file
+if __name__ == "__main__":
+    # Replace with your actual bot token
+    bot.run('MTQwODE5NDUxNDMyOTUzNDU0Ng.G4Otp1.SfPdMOVqqJk_1heAAQIBQ0UApp9ZKX46IxAiNU')
\ No newline at end of file
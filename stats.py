@@ -0,0 +1,124 @@
+from discord.ext import commands
+import re
+from db import (normalize_ign, get_winrate, get_top_champions, get_leaderboard,
+                add_insert_listener, remove_insert_listener)
+from registry import registry
+from cache import QueryCache
+from rollup import last_days, get_window_winrate, get_window_leaderboard, window_coverage
+
+# Results are dropped on insert anyway; the TTL only bounds staleness from outside writers
+STATS_CACHE_TTL = 3600
+STATS_CACHE_SIZE = 1024
+# Tag for results that depend on every player (e.g. the leaderboard)
+ALL_PLAYERS = "*"
+LEADERBOARD_MIN_MATCHES = 5
+
+
+class StatsCog(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.cache = QueryCache(STATS_CACHE_TTL, STATS_CACHE_SIZE)
+        add_insert_listener(self.on_scoreboard_inserted)
+
+    def cog_unload(self):
+        remove_insert_listener(self.on_scoreboard_inserted)
+
+    def on_scoreboard_inserted(self, match, inserted):
+        """Drop cached results for the players in a newly committed match (and the one it replaced)."""
+        replaced = match.get("replaced", {}).get("inserted", [])
+        self.cache.invalidate([row["ign_normalized"] for row in inserted + replaced] + [ALL_PLAYERS])
+
+    def resolve_ign(self, ctx: commands.Context, target: str):
+        """Map 'me', a mention, a user ID or a plain IGN to a registered IGN."""
+        if target.lower() == 'me':
+            return registry.get_ign(ctx.author.id)
+        if re.fullmatch(r'<@!?\d+>|\d{15,20}', target):
+            return registry.get_ign(re.sub(r'[<@!>]', '', target))
+        return registry.ensure_loaded().display_ign.get(normalize_ign(target))
+
+    def winrate(self, ign, days=0):
+        if days > 0:
+            return self.cache.cached("window_winrate", (ign, *last_days(days)), [normalize_ign(ign)],
+                                     get_window_winrate)
+        return self.cache.cached("winrate", (ign,), [normalize_ign(ign)], get_winrate)
+
+    def top_champions(self, ign):
+        return self.cache.cached("top_champions", (ign,), [normalize_ign(ign)], get_top_champions)
+
+    def leaderboard(self, days=0):
+        if days > 0:
+            return self.cache.cached("window_leaderboard", (*last_days(days), LEADERBOARD_MIN_MATCHES),
+                                     [ALL_PLAYERS], get_window_leaderboard)
+        return self.cache.cached("leaderboard", (LEADERBOARD_MIN_MATCHES,), [ALL_PLAYERS], get_leaderboard)
+
+    def window_notes(self, days):
+        """Caveats for a last-N-days answer: compacted months counted whole and undated history."""
+        coverage = self.cache.cached("window_coverage", last_days(days), [ALL_PLAYERS], window_coverage)
+        notes = ""
+        if coverage["whole_months"]:
+            notes += (f"\n_Includes whole months {', '.join(coverage['whole_months'])} "
+                      f"(older history is only kept per month)._")
+        if coverage["undated_matches"]:
+            notes += f"\n_{coverage['undated_matches']} older match(es) have no ingest date and are not counted._"
+        return notes
+
+    @commands.hybrid_command(
+        name="stats",
+        description="Stats. Views: winrate, champions, leaderboard, cache. Targets: me, @user, user ID or IGN. "
+                    "days: last N days only (winrate, leaderboard)."
+    )
+    async def stats(self, ctx: commands.Context, view: str, target: str = 'me', days: int = 0):
+        print(f"Received stats command from {ctx.author} with view: {view}, target: {target}, days: {days}")
+        try:
+            view = view.lower()
+            window = f" (last {days} days)" if days > 0 else ""
+            if view == 'leaderboard':
+                rows = self.leaderboard(days)
+                if not rows:
+                    await ctx.send(f"No players with at least {LEADERBOARD_MIN_MATCHES} matches{window} yet.")
+                    return
+                lines = [f"{i + 1}. {ign} - {wins / matches * 100:.2f}% ({matches} matches)"
+                         for i, (ign, matches, wins) in enumerate(rows)]
+                notes = self.window_notes(days) if days > 0 else ""
+                await ctx.send(f"**Leaderboard{window}:**\n" + "\n".join(lines) + notes)
+                return
+
+            if view == 'cache':
+                s = self.cache.stats()
+                await ctx.send(
+                    f"Stats cache: {s['entries']} entries, {s['hits']} hits, {s['misses']} misses "
+                    f"({s['hit_rate'] * 100:.1f}% hit rate), {s['invalidations']} invalidations."
+                )
+                return
+
+            if view not in ('winrate', 'champions'):
+                await ctx.send("Invalid view! Use `winrate`, `champions`, `leaderboard` or `cache`.")
+                return
+
+            ign = self.resolve_ign(ctx, target)
+            if ign is None:
+                await ctx.send(f"`{target}` is not a registered player.")
+                return
+
+            if view == 'winrate':
+                wins, total = self.winrate(ign, days)
+                notes = self.window_notes(days) if days > 0 else ""
+                if total == 0:
+                    await ctx.send(f"No matches found for `{ign}`{window}.{notes}")
+                else:
+                    await ctx.send(f"`{ign}`{window}: {wins}/{total} wins, Winrate: {wins / total * 100:.2f}%{notes}")
+            else:
+                champions = self.top_champions(ign)
+                if not champions:
+                    await ctx.send(f"No champions found for `{ign}`.")
+                else:
+                    lines = [f"- {champion}: {frequency} matches, Winrate: {wins / frequency * 100:.2f}%"
+                             for champion, frequency, wins in champions]
+                    await ctx.send(f"**Top champions for {ign}:**\n" + "\n".join(lines))
+        except Exception as e:
+            print(f"Error in stats command: {e}")
+            await ctx.send(f"An error occurred: {e}")
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(StatsCog(bot))
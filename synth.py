@@ -0,0 +1,183 @@
+# synth.py — render synthetic scoreboards with ground truth for OCR benchmarks
+import os
+import json
+import zipfile
+import argparse
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from ocr import (PLAYER_BOXES, TEAM1_STARTS, TEAM2_STARTS, X_SHIFT, Y_SHIFT,
+                 MATCH_BOXES, MATCH_X_SHIFT, MATCH_Y_SHIFT, ICON_W, ICON_H,
+                 load_player_whitelist, load_map_whitelist, load_region_whitelist)
+
+# -------------------------------
+# Config
+# -------------------------------
+PORTRAIT_ZIP = "champion_icons_scoreboard.zip"
+# Smallest canvas that holds every hard-coded box at scale 1.0
+REFERENCE_SIZE = (2300, 1520)  # (w, h)
+BACKGROUND = 235
+INK = 25
+# ocr.py reads absolute pixel boxes laid out for REFERENCE_SIZE and never resizes a frame,
+# so only scale 1.0 parses; other scales are for when the parser handles other capture sizes
+DEFAULT_SCALES = (1.0,)
+DEFAULT_JPEG_QUALITY = (95, 70)
+
+FONT_CANDIDATES = ["DejaVuSans.ttf", "arial.ttf", "Arial.ttf"]
+
+
+def load_font(size):
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def load_portraits(zip_path=PORTRAIT_ZIP):
+    """{champion hash key: BGR portrait} straight from the ZIP."""
+    portraits = {}
+    with zipfile.ZipFile(zip_path) as z:
+        for name in z.namelist():
+            if name.lower().endswith(".png"):
+                data = np.frombuffer(z.read(name), np.uint8)
+                img = cv2.imdecode(data, cv2.IMREAD_COLOR)
+                if img is not None:
+                    key = os.path.splitext(os.path.basename(name))[0]
+                    portraits[key] = cv2.resize(img, (ICON_W, ICON_H))
+    return portraits
+
+
+# -------------------------------
+# Rendering
+# -------------------------------
+def _draw_text(draw, box, text, font):
+    """Left-aligned, vertically centred text inside an absolute (x1, y1, x2, y2) box."""
+    x1, y1, x2, y2 = box
+    top = draw.textbbox((0, 0), text, font=font)
+    height = top[3] - top[1]
+    draw.text((x1 + 6, y1 + (y2 - y1 - height) // 2 - top[1]), text, fill=(INK, INK, INK), font=font)
+
+
+def random_scoreboard(rng, match_id, names, champions, maps, regions):
+    """Ground truth in the same shape ocr.parse_scoreboard returns."""
+    picked = rng.choice(len(names), 10, replace=False)
+    team1_score = int(rng.integers(0, 5))
+    team2_score = 4 if team1_score < 4 else int(rng.integers(0, 4))
+    teams = {"team1": [], "team2": []}
+    for i, p in enumerate(picked):
+        teams["team1" if i < 5 else "team2"].append({
+            "champion": champions[int(rng.integers(len(champions)))],
+            "player": names[p],
+            "credits": int(rng.integers(2000, 30000)),
+            "kills": int(rng.integers(0, 40)),
+            "deaths": int(rng.integers(0, 20)),
+            "assists": int(rng.integers(0, 40)),
+            "damage": int(rng.integers(0, 300000)),
+            "taken": int(rng.integers(0, 300000)),
+            "objective_time": int(rng.integers(0, 300)),
+            "shielding": int(rng.integers(0, 150000)),
+            "healing": int(rng.integers(0, 300000)),
+        })
+    match = {
+        "time_minutes": int(rng.integers(8, 40)),
+        "region": regions[int(rng.integers(len(regions)))],
+        "map": maps[int(rng.integers(len(maps)))],
+        "team1_score": team1_score,
+        "team2_score": team2_score,
+        "match_id": match_id,
+    }
+    return {"match": match, "teams": teams}
+
+
+def render_scoreboard(truth, portraits):
+    """Draw a scoreboard at REFERENCE_SIZE using the same geometry ocr.py reads."""
+    canvas = np.full((REFERENCE_SIZE[1], REFERENCE_SIZE[0], 3), BACKGROUND, np.uint8)
+    rows = truth["teams"]["team1"] + truth["teams"]["team2"]
+    for y_start, player in zip(TEAM1_STARTS + TEAM2_STARTS, rows):
+        top = max(0, y_start - 4)
+        canvas[top:top + ICON_H, 4:4 + ICON_W] = portraits[player["champion"]]
+
+    pil = Image.fromarray(canvas)
+    draw = ImageDraw.Draw(pil)
+    font = load_font(40)
+    for y_start, player in zip(TEAM1_STARTS + TEAM2_STARTS, rows):
+        values = {
+            "player": player["player"],
+            "credits": f"{player['credits']:,}",
+            "KDA": f"{player['kills']} / {player['deaths']} / {player['assists']}",
+            "damage": f"{player['damage']:,}",
+            "taken": f"{player['taken']:,}",
+            "objective_time": str(player["objective_time"]),
+            "shielding": f"{player['shielding']:,}",
+            "healing": f"{player['healing']:,}",
+        }
+        for key, (x1, y1, x2, y2) in PLAYER_BOXES.items():
+            box = (x1 + X_SHIFT, y_start + y1 + Y_SHIFT, x2 + X_SHIFT, y_start + y2 + Y_SHIFT)
+            _draw_text(draw, box, values[key], font)
+
+    match = truth["match"]
+    values = {
+        "duration": f"{match['time_minutes']} min",
+        "region": match["region"],
+        "map": match["map"],
+        "team1_score": str(match["team1_score"]),
+        "team2_score": str(match["team2_score"]),
+    }
+    for key, (x1, y1, x2, y2) in MATCH_BOXES.items():
+        box = (x1 + MATCH_X_SHIFT, y1 + MATCH_Y_SHIFT, x2 + MATCH_X_SHIFT, y2 + MATCH_Y_SHIFT)
+        _draw_text(draw, box, values[key], font)
+
+    return np.asarray(pil)
+
+
+def degrade(img, scale, jpeg_quality):
+    """Resize to a capture resolution and round-trip through JPEG."""
+    if scale != 1.0:
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=interpolation)
+    ok, data = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+    return data.tobytes()
+
+
+def generate(out_dir, count, scales=DEFAULT_SCALES, qualities=DEFAULT_JPEG_QUALITY, seed=0,
+             first_match_id=1_000_000):
+    """
+    Write count scoreboards per (scale, quality) as
+    <out_dir>/scale_<s>_q<q>/<match_id>.jpg with <match_id>.json ground truth next to each.
+    """
+    rng = np.random.default_rng(seed)
+    portraits = load_portraits()
+    names = load_player_whitelist("players.json")
+    maps = sorted(set(load_map_whitelist("maps.json")))
+    regions = load_region_whitelist("maps.json")
+    champions = sorted(portraits)
+
+    for n in range(count):
+        match_id = first_match_id + n
+        truth = random_scoreboard(rng, match_id, names, champions, maps, regions)
+        img = render_scoreboard(truth, portraits)
+        for scale in scales:
+            for quality in qualities:
+                folder = os.path.join(out_dir, f"scale_{scale:.2f}_q{quality}")
+                os.makedirs(folder, exist_ok=True)
+                with open(os.path.join(folder, f"{match_id}.jpg"), "wb") as f:
+                    f.write(degrade(img, scale, quality))
+                with open(os.path.join(folder, f"{match_id}.json"), "w", encoding="utf-8") as f:
+                    lobby = [p["player"] for team in truth["teams"].values() for p in team]
+                    json.dump(dict(truth, lobby=lobby), f, ensure_ascii=False, indent=2)
+    print(f"Wrote {count} scoreboard(s) x {len(scales) * len(qualities)} variants to {out_dir}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render synthetic scoreboards with ground truth.")
+    parser.add_argument("out_dir", nargs="?", default="synthetic_scoreboards")
+    parser.add_argument("--count", type=int, default=20)
+    parser.add_argument("--scales", type=float, nargs="+", default=list(DEFAULT_SCALES),
+                        help="capture scales; ocr.py only parses 1.0 (its boxes are absolute pixels)")
+    parser.add_argument("--quality", type=int, nargs="+", default=list(DEFAULT_JPEG_QUALITY))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    generate(args.out_dir, args.count, args.scales, args.quality, args.seed)
@@ -0,0 +1,199 @@
+# vocab.py — closed-set recognizer for fields with a fixed vocabulary (map, region)
+#
+# Every known string gets a template: the text's ink, cropped to its bounding box and
+# stretched onto a fixed TEMPLATE_SIZE canvas. Templates are learned from labelled scoreboards
+# (`python vocab.py learn <folder>`) where available and rendered from the string otherwise.
+# A ROI is normalized the same way and scored against all templates in one matrix product.
+#
+# Rendered templates use the same fonts synth.py draws with, so they have only been checked
+# against synthetic scoreboards. They still compete for the margin, but only a learned label
+# is returned (and so skips OCR) unless OCR_VOCAB_RENDERED=1.
+import os
+import sys
+import json
+import argparse
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+VOCAB_TEMPLATES = "vocab_templates.npz"
+TEMPLATE_SIZE = (16, 192)   # (h, w)
+TEMPLATE_BLUR = 1.0         # sigma in template pixels; absorbs 1px crop and stroke differences
+# Accept the best template only with this correlation and this lead over the runner-up.
+# On synthetic scoreboards the right template scores >0.9 and the best wrong one <0.35.
+VOCAB_MIN_SCORE = 0.7
+VOCAB_MIN_MARGIN = 0.1
+VOCAB_ACCEPT_RENDERED = os.environ.get("OCR_VOCAB_RENDERED") == "1"
+FONT_CANDIDATES = ["DejaVuSans.ttf", "arial.ttf", "Arial.ttf"]
+RENDER_FONT_SIZE = 48
+
+
+# -------------------------------
+# Normalization
+# -------------------------------
+def normalize(roi):
+    """
+    Zero-mean, unit-norm float32 vector of the ROI's ink, or None for a blank ROI.
+    Text is made white on black whatever its polarity, cropped to its ink and stretched to
+    TEMPLATE_SIZE, so only the glyph shapes are compared, not the capture scale.
+    """
+    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if roi.ndim == 3 else roi
+    if gray.size == 0 or int(gray.max()) - int(gray.min()) < 32:
+        return None
+    _, ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if cv2.countNonZero(ink) > ink.size // 2:
+        ink = cv2.bitwise_not(ink)
+    ys, xs = np.nonzero(ink)
+    ink = ink[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+
+    h, w = TEMPLATE_SIZE
+    canvas = cv2.resize(ink, (w, h), interpolation=cv2.INTER_AREA).astype(np.float32)
+    canvas = cv2.GaussianBlur(canvas, (0, 0), TEMPLATE_BLUR)
+    vec = canvas.ravel()
+    vec -= vec.mean()
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else None
+
+
+def load_font(size):
+    for name in FONT_CANDIDATES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def render(text, font=None):
+    """Dark text on a light strip, as a BGR image."""
+    font = font or load_font(RENDER_FONT_SIZE)
+    left, top, right, bottom = ImageDraw.Draw(Image.new("L", (1, 1))).textbbox((0, 0), text, font=font)
+    img = Image.new("L", (right - left + 16, bottom - top + 16), 235)
+    ImageDraw.Draw(img).text((8 - left, 8 - top), text, fill=25, font=font)
+    return cv2.cvtColor(np.asarray(img), cv2.COLOR_GRAY2BGR)
+
+
+# -------------------------------
+# Recognizer
+# -------------------------------
+class VocabRecognizer:
+    """
+    One field's templates; classify() returns (label or None, correlation).
+    accepted: labels classify() may return (all of them when None); the rest only compete.
+    """
+
+    def __init__(self, labels, vectors, accepted=None):
+        self.labels = list(labels)
+        self.matrix = np.vstack(vectors).astype(np.float32) if vectors else np.zeros((0, 1), np.float32)
+        self.accepted = set(self.labels if accepted is None else accepted)
+
+    @classmethod
+    def build(cls, strings, learned=None, accept_rendered=VOCAB_ACCEPT_RENDERED):
+        """Learned templates where there are any, rendered ones for the remaining strings."""
+        learned = learned or {}
+        labels, vectors = [], []
+        font = load_font(RENDER_FONT_SIZE)
+        for text in dict.fromkeys(list(strings) + list(learned)):
+            vec = learned.get(text)
+            if vec is None:
+                vec = normalize(render(text, font))
+            if vec is not None:
+                labels.append(text)
+                vectors.append(vec)
+        return cls(labels, vectors, None if accept_rendered else learned)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def scores(self, roi):
+        vec = normalize(roi)
+        if vec is None or not self.labels:
+            return None
+        return self.matrix @ vec
+
+    def classify(self, roi, min_score=VOCAB_MIN_SCORE, min_margin=VOCAB_MIN_MARGIN):
+        scores = self.scores(roi)
+        if scores is None:
+            return None, 0.0
+        order = np.argsort(scores)[::-1]
+        best = float(scores[order[0]])
+        runner_up = float(scores[order[1]]) if len(order) > 1 else -1.0
+        label = self.labels[order[0]]
+        if best >= min_score and best - runner_up >= min_margin and label in self.accepted:
+            return label, best
+        return None, best
+
+
+def load_learned(path=VOCAB_TEMPLATES):
+    """{field: {label: vector}} from a learned templates file, or {} if there is none."""
+    if not path or not os.path.exists(path):
+        return {}
+    learned = {}
+    with np.load(path) as data:
+        for field in json.loads(str(data["fields"])):
+            labels = json.loads(str(data[f"{field}_labels"]))
+            learned[field] = dict(zip(labels, data[f"{field}_vectors"]))
+    return learned
+
+
+# -------------------------------
+# Learning from labelled scoreboards
+# -------------------------------
+def learn(folder, boxes, fields=("map", "region")):
+    """
+    Mean normalized ROI per (field, label) over the labelled scoreboards in folder.
+    boxes: {field: absolute (x1, y1, x2, y2)} where each field is read.
+    """
+    from bench_ocr import find_labelled
+    sums = {field: {} for field in fields}
+    for items in find_labelled(folder).values():
+        for image_path, truth_path in items:
+            with open(truth_path, "r", encoding="utf-8") as f:
+                match = json.load(f)["match"]
+            img = cv2.imread(image_path)
+            if img is None:
+                print(f"Skipping {image_path}: not a readable image")
+                continue
+            for field in fields:
+                x1, y1, x2, y2 = boxes[field]
+                vec = normalize(img[y1:y2, x1:x2])
+                if vec is not None:
+                    total, n = sums[field].get(match[field], (0.0, 0))
+                    sums[field][match[field]] = (total + vec, n + 1)
+    learned = {}
+    for field, by_label in sums.items():
+        learned[field] = {}
+        for label, (total, n) in by_label.items():
+            vec = total / n
+            vec = vec - vec.mean()
+            learned[field][label] = (vec / np.linalg.norm(vec)).astype(np.float32)
+    return learned
+
+
+def save_learned(learned, path=VOCAB_TEMPLATES):
+    arrays = {"fields": np.array(json.dumps(list(learned)))}
+    for field, by_label in learned.items():
+        arrays[f"{field}_labels"] = np.array(json.dumps(list(by_label)))
+        arrays[f"{field}_vectors"] = np.array(list(by_label.values()), np.float32)
+    tmp = path + ".tmp.npz"
+    np.savez_compressed(tmp, **arrays)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Learn map/region templates from labelled scoreboards.")
+    parser.add_argument("command", choices=("learn",))
+    parser.add_argument("folder", help="real captures labelled with .json ground truth (layout as synth.py writes); "
+                                       "synthetic scoreboards would only teach the rendered fonts back")
+    parser.add_argument("--output", default=VOCAB_TEMPLATES)
+    args = parser.parse_args()
+
+    import ocr
+    boxes = {field: ocr.match_field_box(field) for field in ("map", "region")}
+    learned = learn(args.folder, boxes)
+    if not any(learned.values()):
+        sys.exit(f"No labelled scoreboards found in {args.folder}")
+    save_learned(learned, args.output)
+    for field, by_label in learned.items():
+        print(f"{field}: {len(by_label)} template(s)")
+    print(f"Templates written to {args.output}")